@@ -0,0 +1,159 @@
+"""文本提取工作线程基准：用带延迟的预设后端检查单次提取的时限、超时后重建工作线程、
+丢弃过期结果和取消请求，并统计正常提取的往返耗时
+
+每个场景的结果与预期不符时退出码为1
+
+用法:
+    python benchmarks/bench_automation.py
+    python benchmarks/bench_automation.py --deadline-ms 300 --requests 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from automation import AutomationWorker, FakeAutomationBackend  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+
+# 提交请求后等待工作线程开始提取的时间（秒）
+IN_FLIGHT = 0.01
+
+
+class Recorder:
+    """记录工作线程发出的结果和超时信号"""
+
+    def __init__(self, worker):
+        self.events = []
+        worker.extracted.connect(
+            lambda request_id, text: self.events.append(("extracted", request_id, text))
+        )
+        worker.timed_out.connect(
+            lambda request_id: self.events.append(("timed_out", request_id))
+        )
+
+    def take(self):
+        events, self.events = self.events, []
+        return events
+
+
+def run_for(ms):
+    """处理事件直到经过ms毫秒"""
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec_()
+
+
+def wait_for(recorder, timeout_ms):
+    """处理事件直到收到信号或超时"""
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(lambda: recorder.events and loop.quit())
+    timer.start(1)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    loop.exec_()
+    timer.stop()
+
+
+def check(failures, name, actual, expected):
+    status = "通过" if actual == expected else "失败"
+    print(f"{name:<20}{status}")
+    if actual != expected:
+        failures.append(name)
+        print(f"  预期: {expected}")
+        print(f"  实际: {actual}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本提取工作线程基准")
+    parser.add_argument("--deadline-ms", type=int, default=200)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="测量往返耗时的请求数"
+    )
+    args = parser.parse_args()
+
+    qt_app = QApplication.instance() or QApplication(sys.argv)
+    deadline = args.deadline_ms
+    slow = deadline * 2.5 / 1000
+    # 每个工作线程创建一个后端：第一个线程卡在超过时限的提取上，超时后重建的线程正常返回
+    backends = [
+        FakeAutomationBackend(["过期的文本"], delay=slow),
+        FakeAutomationBackend(
+            ["新的文本", "被取消的文本", "旧请求", "新请求"], delay=IN_FLIGHT * 4
+        ),
+    ]
+    backends.append(FakeAutomationBackend([""] * args.requests))
+    factory_calls = []
+
+    def factory():
+        factory_calls.append(time.monotonic())
+        return backends[len(factory_calls) - 1]
+
+    worker = AutomationWorker(factory, deadline=deadline)
+    recorder = Recorder(worker)
+    failures = []
+
+    # 超过时限的提取：发出超时信号，不发出结果
+    start = time.perf_counter()
+    stale_id = worker.request(10, 10)
+    wait_for(recorder, deadline * 5)
+    elapsed = (time.perf_counter() - start) * 1000
+    check(failures, "超时", recorder.take(), [("timed_out", stale_id)])
+    print(f"  超时信号在{elapsed:.0f}ms后发出（时限{deadline}ms）")
+    check(failures, "重建工作线程", len(factory_calls), 2)
+
+    # 超时后的下一次提取由新线程完成，卡住的线程稍后返回的过期结果被丢弃
+    fresh_id = worker.request(20, 20)
+    wait_for(recorder, deadline * 5)
+    run_for(int(slow * 1000))
+    check(
+        failures, "超时后的提取", recorder.take(), [("extracted", fresh_id, "新的文本")]
+    )
+    check(failures, "卡住的线程已返回", backends[0].results, [])
+
+    # 提取进行中取消：稍后到达的结果被丢弃，也不发出超时信号
+    worker.request(30, 30)
+    time.sleep(IN_FLIGHT)
+    worker.cancel()
+    run_for(deadline * 2)
+    check(failures, "取消", recorder.take(), [])
+
+    # 提取进行中提交新请求：旧请求的结果被丢弃，只发出新请求的结果
+    worker.request(40, 40)
+    time.sleep(IN_FLIGHT)
+    latest_id = worker.request(41, 41)
+    run_for(deadline * 2)
+    check(
+        failures, "丢弃过期结果", recorder.take(), [("extracted", latest_id, "新请求")]
+    )
+    check(failures, "无多余重建", len(factory_calls), 2)
+
+    # 正常提取的往返耗时：从提交请求到主线程收到结果
+    worker.stop()
+    worker = AutomationWorker(lambda: backends[2], deadline=deadline)
+    recorder = Recorder(worker)
+    durations = []
+    for index in range(args.requests):
+        start = time.perf_counter()
+        worker.request(index, index)
+        wait_for(recorder, deadline)
+        durations.append((time.perf_counter() - start) * 1000)
+        recorder.take()
+    worker.stop()
+    print(
+        f"往返耗时: p50 {percentile(durations, 0.5):.2f}ms  "
+        f"p99 {percentile(durations, 0.99):.2f}ms（{args.requests}次）"
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""选中文本分类基准：在附带的标注语料上统计各类别的准确率，并测量每次分类的耗时和吞吐量
+
+默认使用留出语料classify_heldout.tsv，其中的样本没有参与分类规则的调整，
+准确率反映规则在新文本上的表现；调整规则时使用的样本在classify_tune.tsv中，
+可以用--corpus指定。每行为"标签\\t文本"，文本中的换行写作\\n
+
+用法:
+    python benchmarks/bench_classifier.py
+    python benchmarks/bench_classifier.py --corpus benchmarks/classify_tune.tsv --verbose
+    python benchmarks/bench_classifier.py --corpus my_corpus.tsv --repeat 200
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from script_detect import classify  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+
+# 调整分类规则时不要参考留出语料中的样本，以免准确率虚高
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "classify_heldout.tsv")
+
+
+def load_corpus(path):
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            label, _, text = line.rstrip("\n").partition("\t")
+            if text:
+                samples.append((label, text.replace("\\n", "\n")))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="选中文本分类基准")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--verbose", action="store_true", help="列出分类错误的样本")
+    args = parser.parse_args()
+
+    samples = load_corpus(args.corpus)
+    totals = Counter()
+    correct = Counter()
+    confusion = defaultdict(Counter)
+    for label, text in samples:
+        predicted = classify(text).label
+        totals[label] += 1
+        confusion[label][predicted] += 1
+        if predicted == label:
+            correct[label] += 1
+        elif args.verbose:
+            print(f"  {label} → {predicted}: {text[:60]!r}")
+
+    print(f"{'类别':<10}{'样本':>6}{'准确率':>8}  误判为")
+    for label in sorted(totals):
+        mistakes = ", ".join(
+            f"{other}×{count}"
+            for other, count in confusion[label].most_common()
+            if other != label
+        )
+        print(
+            f"{label:<10}{totals[label]:>6}"
+            f"{correct[label] / totals[label]:>9.1%}  {mistakes}"
+        )
+    print(f"总体准确率: {sum(correct.values()) / len(samples):.1%}（{len(samples)}条）")
+
+    durations = []
+    for _ in range(args.repeat):
+        for _, text in samples:
+            start = time.perf_counter()
+            classify(text)
+            durations.append((time.perf_counter() - start) * 1e6)
+    print(
+        f"每次分类: p50 {percentile(durations, 0.5):.1f}us  "
+        f"p99 {percentile(durations, 0.99):.1f}us  "
+        f"吞吐量 {len(durations) / (sum(durations) / 1e6):,.0f}次/秒"
+    )
+    # 长文本只统计开头部分，耗时不随长度增长
+    long_text = samples[0][1] * 2000
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        classify(long_text)
+    print(
+        f"{len(long_text)}字符的长文本: "
+        f"{(time.perf_counter() - start) / args.repeat * 1e6:.1f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
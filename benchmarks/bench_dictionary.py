@@ -0,0 +1,162 @@
+"""离线词典基准：生成ECDICT格式的模拟词表，测量构建索引、打开索引的耗时和内存，以及各类查询的耗时分位数
+
+开始前先检查打开空文件、不完整的索引和其他文件（如误填的词表CSV）时都抛出ValueError，
+检查不通过时退出码为1
+
+用法:
+    python benchmarks/bench_dictionary.py --entries 1000000
+    python benchmarks/bench_dictionary.py --source ecdict.csv
+"""
+
+import argparse
+import csv
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from offline_dict import (  # noqa: E402
+    HEADER,
+    MAGIC,
+    OFFSET,
+    OfflineDictionary,
+    build_index,
+)
+from run_benchmarks import percentile  # noqa: E402
+
+FIELDS = ("word", "phonetic", "definition", "translation", "exchange")
+
+
+def random_word(rng):
+    return "".join(
+        rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 12))
+    )
+
+
+def generate_source(path, entries, seed=0):
+    """写入模拟词表，返回部分词头用于查询；约五分之一的词条带词形变化"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < entries:
+        words.add(random_word(rng))
+    words = sorted(words)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for word in words:
+            exchange = ""
+            if rng.random() < 0.2:
+                exchange = f"p:{word}ed/d:{word}ed/i:{word}ing/3:{word}s"
+            writer.writerow(
+                (word, "ˈmɒk", "", f"n. 模拟释义{word}\\nv. 第二条释义", exchange)
+            )
+    return rng.sample(words, min(len(words), 2000))
+
+
+def time_queries(function, queries):
+    durations = []
+    for query in queries:
+        start = time.perf_counter()
+        function(query)
+        durations.append((time.perf_counter() - start) * 1e6)
+    return percentile(durations, 0.5), percentile(durations, 0.99)
+
+
+def check_invalid_indexes(directory):
+    """打开各种无效的索引文件，返回没有抛出ValueError的情形"""
+    cases = {
+        "空文件": b"",
+        "不足文件头": MAGIC[:5],
+        "词表CSV": "word,phonetic,translation\nhello,,int. 你好\n".encode("utf-8"),
+        "偏移表不完整": HEADER.pack(MAGIC, 1000) + OFFSET.pack(0) * 10,
+    }
+    failures = []
+    for name, content in cases.items():
+        path = os.path.join(directory, "invalid.idx")
+        with open(path, "wb") as f:
+            f.write(content)
+        try:
+            OfflineDictionary(path).close()
+            failures.append(f"{name}: 没有报错")
+        except ValueError:
+            pass
+        except Exception as e:
+            failures.append(f"{name}: {type(e).__name__}: {e}")
+        # 打开失败时文件句柄也应关闭，否则Windows上无法删除
+        os.remove(path)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线词典基准")
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--source", help="使用已有的ECDICT CSV，而不是生成模拟词表")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        failures = check_invalid_indexes(directory)
+        for failure in failures:
+            print(f"无效索引检查失败 - {failure}")
+        if failures:
+            sys.exit(1)
+        print("无效索引检查: 通过")
+
+        index_path = os.path.join(directory, "dict.idx")
+        if args.source:
+            source, samples = args.source, None
+        else:
+            source = os.path.join(directory, "source.csv")
+            samples = generate_source(source, args.entries)
+
+        start = time.perf_counter()
+        count = build_index(source, index_path)
+        build_seconds = time.perf_counter() - start
+        print(
+            f"构建索引: {count}条记录，{os.path.getsize(index_path) / 1024 / 1024:.1f}MB，"
+            f"耗时{build_seconds:.1f}秒"
+        )
+
+        start = time.perf_counter()
+        dictionary = OfflineDictionary(index_path)
+        open_ms = (time.perf_counter() - start) * 1000
+        rng = random.Random(1)
+        if samples is None:
+            # 已有词表时用随机的两个字母前缀取样词头
+            samples = []
+            while len(samples) < 2000:
+                prefix = "".join(rng.choice(string.ascii_lowercase) for _ in range(2))
+                samples.extend(dictionary.prefix(prefix, 1))
+        queries = {
+            "精确查询": samples,
+            "词形变化": [word + rng.choice(("s", "ed", "ing")) for word in samples],
+            "未收录": [random_word(rng) + "xq" for _ in samples],
+        }
+        print(f"打开索引: {open_ms:.2f}ms")
+        print(f"{'查询':<10}{'p50':>10}{'p99':>10}")
+        for name, words in queries.items():
+            p50, p99 = time_queries(dictionary.lookup, words)
+            print(f"{name:<10}{p50:>8.1f}us{p99:>8.1f}us")
+        p50, p99 = time_queries(dictionary.prefix, [word[:3] for word in samples])
+        print(f"{'前缀':<10}{p50:>8.1f}us{p99:>8.1f}us")
+        dictionary.close()
+
+        # 单独测量内存，tracemalloc会拖慢查询
+        tracemalloc.start()
+        dictionary = OfflineDictionary(index_path)
+        for words in queries.values():
+            for word in words:
+                dictionary.lookup(word)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        dictionary.close()
+        print(f"打开和查询期间Python内存峰值: {peak / 1024:.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""追问基准：比较复用context与每轮重新发送完整对话时，各轮处理提示词的token数和耗时
+
+用法:
+    python benchmarks/bench_followup.py --turns 6 --prompt-rate 500
+"""
+
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import ai_client  # noqa: E402
+from ai_client import SessionPool, request_completion  # noqa: E402
+from conversation import Conversation  # noqa: E402
+from mock_llm_server import MockConfig, MockLLMServer  # noqa: E402
+
+PROMPT = "请通俗易懂地解释以下内容：\n" + "缓存命中可以省去重复的计算。" * 40
+QUESTIONS = ("能举个例子吗？", "和预取有什么区别？", "有什么缺点？", "再简短总结一下")
+
+
+def run_conversation(server, provider, turns, reuse_context, budget):
+    """进行多轮对话，返回每轮的(提示词token数, 处理提示词耗时毫秒)"""
+    server.kv_cache.clear()
+    pool = SessionPool()
+    config = {
+        "provider": provider,
+        "api_url": server.url,
+        "api_key": "mock",
+        "model_name": "mock",
+        "stream": True,
+    }
+    conversation = Conversation(PROMPT, provider, "mock", budget)
+    prompt, history = PROMPT, None
+    results = []
+    for turn in range(turns):
+        stats = {}
+
+        def on_stats(endpoint, request_stats):
+            conversation.on_stats(request_stats)
+            stats.update(request_stats)
+
+        result = request_completion(
+            pool,
+            config,
+            prompt,
+            on_chunk=lambda content, reasoning=False: None,
+            on_success=conversation.on_success,
+            on_stats=on_stats,
+            history=history,
+        )
+        conversation.finish(result)
+        results.append(
+            (
+                stats.get("prompt_eval_count", stats.get("prompt_tokens")),
+                stats.get("prompt_eval_duration", 0) / 1e6,
+            )
+        )
+        if not reuse_context:
+            conversation.context = None
+        prompt, history = conversation.ask(
+            QUESTIONS[turn % len(QUESTIONS)], provider, "mock"
+        )
+    pool.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="追问基准")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--prompt-rate", type=float, default=500.0)
+    parser.add_argument("--budget", type=int, default=3000)
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        config=MockConfig(latency=0.01, tokens=60, prompt_rate=args.prompt_rate)
+    ).start()
+    ai_client.CHAT_COMPLETION_ENDPOINTS["OpenAI"] = f"{server.url}/v1/chat/completions"
+
+    runs = {
+        "Ollama 复用context": run_conversation(
+            server, "Ollama", args.turns, True, args.budget
+        ),
+        "Ollama 重发完整对话": run_conversation(
+            server, "Ollama", args.turns, False, args.budget
+        ),
+        "OpenAI 消息历史": run_conversation(
+            server, "OpenAI", args.turns, True, args.budget
+        ),
+    }
+    print(
+        f"{'方式':<20}"
+        + "".join(f"{'第' + str(i + 1) + '轮':>16}" for i in range(args.turns))
+    )
+    for name, results in runs.items():
+        cells = []
+        for tokens, duration in results:
+            cells.append(
+                f"{tokens or 0:>6}tok"
+                + (f"{duration:>6.0f}ms" if duration else " " * 8)
+            )
+        print(f"{name:<20}" + "".join(f"{cell:>16}" for cell in cells))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""对冲请求基准：主服务偶发停顿时，比较不对冲、超时对冲和同时请求的首字时间与额外请求数
+
+用法:
+    python benchmarks/bench_hedging.py --requests 100 --stall-rate 0.1 --stall-time 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import ai_client  # noqa: E402
+from ai_client import SessionPool, request_completion  # noqa: E402
+from hedging import Hedger  # noqa: E402
+from mock_llm_server import MockConfig, MockLLMServer  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+
+
+def run_mode(mode, primary, backup, requests):
+    """逐个请求，返回首字时间（毫秒）列表和对冲统计"""
+    pool = SessionPool()
+    hedger = Hedger(pool)
+    config = dict(primary, hedge_mode=mode, backup=backup)
+    ttfts = []
+    for _ in range(requests):
+        first = []
+        start = time.perf_counter()
+
+        def on_chunk(content, reasoning=False):
+            if not first:
+                first.append(time.perf_counter())
+
+        if mode == "off":
+            request_completion(pool, primary, "benchmark", on_chunk=on_chunk)
+        else:
+            hedger.request(config, "benchmark", on_chunk=on_chunk)
+        ttfts.append(((first[0] if first else time.perf_counter()) - start) * 1000)
+    pool.close()
+    return ttfts, hedger.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对冲请求基准")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--primary-latency", type=float, default=0.05)
+    parser.add_argument("--backup-latency", type=float, default=0.3)
+    parser.add_argument("--stall-rate", type=float, default=0.1)
+    parser.add_argument("--stall-time", type=float, default=3.0)
+    args = parser.parse_args()
+
+    # 主服务：Ollama，通常很快但偶尔停顿；备用服务：聊天补全接口，稳定但较慢
+    primary_server = MockLLMServer(
+        config=MockConfig(
+            latency=args.primary_latency,
+            tokens=20,
+            stall_rate=args.stall_rate,
+            stall_time=args.stall_time,
+        )
+    ).start()
+    backup_server = MockLLMServer(
+        config=MockConfig(latency=args.backup_latency, tokens=20)
+    ).start()
+    ai_client.CHAT_COMPLETION_ENDPOINTS["OpenAI"] = (
+        f"{backup_server.url}/v1/chat/completions"
+    )
+    primary = {
+        "provider": "Ollama",
+        "api_url": primary_server.url,
+        "api_key": "",
+        "model_name": "mock",
+        "stream": True,
+    }
+    backup = {
+        "provider": "OpenAI",
+        "api_url": backup_server.url,
+        "api_key": "mock",
+        "model_name": "mock",
+        "stream": True,
+    }
+
+    print(
+        f"{'模式':<8}{'p50':>10}{'p95':>10}{'p99':>10}{'备用请求':>10}{'备用胜出':>10}"
+    )
+    for mode in ("off", "hedge", "race"):
+        sent = backup_server.request_count
+        ttfts, stats = run_mode(mode, primary, backup, args.requests)
+        print(
+            f"{mode:<8}{percentile(ttfts, 0.5):>8.1f}ms"
+            f"{percentile(ttfts, 0.95):>8.1f}ms{percentile(ttfts, 0.99):>8.1f}ms"
+            f"{backup_server.request_count - sent:>12}{stats['backup_wins']:>12}"
+        )
+    primary_server.shutdown()
+    backup_server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""选中文本整理基准：在附带的PDF、网页等复制样本上统计整理前后的提示词token数，
+并测量整理的耗时；指定--budget时同时统计压缩到token预算后的结果
+
+样本为captures目录下的.txt文件，每个文件是一次复制得到的原始文本
+token数按应用内的estimate_tokens估计，与分段和压缩使用的估计一致
+
+用法:
+    python benchmarks/bench_normalize.py
+    python benchmarks/bench_normalize.py --captures my_captures --budget 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from app_config import DEFAULT_DICTIONARY_PROMPT  # noqa: E402
+from long_input import estimate_tokens  # noqa: E402
+from response_cache import normalize_text  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+from selection_text import compact, normalize_selection  # noqa: E402
+
+DEFAULT_CAPTURES = os.path.join(BENCH_DIR, "captures")
+
+
+def load_captures(directory):
+    captures = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".txt"):
+            # 保留原始换行符，\r\n也是需要整理的内容
+            with open(os.path.join(directory, name), encoding="utf-8", newline="") as f:
+                captures.append((name[:-4], f.read()))
+    return captures
+
+
+def prompt_tokens(text):
+    return estimate_tokens(DEFAULT_DICTIONARY_PROMPT.format(text=text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="选中文本整理基准")
+    parser.add_argument("--captures", default=DEFAULT_CAPTURES)
+    parser.add_argument("--budget", type=int, default=0, help="压缩的token预算")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    captures = load_captures(args.captures)
+    header = f"{'样本':<22}{'原始':>6}{'整理后':>7}{'减少':>7}"
+    if args.budget:
+        header += f"{'压缩后':>7}"
+    print(header)
+    total_before = total_after = total_compact = 0
+    unstable = []
+    for name, text in captures:
+        normalized = normalize_selection(text)
+        before = prompt_tokens(text)
+        after = prompt_tokens(normalized)
+        total_before += before
+        total_after += after
+        line = f"{name:<24}{before:>6}{after:>8}{(before - after) / before:>9.1%}"
+        if args.budget:
+            compacted = prompt_tokens(compact(normalized, args.budget)[0])
+            total_compact += compacted
+            line += f"{compacted:>8}"
+        print(line)
+        # 整理后的文本再次整理应保持不变，原始文本和整理后的文本得到同一个缓存键
+        if normalize_selection(normalized) != normalized or normalize_text(
+            text
+        ) != normalize_text(normalized):
+            unstable.append(name)
+    print(
+        f"合计: {total_before} → {total_after}个提示词token，"
+        f"减少{(total_before - total_after) / total_before:.1%}"
+    )
+    if args.budget:
+        print(f"压缩到{args.budget}个token后合计: {total_compact}")
+    if unstable:
+        print(f"整理结果不稳定的样本: {', '.join(unstable)}")
+
+    durations = []
+    for _ in range(args.repeat):
+        for _, text in captures:
+            start = time.perf_counter()
+            normalize_selection(text)
+            durations.append((time.perf_counter() - start) * 1e6)
+    print(
+        f"每次整理: p50 {percentile(durations, 0.5):.1f}us  "
+        f"p99 {percentile(durations, 0.99):.1f}us"
+    )
+    # 选中文本上限附近的长文本
+    long_text = "\n".join(text for _, text in captures) * 20
+    start = time.perf_counter()
+    normalize_selection(long_text)
+    print(
+        f"{len(long_text)}字符的长文本: "
+        f"{(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+    sys.exit(1 if unstable else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""选择检测基准：用脚本回放的鼠标事件和预设文本的自动化后端驱动TextExtractor，
+检查发送的选中文本，并统计从鼠标释放到发送选中文本（弹出悬浮按钮）的延迟
+
+不需要桌面环境和Windows UI自动化，可在Linux上无界面运行；发送的文本与预期不符时退出码为1
+
+用法:
+    python benchmarks/bench_selection.py
+    python benchmarks/bench_selection.py --selections 20 --extract-ms 15
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from PyQt5.QtCore import QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from automation import AutomationWorker, FakeAutomationBackend  # noqa: E402
+from input_events import ScriptedEventSource  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+from text_extractor import TextExtractor  # noqa: E402
+
+# 两次选择之间的间隔（毫秒），需超过TextExtractor的1秒发送间隔限制；
+# 该限制从创建TextExtractor时开始计算，第一次选择同样要等这么久
+SELECTION_GAP = 1100
+# 拖动中移动事件的间隔（毫秒）
+MOVE_INTERVAL = 15
+
+
+def drag(x, y, distance, moves=4):
+    """从(x, y)向右拖动distance像素的一次选择"""
+    events = [(SELECTION_GAP, "down", x, y)]
+    for step in range(1, moves + 1):
+        events.append((MOVE_INTERVAL, "move", x + distance * step // moves, y))
+    events.append((MOVE_INTERVAL, "up", x + distance, y))
+    return events
+
+
+def build_script(selections):
+    """返回(事件脚本, 后端依次返回的文本, 预期发送的文本)
+
+    除普通选择外还包含：单击（不提取）、第一次取不到文本后重试成功、与上次相同的选择（不发送）
+    """
+    events, results, expected = [], [], []
+
+    events += drag(100, 100, 120)
+    results.append("The quick brown fox")
+    expected.append("The quick brown fox")
+
+    events += drag(300, 200, 3)
+
+    events += drag(100, 300, 200)
+    results += ["", "jumps over the lazy dog"]
+    expected.append("jumps over the lazy dog")
+
+    events += drag(120, 300, 180)
+    results.append("jumps over the  lazy\ndog")
+
+    for index in range(selections):
+        events += drag(100, 400 + index, 150)
+        text = f"选中的第{index + 1}段文本"
+        results.append(text)
+        expected.append(text)
+    return events, results, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="选择检测基准")
+    parser.add_argument("--selections", type=int, default=8, help="普通选择的次数")
+    parser.add_argument(
+        "--extract-ms", type=float, default=5, help="模拟每次提取文本的耗时"
+    )
+    args = parser.parse_args()
+
+    qt_app = QApplication.instance() or QApplication(sys.argv)
+    events, results, expected = build_script(args.selections)
+    backend = FakeAutomationBackend(results, delay=args.extract_ms / 1000)
+    source = ScriptedEventSource(events)
+    extractor = TextExtractor(
+        event_source=source, automation=AutomationWorker(lambda: backend)
+    )
+
+    emitted = []
+    latencies = []
+    release = {}
+    source.mouse_up.connect(lambda pos: release.update(time=time.perf_counter()))
+
+    def on_selected(text, pos):
+        latencies.append((time.perf_counter() - release["time"]) * 1000)
+        emitted.append(text)
+
+    extractor.text_selected.connect(on_selected)
+    source.start()
+    total_ms = sum(delay for delay, *_ in events)
+    QTimer.singleShot(total_ms + SELECTION_GAP, qt_app.quit)
+    qt_app.exec_()
+    extractor.automation.stop()
+
+    print(
+        f"回放{len(events)}个鼠标事件，提取{len(backend.calls)}次，发送{len(emitted)}次"
+    )
+    if latencies:
+        print(
+            f"释放到弹出: 首次 {latencies[0]:.0f}ms  "
+            f"p50 {percentile(latencies, 0.5):.0f}ms  "
+            f"p99 {percentile(latencies, 0.99):.0f}ms"
+        )
+    print(f"学习到的等待时长: {extractor.settle_delays}")
+    if emitted != expected:
+        print("发送的文本与预期不符:")
+        print(f"  预期: {expected}")
+        print(f"  实际: {emitted}")
+        sys.exit(1)
+    print("发送的文本与预期一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""悬浮按钮和结果窗口的微基准：每次新建 vs 复用预建窗口
+
+用法:
+    python benchmarks/bench_windows.py --iterations 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from PyQt5.QtCore import QPoint  # noqa: E402
+from PyQt5.QtGui import QIcon  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import app as app_module  # noqa: E402
+from app import FloatingButtons, ResultWindow  # noqa: E402
+from app_config import ConfigStore  # noqa: E402
+from window_pool import WindowPool  # noqa: E402
+
+
+def measure(func, iterations, qt_app):
+    """返回每次调用耗时（毫秒）列表和峰值内存增量（KB）"""
+    timings = []
+    tracemalloc.start()
+    for index in range(iterations):
+        start = time.perf_counter()
+        func(index)
+        qt_app.processEvents()
+        timings.append((time.perf_counter() - start) * 1000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak / 1024
+
+
+def report(name, timings, peak_kb):
+    timings = sorted(timings)
+    p95 = timings[int(0.95 * (len(timings) - 1))]
+    print(
+        f"{name:<24} p50 {statistics.median(timings):7.3f}ms  "
+        f"p95 {p95:7.3f}ms  峰值内存 {peak_kb:8.1f}KB"
+    )
+
+
+def fresh_buttons(index):
+    # 改动前的做法：每次选中都新建窗口并从磁盘加载图标
+    buttons = FloatingButtons(f"text {index}")
+    buttons.magnifier_btn.setIcon(
+        QIcon(os.path.join(app_module.ICON_DIR, "magnifier.png"))
+    )
+    buttons.dictionary_btn.setIcon(
+        QIcon(os.path.join(app_module.ICON_DIR, "dictionary.png"))
+    )
+    buttons.move(QPoint(100, 100))
+    buttons.show()
+    buttons.close()
+    buttons.deleteLater()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="窗口复用微基准")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    qt_app = QApplication.instance() or QApplication(sys.argv)
+    store = ConfigStore(os.path.join(tempfile.mkdtemp(), "bench_windows.ini"))
+
+    timings, peak = measure(fresh_buttons, args.iterations, qt_app)
+    report("悬浮按钮 每次新建", timings, peak)
+
+    pooled_buttons = FloatingButtons()
+
+    def reuse_buttons(index):
+        pooled_buttons.retarget(f"text {index}")
+        pooled_buttons.move(QPoint(100, 100))
+        pooled_buttons.show()
+        pooled_buttons.close()
+
+    timings, peak = measure(reuse_buttons, args.iterations, qt_app)
+    report("悬浮按钮 复用", timings, peak)
+
+    def fresh_window(index):
+        window = ResultWindow("翻译结果", "", store)
+        window.set_content(f"result {index}")
+        window.show()
+        window.close()
+        window.deleteLater()
+
+    timings, peak = measure(fresh_window, args.iterations, qt_app)
+    report("结果窗口 每次新建", timings, peak)
+
+    pool = WindowPool(lambda: ResultWindow("", "", store))
+    pool.prebuild()
+
+    def reuse_window(index):
+        window = pool.acquire()
+        window.reset("翻译结果")
+        window.set_content(f"result {index}")
+        window.show()
+        window.close()
+        pool.release(window)
+
+    timings, peak = measure(reuse_window, args.iterations, qt_app)
+    report("结果窗口 复用", timings, peak)
+    print(f"窗口池: {pool.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
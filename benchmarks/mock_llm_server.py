@@ -0,0 +1,367 @@
+"""本地模拟LLM服务，支持Ollama /api/generate 和 OpenAI风格 /v1/chat/completions
+
+用法: python benchmarks/mock_llm_server.py --port 11434 --latency 0.2 --token-rate 200
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockConfig:
+    """模拟服务的行为参数"""
+
+    def __init__(
+        self,
+        latency=0.05,
+        token_rate=500.0,
+        tokens=200,
+        error_rate=0.0,
+        stream_error_rate=0.0,
+        think_tokens=0,
+        stall_rate=0.0,
+        stall_time=5.0,
+        load_time=0.0,
+        unload_after=300.0,
+        prompt_rate=0.0,
+    ):
+        # 收到请求到返回首字节的延迟（秒）
+        self.latency = latency
+        # 每秒生成的token数
+        self.token_rate = token_rate
+        # 每次回答的token数
+        self.tokens = tokens
+        # 直接返回HTTP 500的概率
+        self.error_rate = error_rate
+        # 流式输出中途报错的概率
+        self.stream_error_rate = stream_error_rate
+        # 回答前输出的<think>思考token数
+        self.think_tokens = think_tokens
+        # 模拟加载模型等偶发停顿：以stall_rate的概率在首字节前额外等待stall_time秒
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+        # 模拟Ollama加载模型：距上次请求超过unload_after秒时先等待load_time秒，并在load_duration中报告
+        self.load_time = load_time
+        self.unload_after = unload_after
+        # 每秒处理的提示词token数，为0时不模拟处理提示词的耗时
+        self.prompt_rate = prompt_rate
+
+
+def tokenize(text):
+    """把文本按4个字符一个token转换为token id，相同的文本得到相同的id"""
+    return [hash(text[i : i + 4]) & 0xFFFFFF for i in range(0, len(text), 4)]
+
+
+def generate_tokens(config):
+    """生成模拟回答的token序列"""
+    tokens = []
+    if config.think_tokens:
+        tokens.append("<think>")
+        tokens.extend(f"思考{i} " for i in range(config.think_tokens))
+        tokens.append("</think>")
+    tokens.extend(f"词{i} " for i in range(config.tokens))
+    return tokens
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockLLM/1.0"
+    # 逐token写出时关闭Nagle算法，避免小包被延迟合并
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端取消请求时会直接断开连接
+            pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "mock"}]})
+        else:
+            self._send_json(200, {"status": "Ollama is running"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.record_request()
+        self.received = time.perf_counter()
+
+        time.sleep(self.config.latency)
+        if random.random() < self.config.stall_rate:
+            time.sleep(self.config.stall_time)
+        if random.random() < self.config.error_rate:
+            self._send_json(500, {"error": "mock internal error"})
+            return
+
+        if self.path == "/api/generate":
+            self._handle_generate(request)
+        elif self.path == "/v1/chat/completions":
+            self._handle_chat(request)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _handle_generate(self, request):
+        load_duration = self.server.load_model(request)
+        if not request.get("prompt"):
+            # 不带prompt的请求只加载模型
+            self._send_json(200, {"done": True, "load_duration": load_duration})
+            return
+        tokens = generate_tokens(self.config)
+        # 像Ollama一样在context之后拼接提示词，与上次的KV缓存相同的前缀无需重新处理
+        self.prompt_ids = list(request.get("context") or []) + tokenize(
+            request["prompt"]
+        )
+        self.prompt_evaluated = self.server.evaluate_prompt(
+            request.get("model"), self.prompt_ids
+        )
+        self._sleep_for_prompt(self.prompt_evaluated)
+        generation_start = time.perf_counter()
+        if not request.get("stream", True):
+            self._sleep_for_tokens(len(tokens))
+            self._send_json(
+                200,
+                {
+                    "model": request.get("model"),
+                    "response": "".join(tokens),
+                    "done": True,
+                    **self._ollama_stats(
+                        request, tokens, load_duration, generation_start
+                    ),
+                },
+            )
+            return
+
+        self._start_chunked("application/x-ndjson")
+        for index, token in enumerate(tokens):
+            if self._should_fail_midstream(index, len(tokens)):
+                self._write_chunk(json.dumps({"error": "mock stream error"}) + "\n")
+                break
+            self._sleep_for_tokens(1)
+            self._write_chunk(
+                json.dumps({"response": token, "done": False}, ensure_ascii=False)
+                + "\n"
+            )
+        else:
+            self._write_chunk(
+                json.dumps(
+                    {
+                        "response": "",
+                        "done": True,
+                        **self._ollama_stats(
+                            request, tokens, load_duration, generation_start
+                        ),
+                    }
+                )
+                + "\n"
+            )
+        self._end_chunked()
+
+    def _ollama_stats(self, request, tokens, load_duration, generation_start):
+        """模拟Ollama最终响应中的耗时（纳秒）、token数和可用于下一轮的context"""
+        now = time.perf_counter()
+        context = self.prompt_ids + tokenize("".join(tokens))
+        self.server.kv_cache[request.get("model")] = context
+        return {
+            "total_duration": int((now - self.received) * 1e9),
+            "load_duration": load_duration,
+            "prompt_eval_count": self.prompt_evaluated,
+            "prompt_eval_duration": self._prompt_duration(self.prompt_evaluated),
+            "eval_count": len(tokens),
+            "eval_duration": int((now - generation_start) * 1e9),
+            "context": context,
+        }
+
+    def _handle_chat(self, request):
+        tokens = generate_tokens(self.config)
+        prompt = "".join(
+            message.get("content", "") for message in request.get("messages", [])
+        )
+        usage = {
+            "prompt_tokens": len(prompt) // 4 + 1,
+            "completion_tokens": len(tokens),
+        }
+        self._sleep_for_prompt(usage["prompt_tokens"])
+        if not request.get("stream"):
+            self._sleep_for_tokens(len(tokens))
+            self._send_json(
+                200,
+                {
+                    "choices": [{"message": {"content": "".join(tokens)}}],
+                    "usage": usage,
+                },
+            )
+            return
+
+        self._start_chunked("text/event-stream")
+        for index, token in enumerate(tokens):
+            if self._should_fail_midstream(index, len(tokens)):
+                payload = {"error": {"message": "mock stream error"}}
+                self._write_chunk(f"data: {json.dumps(payload)}\n\n")
+                break
+            self._sleep_for_tokens(1)
+            payload = {"choices": [{"delta": {"content": token}}]}
+            self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n")
+        else:
+            if (request.get("stream_options") or {}).get("include_usage"):
+                payload = {"choices": [], "usage": usage}
+                self._write_chunk(f"data: {json.dumps(payload)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+        self._end_chunked()
+
+    def _should_fail_midstream(self, index, total):
+        return (
+            index == total // 2
+            and self.config.stream_error_rate
+            and random.random() < self.config.stream_error_rate
+        )
+
+    def _prompt_duration(self, count):
+        if not self.config.prompt_rate:
+            return 1000000
+        return int(count / self.config.prompt_rate * 1e9)
+
+    def _sleep_for_prompt(self, count):
+        if self.config.prompt_rate:
+            time.sleep(count / self.config.prompt_rate)
+
+    def _sleep_for_tokens(self, count):
+        if self.config.token_rate:
+            time.sleep(count / self.config.token_rate)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), config=None):
+        super().__init__(address, MockLLMHandler)
+        self.config = config or MockConfig()
+        self.request_count = 0
+        self.model_loads = 0
+        self._lock = threading.Lock()
+        self._unload_at = None
+        # 模型 -> 上次请求的token序列，模拟服务端的KV缓存
+        self.kv_cache = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def load_model(self, request):
+        """模拟模型的加载和卸载，返回load_duration（纳秒）"""
+        keep_alive = request.get("keep_alive")
+        # 简化处理：只识别以秒为单位的数字keep_alive，其余使用unload_after
+        if not isinstance(keep_alive, (int, float)) or keep_alive < 0:
+            keep_alive = self.config.unload_after
+        now = time.monotonic()
+        with self._lock:
+            loaded = self._unload_at is not None and now < self._unload_at
+            if not loaded:
+                self.model_loads += 1
+            self._unload_at = now + self.config.load_time * (not loaded) + keep_alive
+        if loaded or not self.config.load_time:
+            return 1000000
+        time.sleep(self.config.load_time)
+        return int(self.config.load_time * 1e9)
+
+    def evaluate_prompt(self, model, ids):
+        """返回需要处理的提示词token数：与KV缓存相同的前缀部分直接复用"""
+        cached = self.kv_cache.get(model) or []
+        reused = 0
+        for cached_id, new_id in zip(cached, ids):
+            if cached_id != new_id:
+                break
+            reused += 1
+        # 至少重新处理最后一个token
+        return max(len(ids) - reused, 1)
+
+    def start(self):
+        """在后台线程中运行服务"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟LLM服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-rate", type=float, default=500.0)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream-error-rate", type=float, default=0.0)
+    parser.add_argument("--think-tokens", type=int, default=0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-time", type=float, default=5.0)
+    parser.add_argument("--load-time", type=float, default=0.0)
+    parser.add_argument("--unload-after", type=float, default=300.0)
+    parser.add_argument("--prompt-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        token_rate=args.token_rate,
+        tokens=args.tokens,
+        error_rate=args.error_rate,
+        stream_error_rate=args.stream_error_rate,
+        think_tokens=args.think_tokens,
+        stall_rate=args.stall_rate,
+        stall_time=args.stall_time,
+        load_time=args.load_time,
+        unload_after=args.unload_after,
+        prompt_rate=args.prompt_rate,
+    )
+    server = MockLLMServer((args.host, args.port), config)
+    print(f"模拟LLM服务已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""无界面基准测试：通过本地模拟LLM服务测量请求、解析和渲染链路
+
+用法:
+    python benchmarks/run_benchmarks.py                 # 运行并与基线比较
+    python benchmarks/run_benchmarks.py --save-baseline # 运行并保存为新基线
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from PyQt5.QtGui import QTextCursor  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QTextEdit  # noqa: E402
+
+import ai_client  # noqa: E402
+from ai_client import SessionPool, request_completion  # noqa: E402
+from mock_llm_server import MockConfig, MockLLMServer  # noqa: E402
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+# 各提供方链路：(名称, 提供方, 是否流式)
+SCENARIOS = [
+    ("ollama_stream", "Ollama", True),
+    ("ollama_blocking", "Ollama", False),
+    ("openai_stream", "OpenAI", True),
+    ("openai_blocking", "OpenAI", False),
+]
+
+# 越小越好的指标；其余指标（吞吐量）越大越好
+LOWER_IS_BETTER = ("ttft_p50_ms", "ttft_p95_ms", "e2e_p50_ms", "e2e_p95_ms", "peak_kb")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def make_config(provider, server_url, stream):
+    if provider != "Ollama":
+        # 将聊天补全接口指向模拟服务
+        ai_client.CHAT_COMPLETION_ENDPOINTS[provider] = (
+            f"{server_url}/v1/chat/completions"
+        )
+    return {
+        "provider": provider,
+        "api_url": server_url,
+        "api_key": "mock",
+        "model_name": "mock",
+        "stream": stream,
+    }
+
+
+def run_latency(pool, config, requests, view):
+    """逐个请求，测量首字时间和端到端时间（含渲染）"""
+    ttfts, e2es = [], []
+    for _ in range(requests):
+        first = []
+        start = time.perf_counter()
+
+        def on_chunk(content, reasoning=False):
+            if reasoning:
+                return
+            if not first:
+                first.append(time.perf_counter())
+                view.setPlainText(content)
+                return
+            # 与结果窗口一致：只追加新增内容
+            view.moveCursor(QTextCursor.End)
+            view.insertPlainText(content)
+
+        result = request_completion(pool, config, "benchmark", on_chunk=on_chunk)
+        view.setPlainText(result)
+        end = time.perf_counter()
+        e2es.append((end - start) * 1000)
+        ttfts.append(((first[0] if first else end) - start) * 1000)
+    return ttfts, e2es
+
+
+def run_throughput(pool, config, requests, concurrency):
+    """并发请求，测量每秒完成的请求数和字符数"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(
+            executor.map(
+                lambda _: request_completion(
+                    pool, config, "benchmark", on_chunk=lambda *chunk: None
+                ),
+                range(requests),
+            )
+        )
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, sum(len(r) for r in results) / elapsed
+
+
+def run_scenario(server, name, provider, stream, args, view):
+    config = make_config(provider, server.url, stream)
+    pool = SessionPool(pool_size=args.concurrency)
+
+    tracemalloc.start()
+    ttfts, e2es = run_latency(pool, config, args.requests, view)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    requests_per_sec, chars_per_sec = run_throughput(
+        pool, config, args.requests, args.concurrency
+    )
+    pool.close()
+    return {
+        "ttft_p50_ms": statistics.median(ttfts),
+        "ttft_p95_ms": percentile(ttfts, 0.95),
+        "e2e_p50_ms": statistics.median(e2es),
+        "e2e_p95_ms": percentile(e2es, 0.95),
+        "requests_per_sec": requests_per_sec,
+        "chars_per_sec": chars_per_sec,
+        "peak_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较，返回退化的指标列表"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if not base:
+                continue
+            change = (value - base) / base
+            if metric not in LOWER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{name}.{metric}: {base:.1f} → {value:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClickNow无界面基准测试")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--token-rate", type=float, default=2000.0)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--think-tokens", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream-error-rate", type=float, default=0.0)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    view = QTextEdit()
+
+    server = MockLLMServer(
+        config=MockConfig(
+            latency=args.latency,
+            token_rate=args.token_rate,
+            tokens=args.tokens,
+            think_tokens=args.think_tokens,
+            error_rate=args.error_rate,
+            stream_error_rate=args.stream_error_rate,
+        )
+    ).start()
+
+    results = {}
+    for name, provider, stream in SCENARIOS:
+        results[name] = run_scenario(server, name, provider, stream, args, view)
+        metrics = results[name]
+        print(
+            f"{name:<18} TTFT p50 {metrics['ttft_p50_ms']:7.1f}ms  "
+            f"E2E p50 {metrics['e2e_p50_ms']:7.1f}ms  "
+            f"p95 {metrics['e2e_p95_ms']:7.1f}ms  "
+            f"{metrics['requests_per_sec']:6.1f} req/s  "
+            f"峰值内存 {metrics['peak_kb']:8.1f}KB"
+        )
+    server.shutdown()
+    app.processEvents()
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"基线已保存: {BASELINE_FILE}")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("没有基线，可使用 --save-baseline 保存")
+        return 0
+
+    with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("性能退化:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("与基线相比没有退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""启动耗时检查：多次冷启动应用，托盘显示时间超出预算时返回非零
+
+用法:
+    python benchmarks/startup_budget.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(os.path.dirname(BENCH_DIR), "src", "app.py")
+
+
+def run_once(timeout):
+    """启动一次应用，返回启动报告和从创建进程到托盘显示的毫秒数"""
+    home = tempfile.mkdtemp(prefix="clicknow_startup_")
+    # 使用临时用户目录，避免读写真实的配置和缓存
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    if not sys.platform.startswith("win"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    spawned = time.time()
+    output = subprocess.run(
+        [sys.executable, APP_SCRIPT, "--startup-report"],
+        env=env,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=timeout,
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith("{"):
+            report = json.loads(line)
+            break
+    else:
+        raise RuntimeError(f"没有获得启动报告:\n{output.stderr}")
+    return report, (report["epochs"]["tray_visible"] - spawned) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClickNow启动耗时检查")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    reports = []
+    tray_times = []
+    for _ in range(args.runs):
+        report, tray_ms = run_once(args.timeout)
+        reports.append(report)
+        tray_times.append(tray_ms)
+
+    def median_of(section):
+        names = reports[0][section]
+        return {
+            name: statistics.median(r[section].get(name, 0.0) for r in reports)
+            for name in names
+        }
+
+    print("阶段（中位数）:")
+    for name, value in median_of("phases").items():
+        print(f"  {name:<24}{value:>9.1f}ms")
+    print("导入（中位数）:")
+    for name, value in median_of("imports").items():
+        print(f"  {name:<24}{value:>9.1f}ms")
+    print("时间点（距导入启动模块）:")
+    for name, value in median_of("marks").items():
+        print(f"  {name:<24}{value:>9.1f}ms")
+
+    tray_ms = statistics.median(tray_times)
+    print(f"进程创建到托盘显示: 中位数 {tray_ms:.1f}ms（预算 {args.budget_ms:.0f}ms）")
+    if tray_ms > args.budget_ms:
+        print("超出启动预算")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -40,7 +40,17 @@ def build():
         '--collect-all=win32gui',
         '--collect-all=pythoncom',
         '--collect-all=pywintypes',
-        '--collect-all=PyQt5',
+        # 只打包用到的Qt模块，PyInstaller的PyQt5钩子会带上所需的插件
+        '--exclude-module=PyQt5.QtWebEngineWidgets',
+        '--exclude-module=PyQt5.QtWebEngineCore',
+        '--exclude-module=PyQt5.QtMultimedia',
+        '--exclude-module=PyQt5.QtNetwork',
+        '--exclude-module=PyQt5.QtQml',
+        '--exclude-module=PyQt5.QtQuick',
+        '--exclude-module=PyQt5.QtSql',
+        '--exclude-module=PyQt5.QtTest',
+        '--exclude-module=PyQt5.QtBluetooth',
+        '--exclude-module=PyQt5.Qt3DCore',
     ]
 
     # 执行打包
@@ -0,0 +1,450 @@
+import json
+import logging
+import threading
+import time
+
+from endpoints import EndpointBalancer, split_urls
+from sanitizer import ResponseSanitizer
+
+logger = logging.getLogger(__name__)
+
+# 各提供方的聊天补全接口地址
+CHAT_COMPLETION_ENDPOINTS = {
+    "DeepSeek": "https://api.deepseek.com/v1/chat/completions",
+    "OpenAI": "https://api.openai.com/v1/chat/completions",
+}
+
+# 连接池默认大小
+DEFAULT_POOL_SIZE = 4
+# 预热请求的超时时间（秒）
+PREWARM_TIMEOUT = 3
+# 两次预热之间的最小间隔（秒），避免频繁选中文本时重复请求
+PREWARM_INTERVAL = 15
+# Ollama在最终响应中报告的耗时（纳秒）和token数
+OLLAMA_STATS_FIELDS = (
+    "load_duration",
+    "total_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+# 聊天补全接口在usage中报告的token数
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens")
+# 建立连接的超时、两次收到数据之间的最长等待和整个请求的总时限（秒）
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+REQUEST_DEADLINE = 120
+# 临近总时限时连接和读取超时的下限（秒）
+MIN_TIMEOUT = 0.1
+
+
+class StreamError(Exception):
+    """流式响应过程中服务端返回了错误"""
+
+
+class DeadlineExceeded(Exception):
+    """请求超过了总时限"""
+
+
+def default_endpoints(provider, api_url):
+    """返回提供方的服务地址列表：Ollama为api_url中的一个或多个根地址，其余为聊天补全接口地址"""
+    if provider == "Ollama":
+        return split_urls(api_url)
+    return [CHAT_COMPLETION_ENDPOINTS[provider]]
+
+
+def build_request(
+    provider,
+    endpoint,
+    api_key,
+    model_name,
+    prompt,
+    stream=False,
+    keep_alive=None,
+    history=None,
+):
+    """根据提供方构造请求地址、请求体和请求头，endpoint为default_endpoints中的一个地址
+
+    keep_alive为Ollama请求后模型在内存中的保留时间，如"5m"、"1h"、"-1"；
+    history为之前的对话：Ollama为上次响应返回的context，其余提供方为消息列表
+    """
+    if provider == "Ollama":
+        api_endpoint = f"{endpoint}/api/generate"
+        data = {"model": model_name, "prompt": prompt, "stream": stream}
+        if keep_alive:
+            data["keep_alive"] = keep_alive
+        if history:
+            # 服务端直接复用context，无需重新处理之前的提示词
+            data["context"] = history
+        return api_endpoint, data, {}
+
+    api_endpoint = endpoint
+    data = {
+        "model": model_name,
+        "messages": list(history or []) + [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        "max_tokens": 2000,
+        "stream": stream,
+    }
+    if stream:
+        # 在最后一个数据块中返回token用量
+        data["stream_options"] = {"include_usage": True}
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    return api_endpoint, data, headers
+
+
+def parse_response(provider, payload):
+    """从非流式响应体中取出模型输出"""
+    if provider == "Ollama":
+        return payload.get("response", "")
+    return payload.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+
+def ollama_stats(payload):
+    """取出Ollama响应中的耗时、token数以及可用于追问的context"""
+    stats = {field: payload[field] for field in OLLAMA_STATS_FIELDS if field in payload}
+    if payload.get("context"):
+        stats["context"] = payload["context"]
+    return stats
+
+
+def iter_ollama_chunks(response, stats=None):
+    """逐行解析Ollama /api/generate 的NDJSON流，最终响应中的统计信息写入stats"""
+    for line in response.iter_lines():
+        if not line:
+            continue
+        payload = json.loads(line)
+        if "error" in payload:
+            raise StreamError(payload["error"])
+        if payload.get("done") and stats is not None:
+            stats.update(ollama_stats(payload))
+        chunk = payload.get("response", "")
+        if chunk:
+            yield chunk
+
+
+def usage_stats(payload):
+    """取出聊天补全接口响应中的token用量"""
+    usage = payload.get("usage") or {}
+    return {field: usage[field] for field in USAGE_FIELDS if field in usage}
+
+
+def iter_sse_chunks(response, stats=None):
+    """逐行解析聊天补全接口的SSE流（data: 行），token用量写入stats"""
+    for line in response.iter_lines():
+        if not line or not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            # 继续读到流结束，使连接可以归还连接池复用
+            continue
+        payload = json.loads(data)
+        if "error" in payload:
+            error = payload["error"]
+            if isinstance(error, dict):
+                error = error.get("message", error)
+            raise StreamError(error)
+        if stats is not None and payload.get("usage"):
+            stats.update(usage_stats(payload))
+        choices = payload.get("choices") or [{}]
+        chunk = choices[0].get("delta", {}).get("content")
+        if chunk:
+            yield chunk
+
+
+def base_url(provider, endpoint):
+    """返回服务地址的根地址，用于预热连接"""
+    if provider == "Ollama":
+        return f"{endpoint.rstrip('/')}/"
+    return endpoint.split("/v1/", 1)[0] + "/"
+
+
+def load_http_client():
+    """导入requests（约占启动导入耗时的一半），启动后在空闲时或首次请求时调用"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    return requests, HTTPAdapter
+
+
+class SessionPool:
+    """按提供方保持长连接的requests.Session，复用TCP/TLS连接"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+        self.pool_size = pool_size
+        # 同一提供方多个地址间的负载均衡和熔断
+        self.balancer = EndpointBalancer(self)
+        self._sessions = {}
+        self._last_warm = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, provider):
+        with self._lock:
+            session = self._sessions.get(provider)
+            if session is None:
+                requests, HTTPAdapter = load_http_client()
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_size, pool_maxsize=self.pool_size
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[provider] = session
+            return session
+
+    def prewarm(self, provider, endpoint):
+        """在后台建立或刷新到服务地址的连接，不阻塞调用方"""
+        url = base_url(provider, endpoint)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_warm.get(url, float("-inf")) < PREWARM_INTERVAL:
+                return
+            self._last_warm[url] = now
+        session = self.session_for(provider)
+        threading.Thread(target=self._warm, args=(session, url), daemon=True).start()
+
+    def _warm(self, session, url):
+        try:
+            session.head(url, timeout=PREWARM_TIMEOUT).close()
+            logger.debug("[API] 连接预热完成: %s", url)
+        except Exception as e:
+            logger.warning("[API] 连接预热失败: %s", e)
+
+    def close(self):
+        self.balancer.stop()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+def iter_response_chunks(provider, response, stats=None):
+    """按提供方选择对应的流式解析器"""
+    if provider == "Ollama":
+        return iter_ollama_chunks(response, stats)
+    return iter_sse_chunks(response, stats)
+
+
+def request_completion(
+    session_pool,
+    config,
+    prompt,
+    on_chunk=None,
+    cancel_token=None,
+    on_success=None,
+    trace=None,
+    on_stats=None,
+    history=None,
+):
+    """按配置请求AI服务并返回清理后的结果，出错时返回错误信息
+
+    传入on_chunk时以流式方式回调新增的已清理文本on_chunk(delta, reasoning)，
+    config中show_reasoning为True时思考过程也以reasoning=True回调；
+    on_success仅在完整收到结果时回调；trace用于记录发送请求、首字节和末字节的时间点；
+    config中的endpoints为可选的多个服务地址，连接失败时换用其他地址，
+    connect_timeout/read_timeout/deadline覆盖默认的超时和总时限；
+    on_stats(endpoint, stats)在请求成功时回调，stats包含提供方、模型、客户端测得的耗时
+    以及服务端报告的耗时和token数（如Ollama的load_duration、聊天补全接口的usage），
+    Ollama的stats还包含可用于追问的context；history为之前的对话，见build_request
+    """
+    response = None
+    endpoint = None
+    healthy = True
+    latency = None
+    received = False
+    stats = {}
+    sanitizer = ResponseSanitizer(keep_reasoning=config.get("show_reasoning", False))
+    balancer = session_pool.balancer
+    try:
+        provider = config["provider"]
+        stream = on_chunk is not None and config["stream"]
+        deadline = time.monotonic() + config.get("deadline", REQUEST_DEADLINE)
+
+        session = session_pool.session_for(provider)
+        if trace is not None:
+            trace.mark("request_sent")
+        sent = time.monotonic()
+        response, endpoint, latency = _post_with_failover(
+            session, balancer, config, prompt, stream, deadline, cancel_token, history
+        )
+
+        if response.status_code != 200:
+            healthy = response.status_code < 500
+            error_msg = f"请求失败: HTTP状态码 {response.status_code}\n{response.text}"
+            logger.warning("[API] %s", error_msg)
+            return error_msg
+
+        if stream:
+            for chunk in iter_response_chunks(provider, response, stats):
+                if not received:
+                    if trace is not None:
+                        trace.mark("first_byte")
+                    stats["first_byte_seconds"] = time.monotonic() - sent
+                received = True
+                # 只清理新增部分，跨块的标签由sanitizer暂存
+                _deliver(sanitizer.feed(chunk), on_chunk)
+                if cancel_token is not None and cancel_token.is_cancelled():
+                    logger.debug("[API] 请求已取消，中止读取")
+                    break
+                if time.monotonic() > deadline:
+                    raise DeadlineExceeded("超过请求总时限")
+            _deliver(sanitizer.finish(), on_chunk)
+        else:
+            # 非流式请求在post返回时已收到完整响应
+            if trace is not None:
+                trace.mark("first_byte")
+            stats["first_byte_seconds"] = time.monotonic() - sent
+            payload = response.json()
+            if provider == "Ollama":
+                stats.update(ollama_stats(payload))
+            else:
+                stats.update(usage_stats(payload))
+            sanitizer.feed(parse_response(provider, payload))
+            sanitizer.finish()
+            # 回答由最终结果一次性显示，这里只转交思考过程
+            _deliver(("", sanitizer.reasoning()), on_chunk)
+        if trace is not None:
+            trace.mark("last_byte")
+
+        result = sanitizer.text()
+        if cancel_token is None or not cancel_token.is_cancelled():
+            logger.debug("[API] 请求成功")
+            if on_stats is not None:
+                stats.update(
+                    provider=provider,
+                    model=config["model_name"],
+                    request_seconds=time.monotonic() - sent,
+                )
+                on_stats(endpoint, stats)
+            if on_success is not None:
+                on_success(result)
+        return result
+    except (StreamError, DeadlineExceeded) as e:
+        partial = sanitizer.text()
+        if partial:
+            error_msg = f"{partial}\n\n[响应中断: {e}]"
+        else:
+            error_msg = f"请求失败: {e}"
+        logger.warning("[API] 流式响应出错: %s", e)
+        return error_msg
+    except Exception as e:
+        # 主动取消导致的连接关闭不计为地址故障
+        healthy = cancel_token is not None and cancel_token.is_cancelled()
+        error_msg = f"请求失败: {str(e)}"
+        logger.warning("[API] %s", error_msg)
+        return error_msg
+    finally:
+        # 关闭连接，流式请求中止时会直接断开套接字
+        if response is not None:
+            response.close()
+        if endpoint is not None:
+            balancer.release(endpoint, healthy, latency)
+
+
+def _post_with_failover(
+    session, balancer, config, prompt, stream, deadline, token, history=None
+):
+    """选择服务地址发送请求，连接失败、超时或服务端错误时换用其他地址
+
+    返回(响应, 地址, 收到响应头的耗时)，调用方负责balancer.release该地址
+    """
+    requests, _ = load_http_client()
+    provider = config["provider"]
+    endpoints = config.get("endpoints") or default_endpoints(
+        provider, config["api_url"]
+    )
+    tried = []
+    while True:
+        # 换用其他地址前时限可能已经用完，此时不再发出请求
+        if time.monotonic() >= deadline:
+            raise DeadlineExceeded("超过请求总时限")
+        endpoint = balancer.acquire(provider, endpoints, exclude=tried)
+        if endpoint is None:
+            raise ValueError(f"未配置{provider}的服务地址")
+        tried.append(endpoint)
+        api_endpoint, data, headers = build_request(
+            provider,
+            endpoint,
+            config["api_key"],
+            config["model_name"],
+            prompt,
+            stream=stream,
+            keep_alive=config.get("keep_alive"),
+            history=history,
+        )
+        logger.debug(
+            "[API] 调用AI服务: 提供方=%s, 模型=%s, 接口URL=%s, 流式输出=%s, "
+            "提示词=%.100s...",
+            provider,
+            config["model_name"],
+            api_endpoint,
+            stream,
+            prompt,
+        )
+
+        remaining = deadline - time.monotonic()
+        # 非流式请求在生成完成前不会收到数据，读取超时也受总时限约束
+        read_timeout = config.get("read_timeout", READ_TIMEOUT)
+        if not stream:
+            read_timeout = min(read_timeout, remaining)
+        start = time.monotonic()
+        try:
+            response = session.post(
+                api_endpoint,
+                json=data,
+                headers=headers,
+                stream=stream,
+                # requests不接受0或负数的超时，临近时限时至少留出MIN_TIMEOUT
+                timeout=(
+                    max(
+                        min(config.get("connect_timeout", CONNECT_TIMEOUT), remaining),
+                        MIN_TIMEOUT,
+                    ),
+                    max(read_timeout, MIN_TIMEOUT),
+                ),
+            )
+        except requests.RequestException as e:
+            balancer.release(endpoint, False)
+            if not _can_fail_over(endpoints, tried, deadline, token):
+                raise
+            logger.warning("[API] %s 请求失败，换用其他地址: %s", endpoint, e)
+            continue
+        if token is not None:
+            token.attach(response)
+
+        if response.status_code >= 500 and _can_fail_over(
+            endpoints, tried, deadline, token
+        ):
+            logger.warning(
+                "[API] %s 返回HTTP状态码 %s，换用其他地址",
+                endpoint,
+                response.status_code,
+            )
+            response.close()
+            balancer.release(endpoint, False)
+            continue
+        return response, endpoint, time.monotonic() - start
+
+
+def _can_fail_over(endpoints, tried, deadline, token):
+    return (
+        len(set(tried)) < len(set(endpoints))
+        and time.monotonic() < deadline
+        and (token is None or not token.is_cancelled())
+    )
+
+
+def _deliver(deltas, on_chunk):
+    """把sanitizer输出的(回答, 思考)增量交给回调"""
+    answer, reasoning = deltas
+    if on_chunk is None:
+        return
+    if reasoning:
+        on_chunk(reasoning, True)
+    if answer:
+        on_chunk(answer, False)
@@ -1,7 +1,13 @@
 import sys
 import os
-import requests
-import pythoncom
+import json
+import logging
+import functools
+
+# 启动计时需在其他模块导入前开始
+from startup import profiler
+
+profiler.track_imports()
 
 # 移除未使用的导入
 from PyQt5.QtWidgets import (
@@ -18,35 +24,110 @@ from PyQt5.QtWidgets import (
     QTabWidget,
     QDialog,
     QComboBox,  # 添加下拉选择控件
+    QCheckBox,
+    QMessageBox,
+    QPlainTextEdit,
+    QLineEdit,
 )
-from PyQt5.QtGui import QIcon, QCursor, QFont
-from PyQt5.QtCore import Qt, QPoint, QSize, QSettings, pyqtSignal, QTimer
+from PyQt5.QtGui import QIcon, QCursor, QFont, QTextCursor
+from PyQt5.QtCore import Qt, QPoint, QSize, pyqtSignal, QTimer
 
 # 导入新的文本提取器
 from text_extractor import TextExtractor
-
-# 初始化 COM
-pythoncom.CoInitialize()
+from input_events import GlobalHotkey, create_event_source
+from automation import AutomationWorker, UIAutomationBackend
+from extraction_strategy import StrategyCache
+from request_executor import RequestExecutor
+from response_cache import ResponseCache, make_cache_key
+from prefetcher import Prefetcher
+from tracing import REQUEST_TRACE, tracer
+from ai_client import SessionPool, load_http_client, request_completion
+from app_config import DEFAULT_MODELS, ConfigStore
+from window_pool import WindowPool
+from batch import BatchJob, BatchQueue, build_batch_prompt, split_batch_answer
+from hedging import Hedger
+from model_warmer import ModelWarmer
+from server_timing import COMPONENT_NAMES, COMPONENTS, TimingRecorder, format_record
+from conversation import Conversation
+from dictionary_rules import parse_rules
+from offline_dict import OfflineDictionary, format_entry
+from long_input import MAX_SELECTION_CHARS, ChunkedJob, estimate_tokens, split_text
+
+logger = logging.getLogger(__name__)
+
+# 托盘显示后延迟导入网络库的时间（毫秒）
+NETWORK_WARMUP_DELAY = 1000
 
 # 配置文件路径
 APP_NAME = "ClickNow"
 SETTINGS_FILE = os.path.join(os.path.expanduser("~"), f".{APP_NAME.lower()}.ini")
+CACHE_FILE = os.path.join(
+    os.path.dirname(SETTINGS_FILE), f".{APP_NAME.lower()}_cache.db"
+)
+STRATEGY_FILE = os.path.join(
+    os.path.dirname(SETTINGS_FILE), f".{APP_NAME.lower()}_strategies.json"
+)
+TRACE_FILE = os.path.join(
+    os.path.dirname(SETTINGS_FILE), f".{APP_NAME.lower()}_trace.jsonl"
+)
+TIMING_FILE = os.path.join(
+    os.path.dirname(SETTINGS_FILE), f".{APP_NAME.lower()}_timings.jsonl"
+)
+DICTIONARY_FILE = os.path.join(
+    os.path.dirname(SETTINGS_FILE), f".{APP_NAME.lower()}_dict.idx"
+)
 
-# 默认提示词
-DEFAULT_MAGNIFIER_PROMPT = "请通俗易懂地解释以下内容：\n{text}"
-DEFAULT_DICTIONARY_PROMPT = "请将以下内容翻译成中文：\n{text}"
-
-# AI API配置（示例使用，实际应用中需要替换为真实的API）
-AI_API_URL = "http://192.168.20.63:11434"
-AI_API_KEY = "ollama"
-DEFAULT_AI_MODEL = "llama3"
+# 各按钮对应的提示词配置项
+PROMPT_SETTINGS = {
+    "magnifier": "magnifier_prompt",
+    "dictionary": "dictionary_prompt",
+}
 
-# 在文件开头的常量定义区域添加默认模型配置
-DEFAULT_MODELS = {
-    "Ollama": "llama3",
-    "DeepSeek": "deepseek-chat",
-    "OpenAI": "gpt-3.5-turbo",
+# 预取模式及其对应的预取按钮
+PREFETCH_MODES = {
+    "off": (),
+    "dictionary": ("dictionary",),
+    "magnifier": ("magnifier",),
+    "both": ("dictionary", "magnifier"),
 }
+PREFETCH_MODE_LABELS = {
+    "off": "关闭",
+    "dictionary": "预取翻译结果",
+    "magnifier": "预取解释结果",
+    "both": "同时预取翻译和解释",
+}
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
+
+# 样式表只定义一次，复用的窗口不会重复设置
+FLOATING_BUTTONS_STYLE = """
+    QPushButton {
+        background-color: #4CAF50; /* 更显眼的绿色背景 */
+        border-radius: 36px; /* 调整为按钮大小的一半，保持圆形 */
+        border: 2px solid #2E7D32; /* 深绿色边框 */
+        color: white; /* 白色文字 */
+    }
+    QPushButton:hover {
+        background-color: #66BB6A; /* 悬停时颜色变亮 */
+    }
+    QPushButton:pressed {
+        background-color: #388E3C; /* 按下时颜色变深 */
+    }
+"""
+RESULT_WINDOW_STYLE = """
+    QTextEdit {
+        border: 1px solid #cccccc;
+        background-color: #ffffff;
+        padding: 10px;
+        line-height: 1.6;
+    }
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def load_icon(name):
+    """加载图标，同一图标只从磁盘读取一次"""
+    return QIcon(os.path.join(ICON_DIR, name))
 
 
 class FloatingButtons(QWidget):
@@ -54,8 +135,10 @@ class FloatingButtons(QWidget):
 
     magnifier_clicked = pyqtSignal(str)
     dictionary_clicked = pyqtSignal(str)
+    batch_clicked = pyqtSignal(str)
+    closed = pyqtSignal()
 
-    def __init__(self, selected_text, parent=None):
+    def __init__(self, selected_text="", parent=None):
         super().__init__(
             parent, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool
         )
@@ -71,10 +154,15 @@ class FloatingButtons(QWidget):
         self.hide_timer = QTimer(self)
         self.hide_timer.setSingleShot(True)
         self.hide_timer.timeout.connect(self.close)
-        self.hide_timer.start(5000)
 
         self.initUI()
 
+    def retarget(self, selected_text):
+        """复用窗口显示新的选中文本，重新开始自动消失计时"""
+        self.selected_text = selected_text
+        self.dragPosition = None
+        self.hide_timer.start(5000)
+
     def enterEvent(self, event):  # 修改为正确的Qt事件名
         """鼠标进入时停止定时器"""
         self.hide_timer.stop()
@@ -90,8 +178,7 @@ class FloatingButtons(QWidget):
 
         # 放大镜按钮
         self.magnifier_btn = QPushButton()
-        icon_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
-        self.magnifier_btn.setIcon(QIcon(os.path.join(icon_dir, "magnifier.png")))
+        self.magnifier_btn.setIcon(load_icon("magnifier.png"))
         self.magnifier_btn.setIconSize(QSize(48, 48))  # 增大图标尺寸
         self.magnifier_btn.setFixedSize(72, 72)  # 增大按钮尺寸
         self.magnifier_btn.setToolTip("解释所选文本")
@@ -99,31 +186,25 @@ class FloatingButtons(QWidget):
 
         # 词典按钮
         self.dictionary_btn = QPushButton()
-        self.dictionary_btn.setIcon(QIcon(os.path.join(icon_dir, "dictionary.png")))
+        self.dictionary_btn.setIcon(load_icon("dictionary.png"))
         self.dictionary_btn.setIconSize(QSize(48, 48))  # 增大图标尺寸
         self.dictionary_btn.setFixedSize(72, 72)  # 增大按钮尺寸
         self.dictionary_btn.setToolTip("翻译所选文本")
         self.dictionary_btn.clicked.connect(self.on_dictionary_clicked)
 
+        # 加入批量队列按钮，仅在批量模式下显示
+        self.batch_btn = QPushButton("+")
+        self.batch_btn.setToolTip("加入批量队列")
+        self.batch_btn.clicked.connect(self.on_batch_clicked)
+        self.batch_btn.setVisible(False)
+
         layout.addWidget(self.magnifier_btn)
         layout.addWidget(self.dictionary_btn)
+        layout.addWidget(self.batch_btn)
         self.setLayout(layout)
 
         # 设置样式
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50; /* 更显眼的绿色背景 */
-                border-radius: 36px; /* 调整为按钮大小的一半，保持圆形 */
-                border: 2px solid #2E7D32; /* 深绿色边框 */
-                color: white; /* 白色文字 */
-            }
-            QPushButton:hover {
-                background-color: #66BB6A; /* 悬停时颜色变亮 */
-            }
-            QPushButton:pressed {
-                background-color: #388E3C; /* 按下时颜色变深 */
-            }
-        """)
+        self.setStyleSheet(FLOATING_BUTTONS_STYLE)
 
         # 根据DPI缩放调整按钮大小
         button_size = int(27 * self.dpi_scale)  # 基础大小 * DPI缩放
@@ -135,6 +216,17 @@ class FloatingButtons(QWidget):
         self.dictionary_btn.setIconSize(QSize(icon_size, icon_size))
         self.dictionary_btn.setFixedSize(button_size, button_size)
 
+        self.batch_btn.setFixedSize(button_size, button_size)
+
+    def set_batch_visible(self, visible):
+        if self.batch_btn.isVisible() != visible:
+            self.batch_btn.setVisible(visible)
+            self.adjustSize()
+
+    def closeEvent(self, event):
+        self.closed.emit()
+        event.accept()
+
     def on_magnifier_clicked(self):
         self.magnifier_clicked.emit(self.selected_text)
         self.close()
@@ -143,6 +235,10 @@ class FloatingButtons(QWidget):
         self.dictionary_clicked.emit(self.selected_text)
         self.close()
 
+    def on_batch_clicked(self):
+        self.batch_clicked.emit(self.selected_text)
+        self.close()
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self.dragPosition = event.globalPos() - self.frameGeometry().topLeft()
@@ -162,9 +258,23 @@ class FloatingButtons(QWidget):
 class ResultWindow(QWidget):
     """结果显示窗口"""
 
-    def __init__(self, title, content, parent=None):
+    closed = pyqtSignal()
+    # 参数为追问的内容
+    followup_requested = pyqtSignal(str)
+    # 本地结果（离线词典、无需翻译的内容）中点击“询问AI”
+    ask_ai_requested = pyqtSignal()
+
+    def __init__(self, title, content, config_store, parent=None):
         super().__init__(parent, Qt.WindowStaysOnTopHint)
         self.setWindowTitle(title)
+        self.config_store = config_store
+        self.is_closed = False
+        # 当前显示的请求，窗口关闭时据此取消
+        self.request_id = None
+        # 可追问时为Conversation，批量和分段结果不支持追问
+        self.conversation = None
+        # 显示本地结果时为选中的文本，可再询问AI
+        self.offline_text = None
 
         # 获取DPI缩放因子
         screen = QApplication.primaryScreen()
@@ -179,13 +289,10 @@ class ResultWindow(QWidget):
         scaled_height = int(base_height * self.dpi_scale)
 
         self.setMinimumSize(scaled_width, scaled_height)
+        self.default_size = QSize(scaled_width, scaled_height)
 
-        # 从设置中读取窗口大小
-        settings = QSettings(SETTINGS_FILE, QSettings.IniFormat)
-        size = settings.value(
-            f"result_window_size_{title}", QSize(scaled_width, scaled_height)
-        )
-        self.resize(size)
+        # 从内存中的配置读取窗口大小
+        self.resize(config_store.window_size(title, self.default_size))
 
         # 初始化UI
         layout = QVBoxLayout()
@@ -201,24 +308,148 @@ class ResultWindow(QWidget):
         # 确保内容可见
         self.result_text.setVisible(True)
         self.result_text.ensureCursorVisible()
-
-        layout.addWidget(self.result_text)
+        self.pending = False
+
+        # 思考过程（默认折叠）
+        self.reasoning_button = QPushButton("▶ 思考过程")
+        self.reasoning_button.setFlat(True)
+        self.reasoning_button.setVisible(False)
+        self.reasoning_button.clicked.connect(self.toggle_reasoning)
+        self.reasoning_text = QTextEdit()
+        self.reasoning_text.setReadOnly(True)
+        self.reasoning_text.setFont(QFont("Microsoft YaHei", 10))
+        self.reasoning_text.setVisible(False)
+
+        # 耗时明细（可在设置中开启）
+        self.footer = QLabel()
+        self.footer.setStyleSheet("color: #888888;")
+        self.footer.setWordWrap(True)
+        self.footer.setVisible(False)
+
+        # 追问输入框
+        self.followup_input = QLineEdit()
+        self.followup_input.setPlaceholderText("继续追问，按回车发送")
+        self.followup_input.returnPressed.connect(self.submit_followup)
+        self.followup_button = QPushButton("发送")
+        self.followup_button.clicked.connect(self.submit_followup)
+        followup_layout = QHBoxLayout()
+        followup_layout.addWidget(self.followup_input, 1)
+        followup_layout.addWidget(self.followup_button)
+        self.followup_row = QWidget()
+        self.followup_row.setLayout(followup_layout)
+        self.followup_row.setVisible(False)
+
+        self.ask_ai_button = QPushButton("询问AI")
+        self.ask_ai_button.setVisible(False)
+        self.ask_ai_button.clicked.connect(self.ask_ai_requested)
+
+        layout.addWidget(self.reasoning_button, 0, Qt.AlignLeft)
+        layout.addWidget(self.reasoning_text)
+        layout.addWidget(self.result_text, 1)
+        layout.addWidget(self.footer)
+        layout.addWidget(self.followup_row)
+        layout.addWidget(self.ask_ai_button, 0, Qt.AlignRight)
         self.setLayout(layout)
 
         # 设置样式
-        self.setStyleSheet("""
-            QTextEdit {
-                border: 1px solid #cccccc;
-                background-color: #ffffff;
-                padding: 10px;
-                line-height: 1.6;
-            }
-        """)
+        self.setStyleSheet(RESULT_WINDOW_STYLE)
+
+    def reset(self, title):
+        """复用窗口显示新的结果：恢复标题、大小并清空上次的内容"""
+        self.setWindowTitle(title)
+        self.resize(self.config_store.window_size(title, self.default_size))
+        self.is_closed = False
+        self.request_id = None
+        self.set_content("")
+        self.reasoning_text.clear()
+        self.reasoning_text.setVisible(False)
+        self.reasoning_button.setVisible(False)
+        self.reasoning_button.setText("▶ 思考过程")
+        self.footer.setVisible(False)
+        self.set_conversation(None)
+        self.set_offline_text(None)
+
+    def set_offline_text(self, text):
+        """显示本地结果时记录选中的文本，并显示“询问AI”按钮"""
+        self.offline_text = text
+        self.ask_ai_button.setVisible(text is not None)
+
+    def set_conversation(self, conversation):
+        """设置窗口中的对话，有对话时显示追问输入框"""
+        self.conversation = conversation
+        self.followup_input.clear()
+        self.followup_row.setVisible(conversation is not None)
+
+    def is_following_up(self):
+        return self.conversation is not None and self.conversation.pending is not None
+
+    def submit_followup(self):
+        """发送追问：需等上一次回答完成"""
+        question = self.followup_input.text().strip()
+        conversation = self.conversation
+        if (
+            not question
+            or conversation is None
+            or conversation.answer is None
+            or self.is_following_up()
+        ):
+            return
+        self.followup_input.clear()
+        self.followup_requested.emit(question)
+
+    def begin_followup(self, question):
+        """显示追问，之后的回答以流式追加在后面"""
+        self.footer.setVisible(False)
+        self.set_content(f"{self.conversation.render()}\n\n> {question}\n\n")
+
+    def set_pending(self, running):
+        """显示等待状态：排队中或正在请求"""
+        self.set_content("正在请求..." if running else "排队中...")
+        self.pending = True
+
+    def set_content(self, content):
+        """替换显示内容"""
+        if self.is_closed:
+            return
+        self.pending = False
+        self.result_text.setPlainText(content)
+        self.result_text.moveCursor(QTextCursor.End)
+
+    def append_content(self, delta):
+        """在末尾追加新增内容（流式输出时逐段调用）"""
+        if self.is_closed:
+            return
+        if self.pending:
+            self.set_content(delta)
+            return
+        self.result_text.moveCursor(QTextCursor.End)
+        self.result_text.insertPlainText(delta)
+
+    def append_reasoning(self, delta):
+        """追加思考过程，有内容时显示折叠按钮"""
+        if self.is_closed:
+            return
+        self.reasoning_button.setVisible(True)
+        self.reasoning_text.moveCursor(QTextCursor.End)
+        self.reasoning_text.insertPlainText(delta)
+
+    def set_footer(self, text):
+        """在窗口底部显示耗时明细"""
+        if self.is_closed:
+            return
+        self.footer.setText(text)
+        self.footer.setVisible(True)
+
+    def toggle_reasoning(self):
+        visible = not self.reasoning_text.isVisible()
+        self.reasoning_text.setVisible(visible)
+        self.reasoning_button.setText(("▼" if visible else "▶") + " 思考过程")
 
     def closeEvent(self, event):
-        """窗口关闭时保存大小"""
-        settings = QSettings(SETTINGS_FILE, QSettings.IniFormat)
-        settings.setValue(f"result_window_size_{self.windowTitle()}", self.size())
+        """窗口关闭时记录大小，稍后批量写入配置文件"""
+        self.config_store.set_window_size(self.windowTitle(), self.size())
+        self.is_closed = True
+        self.closed.emit()
         event.accept()
 
     def initUI(self, content):
@@ -253,11 +484,12 @@ class ResultWindow(QWidget):
 class SettingsDialog(QDialog):
     """设置对话框"""
 
-    def __init__(self, parent=None):
+    def __init__(self, config_store, parent=None):
         super().__init__(parent)
         self.setWindowTitle("设置")
         self.setMinimumSize(500, 400)
-        self.settings = QSettings(SETTINGS_FILE, QSettings.IniFormat)
+        self.config_store = config_store
+        self.settings = config_store.settings
 
         # 从设置中读取窗口大小和位置
         size = self.settings.value("settings_dialog_size", QSize(500, 400))
@@ -286,8 +518,12 @@ class SettingsDialog(QDialog):
         dictionary_layout = QVBoxLayout()
         dictionary_label = QLabel("词典按钮提示词：")
         self.dictionary_prompt = QTextEdit()
+        self.offline_dict_checkbox = QCheckBox(
+            "单词和短语优先查询离线词典（需先构建词典索引）"
+        )
         dictionary_layout.addWidget(dictionary_label)
         dictionary_layout.addWidget(self.dictionary_prompt)
+        dictionary_layout.addWidget(self.offline_dict_checkbox)
         self.dictionary_tab.setLayout(dictionary_layout)
 
         # AI模型标签页（修改部分）
@@ -318,6 +554,9 @@ class SettingsDialog(QDialog):
         api_url_layout.setContentsMargins(0, 0, 0, 0)
         api_url_label = QLabel("API URL：")
         self.api_url_input = QTextEdit()
+        self.api_url_input.setPlaceholderText(
+            "多个地址每行一个，请求在各地址间自动分配"
+        )
         self.api_url_input.setMaximumHeight(60)
         api_url_layout.addWidget(api_url_label)
         api_url_layout.addWidget(self.api_url_input)
@@ -330,10 +569,46 @@ class SettingsDialog(QDialog):
         model_name_layout.addWidget(model_name_label)
         model_name_layout.addWidget(self.model_name_input)
 
+        # 流式输出设置
+        self.stream_checkbox = QCheckBox("流式输出（边生成边显示）")
+        # 思考过程显示设置
+        self.reasoning_checkbox = QCheckBox("显示模型的思考过程（默认折叠）")
+        # 连接预热设置
+        self.prewarm_checkbox = QCheckBox("悬浮按钮出现时预先建立连接")
+        # 结果缓存设置
+        self.cache_checkbox = QCheckBox("缓存结果（重复选中相同文本时直接显示）")
+        # 选中文本整理设置
+        self.normalize_checkbox = QCheckBox(
+            "整理选中文本（合并PDF和网页中的断行，去掉多余空白和页眉页脚）"
+        )
+        # 批量模式设置
+        self.batch_checkbox = QCheckBox("批量模式（多段选中文本合并为一次请求）")
+        # 耗时明细设置
+        self.timing_footer_checkbox = QCheckBox(
+            "在结果窗口底部显示耗时明细（网络、加载模型、生成等）"
+        )
+
+        # 预取设置
+        prefetch_layout = QHBoxLayout()
+        prefetch_label = QLabel("预取：")
+        self.prefetch_combo = QComboBox()
+        for mode, label in PREFETCH_MODE_LABELS.items():
+            self.prefetch_combo.addItem(label, mode)
+        prefetch_layout.addWidget(prefetch_label)
+        prefetch_layout.addWidget(self.prefetch_combo)
+
         ai_model_layout.addLayout(provider_layout)
         ai_model_layout.addWidget(self.api_key_container)
         ai_model_layout.addWidget(self.api_url_container)
         ai_model_layout.addLayout(model_name_layout)
+        ai_model_layout.addWidget(self.stream_checkbox)
+        ai_model_layout.addWidget(self.reasoning_checkbox)
+        ai_model_layout.addWidget(self.prewarm_checkbox)
+        ai_model_layout.addWidget(self.cache_checkbox)
+        ai_model_layout.addWidget(self.normalize_checkbox)
+        ai_model_layout.addWidget(self.batch_checkbox)
+        ai_model_layout.addWidget(self.timing_footer_checkbox)
+        ai_model_layout.addLayout(prefetch_layout)
         ai_model_layout.addStretch(1)
         self.ai_model_tab.setLayout(ai_model_layout)
 
@@ -369,26 +644,26 @@ class SettingsDialog(QDialog):
         self.model_name_input.setPlainText(model_name)
 
     def loadSettings(self):
-        magnifier_prompt = self.settings.value(
-            "magnifier_prompt", DEFAULT_MAGNIFIER_PROMPT
-        )
-        dictionary_prompt = self.settings.value(
-            "dictionary_prompt", DEFAULT_DICTIONARY_PROMPT
-        )
-        api_url = self.settings.value("ai_api_url", AI_API_URL)
-        provider = self.settings.value("ai_provider", "Ollama")
-        # 根据当前提供方加载对应的API Key
-        api_key = self.settings.value(f"ai_api_key_{provider}", "")
-        # 按提供方获取对应的模型名
-        model_name = self.settings.value(
-            f"ai_model_{provider}", DEFAULT_MODELS.get(provider)
-        )
-
-        self.magnifier_prompt.setText(magnifier_prompt)
-        self.dictionary_prompt.setText(dictionary_prompt)
-        self.api_url_input.setText(api_url)
-        self.api_key_input.setText(api_key)
-        self.model_name_input.setText(model_name)
+        config = self.config_store.config
+        provider = config.provider
+
+        self.magnifier_prompt.setText(config.magnifier_prompt)
+        self.dictionary_prompt.setText(config.dictionary_prompt)
+        self.offline_dict_checkbox.setChecked(config.offline_dict_enabled)
+        self.api_url_input.setText(config.api_url)
+        # 当前提供方对应的API Key和模型名
+        self.api_key_input.setText(config.api_key)
+        self.model_name_input.setText(config.model_name)
+        self.stream_checkbox.setChecked(config.stream)
+        self.reasoning_checkbox.setChecked(config.show_reasoning)
+        self.prewarm_checkbox.setChecked(config.prewarm)
+        self.cache_checkbox.setChecked(config.cache_enabled)
+        self.normalize_checkbox.setChecked(config.normalize_selection)
+        self.batch_checkbox.setChecked(config.batch_enabled)
+        self.timing_footer_checkbox.setChecked(config.show_timing_footer)
+        prefetch_index = self.prefetch_combo.findData(config.prefetch_mode)
+        if prefetch_index != -1:
+            self.prefetch_combo.setCurrentIndex(prefetch_index)
 
         index = self.provider_combo.findText(provider)
         if index != -1:
@@ -402,6 +677,9 @@ class SettingsDialog(QDialog):
         self.settings.setValue(
             "dictionary_prompt", self.dictionary_prompt.toPlainText()
         )
+        self.settings.setValue(
+            "offline_dict_enabled", self.offline_dict_checkbox.isChecked()
+        )
         self.settings.setValue("ai_api_url", self.api_url_input.toPlainText())
         # 按提供方分别存储API Key
         self.settings.setValue(
@@ -412,18 +690,179 @@ class SettingsDialog(QDialog):
             f"ai_model_{current_provider}", self.model_name_input.toPlainText()
         )
         self.settings.setValue("ai_provider", current_provider)
+        self.settings.setValue("ai_stream", self.stream_checkbox.isChecked())
+        self.settings.setValue("show_reasoning", self.reasoning_checkbox.isChecked())
+        self.settings.setValue("ai_prewarm", self.prewarm_checkbox.isChecked())
+        self.settings.setValue("cache_enabled", self.cache_checkbox.isChecked())
+        self.settings.setValue(
+            "normalize_selection", self.normalize_checkbox.isChecked()
+        )
+        self.settings.setValue("batch_enabled", self.batch_checkbox.isChecked())
+        self.settings.setValue(
+            "show_timing_footer", self.timing_footer_checkbox.isChecked()
+        )
+        self.settings.setValue("prefetch_mode", self.prefetch_combo.currentData())
         self.settings.setValue("settings_dialog_size", self.size())
         self.settings.setValue("settings_dialog_pos", self.pos())
         self.settings.sync()
-
-        print("[Settings] 保存设置:")
-        print(f"  - AI提供方: {current_provider}")
-        print(f"  - 模型名称: {self.model_name_input.toPlainText()}")
-        print(f"  - API URL: {self.api_url_input.toPlainText()}")
+        # 整体更新内存中的配置并通知各组件
+        self.config_store.reload()
+
+        logger.info(
+            "[Settings] 保存设置: AI提供方=%s, 模型名称=%s, API URL=%s",
+            current_provider,
+            self.model_name_input.toPlainText(),
+            self.api_url_input.toPlainText(),
+        )
 
         self.accept()
 
 
+class PerformanceDialog(QDialog):
+    """性能面板，显示各阶段耗时的分位数以及请求层各组件的统计"""
+
+    def __init__(self, app=None, parent=None):
+        super().__init__(parent)
+        # 各组件在启动后分阶段创建，刷新时再从应用中读取
+        self.app = app
+        self.setWindowTitle("性能")
+        self.setMinimumSize(560, 360)
+
+        layout = QVBoxLayout()
+        self.report = QPlainTextEdit()
+        self.report.setReadOnly(True)
+        self.report.setFont(QFont("Consolas", 10))
+        layout.addWidget(self.report)
+
+        button_layout = QHBoxLayout()
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        button_layout.addStretch(1)
+        button_layout.addWidget(refresh_btn)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+        self.refresh()
+
+    def component(self, name):
+        return getattr(self.app, name, None)
+
+    def refresh(self):
+        sections = [
+            self.trace_section(),
+            self.server_timing_section(),
+            self.endpoint_section(),
+            self.warmup_section(),
+            self.hedge_section(),
+            self.strategy_section(),
+            f"启动耗时\n{profiler.report()}",
+        ]
+        self.report.setPlainText("\n\n".join(filter(None, sections)))
+
+    def trace_section(self):
+        stats = tracer.percentiles()
+        if not stats:
+            return "暂无数据"
+        lines = [f"{'流程/阶段':<32}{'次数':>6}{'p50':>10}{'p95':>10}{'p99':>10}"]
+        for (kind, name), values in sorted(stats.items()):
+            lines.append(
+                f"{kind + '/' + name:<32}{values['count']:>6}"
+                f"{values['p50']:>9.1f}ms{values['p95']:>8.1f}ms"
+                f"{values['p99']:>8.1f}ms"
+            )
+        return "\n".join(lines)
+
+    def server_timing_section(self):
+        server_timings = self.component("server_timings")
+        summary = server_timings.summary() if server_timings is not None else {}
+        if not summary:
+            return ""
+        lines = ["请求耗时组成（中位数）"]
+        for (provider, model), values in sorted(summary.items()):
+            parts = [
+                f"{COMPONENT_NAMES.get(name, '总计')} {values[name]:.0f}ms"
+                for name in ("total",) + COMPONENTS
+                if values[name] is not None
+            ]
+            for field, label in (
+                ("tokens_per_sec", "生成速度"),
+                ("prompt_tokens_per_sec", "提示词速度"),
+            ):
+                if values[field]:
+                    parts.append(f"{label} {values[field]:.1f} tok/s")
+            lines.append(
+                f"  {provider}/{model}（{values['count']}次）: " + "  ".join(parts)
+            )
+            if values["followups"]:
+                prompt = values["followup_prompt"]
+                lines.append(
+                    f"    追问{values['followups']}次: 处理提示词 "
+                    + ("-" if prompt is None else f"{prompt:.0f}ms")
+                    + f"，{values['followup_prompt_tokens'] or 0}个token"
+                )
+        return "\n".join(lines)
+
+    def endpoint_section(self):
+        session_pool = self.component("session_pool")
+        endpoints = session_pool.balancer.stats() if session_pool is not None else {}
+        if len(endpoints) <= 1 and all(
+            endpoint["state"] == "closed" for endpoint in endpoints.values()
+        ):
+            return ""
+        lines = ["服务地址"]
+        for url, endpoint in endpoints.items():
+            latency = endpoint["latency_ms"]
+            lines.append(
+                f"  {url}  {endpoint['state']}  进行中{endpoint['outstanding']}  "
+                f"请求{endpoint['requests']}  失败{endpoint['errors']}  "
+                + ("延迟 -" if latency is None else f"延迟 {latency:.0f}ms")
+            )
+        return "\n".join(lines)
+
+    def warmup_section(self):
+        model_warmer = self.component("model_warmer")
+        warmup = model_warmer.stats() if model_warmer is not None else None
+        if not warmup or not (warmup["requests"] or warmup["warmups"]):
+            return ""
+        return (
+            f"模型预热: 预热{warmup['warmups']}次（其中加载模型"
+            f"{warmup['cold_warmups']}次），请求{warmup['requests']}次中"
+            f"冷启动{warmup['cold_starts']}次"
+        )
+
+    def hedge_section(self):
+        hedger = self.component("hedger")
+        hedge = hedger.stats() if hedger is not None else None
+        if not hedge or not hedge["requests"]:
+            return ""
+        return (
+            f"对冲请求: 共{hedge['requests']}次，"
+            f"超时发出备用请求{hedge['hedged']}次，同时请求{hedge['raced']}次，"
+            f"备用服务胜出{hedge['backup_wins']}次"
+        )
+
+    def strategy_section(self):
+        strategy_cache = self.component("strategy_cache")
+        stats = strategy_cache.stats() if strategy_cache is not None else {}
+        if not stats:
+            return ""
+        lines = ["选中文本提取（按控件类型）"]
+        # 只列出尝试次数最多的控件类型
+        ranked = sorted(
+            stats.items(), key=lambda item: -(item[1]["hits"] + item[1]["misses"])
+        )
+        for key, entry in ranked[:10]:
+            attempts = entry["hits"] + entry["misses"]
+            lines.append(
+                f"  {key}  命中率 {entry['hit_rate']:.0%}（{entry['hits']}/{attempts}）"
+                f"  {entry['strategy'] or '未找到有效策略'}"
+            )
+        return "\n".join(lines)
+
+
 # 使用新的TextExtractor类替代原来的ClipboardMonitor类
 
 
@@ -433,28 +872,215 @@ class ClickNowApp(QApplication):
     def __init__(self, argv):
         super().__init__(argv)
         self.setQuitOnLastWindowClosed(False)
-        self.settings = QSettings(SETTINGS_FILE, QSettings.IniFormat)
-
-        # 初始化系统托盘
-        self.init_tray()
+        # 仅输出启动报告后退出，供启动耗时检查使用
+        self.startup_report = "--startup-report" in argv
+
+        with profiler.phase("config"):
+            # 配置只在启动时读取一次，之后由ConfigStore在内存中维护
+            self.config_store = ConfigStore(SETTINGS_FILE, self)
+            self.config_store.changed.connect(self.on_config_changed)
+            self.aboutToQuit.connect(self.config_store.flush)
+            config = self.config
+
+            # 日志默认只输出警告，调试时可在配置文件中设置log_level=DEBUG
+            logging.basicConfig(
+                level=config.log_level,
+                format="%(asctime)s [%(name)s] %(levelname)s %(message)s",
+            )
+            tracer.configure(TRACE_FILE, enabled=config.tracing_enabled)
+            self.aboutToQuit.connect(tracer.flush)
 
-        # 初始化文本提取器
-        self.clipboard_monitor = TextExtractor()
-        self.clipboard_monitor.text_selected.connect(self.on_text_selected)
+        # 先显示托盘图标，其余组件在事件循环开始后分阶段初始化
+        with profiler.phase("tray"):
+            self.init_tray()
+        profiler.mark("tray_visible")
 
-        # 悬浮按钮和结果窗口
+        # 悬浮按钮和结果窗口，预先创建并复用
         self.floating_buttons = None
         self.result_window = None
+        self.result_window_pool = WindowPool(self.create_result_window)
         self.settings_dialog = None  # 添加设置对话框变量
+        self.performance_dialog = None
+        self.result_windows = {}
+        self.request_traces = {}
+        # 请求ID -> 耗时记录，请求完成时由工作线程填入
+        self.request_timings = {}
+
+        # 批量模式：请求ID -> BatchJob
+        self.batch_jobs = {}
+        self.last_selection = ""
+        self.batch_hotkey = None
+
+        # 长文本分段请求：请求ID -> ChunkedJob
+        self.chunk_jobs = {}
+
+        # 离线词典，开启后在启动完成时打开
+        self.offline_dictionary = None
+        # 最近一次选中文本的分类：(文本, Classification)
+        self.last_classification = None
+
+        QTimer.singleShot(0, self.start_services)
+
+    def start_services(self):
+        """托盘显示后初始化文本提取、请求执行和缓存等组件"""
+        config = self.config
+
+        # 初始化 COM（仅Windows，其他平台上只用于无界面测试）
+        if sys.platform == "win32":
+            with profiler.phase("com"):
+                import pythoncom
+
+                pythoncom.CoInitialize()
+
+        with profiler.phase("extractor"):
+            # 初始化文本提取器
+            # 提取策略按控件类型持久化，重启后仍能直接使用
+            self.strategy_cache = StrategyCache(STRATEGY_FILE)
+            self.clipboard_monitor = TextExtractor(
+                create_event_source(config.input_source),
+                AutomationWorker(lambda: UIAutomationBackend(self.strategy_cache)),
+            )
+            self.aboutToQuit.connect(self.clipboard_monitor.event_source.stop)
+            self.aboutToQuit.connect(self.clipboard_monitor.automation.stop)
+            self.clipboard_monitor.text_selected.connect(self.on_text_selected)
+
+        with profiler.phase("requests"):
+            # 后台请求执行器，避免网络请求阻塞界面
+            self.request_executor = RequestExecutor(parent=self)
+            self.request_executor.request_started.connect(self.on_request_started)
+            self.request_executor.chunk_received.connect(self.on_request_chunk)
+            self.request_executor.request_finished.connect(self.on_request_finished)
+            self.aboutToQuit.connect(self.request_executor.cancel_all)
+
+            # 按提供方复用的HTTP连接池，网络库在首次使用或空闲时才导入
+            self.session_pool = SessionPool(config.pool_size)
+            self.aboutToQuit.connect(self.session_pool.close)
+            # 主服务首字节过慢时向备用服务发出对冲请求
+            self.hedger = Hedger(self.session_pool)
+            # 保持Ollama模型常驻内存，并统计冷启动
+            self.model_warmer = ModelWarmer(self.session_pool, self)
+            # 每次请求的耗时组成，按提供方和模型汇总并写入本地文件
+            self.server_timings = TimingRecorder(TIMING_FILE)
+            self.aboutToQuit.connect(self.server_timings.flush)
+
+        with profiler.phase("cache"):
+            # 结果缓存，重复选中的文本直接显示
+            self.response_cache = ResponseCache(
+                CACHE_FILE,
+                ttl=config.cache_ttl_days * 24 * 3600,
+                disk_entries=config.cache_max_entries,
+            )
+            self.aboutToQuit.connect(self.response_cache.close)
+
+            # 悬浮按钮显示期间的预取请求
+            self.prefetcher = Prefetcher(config.prefetch_budget_per_hour)
+
+        self.update_batch_hotkey(config)
+
+        # 预建窗口，首次选中文本时无需等待构建
+        with profiler.phase("windows"):
+            self.prebuild_windows()
+        profiler.mark("services_ready")
+
+        QTimer.singleShot(
+            0 if self.startup_report else NETWORK_WARMUP_DELAY, self.warm_up_network
+        )
+
+    def warm_up_network(self):
+        """空闲时导入网络库，首次请求时无需再等待导入"""
+        with profiler.phase("network_import"):
+            load_http_client()
+        profiler.finish()
+        self.server_timings.load()
+        self.model_warmer.configure(self.config)
+        self.open_offline_dictionary(self.config)
+        if self.startup_report:
+            print(json.dumps(profiler.as_dict(), ensure_ascii=False))
+            self.quit()
+
+    def prebuild_windows(self):
+        if self.floating_buttons is None:
+            self.floating_buttons = self.create_floating_buttons()
+        self.result_window_pool.prebuild()
+
+    def create_floating_buttons(self):
+        floating_buttons = FloatingButtons()
+        floating_buttons.magnifier_clicked.connect(self.on_magnifier_clicked)
+        floating_buttons.dictionary_clicked.connect(self.on_dictionary_clicked)
+        floating_buttons.batch_clicked.connect(self.add_to_batch)
+        floating_buttons.closed.connect(self.release_prefetch)
+        return floating_buttons
+
+    def create_result_window(self):
+        result_window = ResultWindow("", "", self.config_store)
+        result_window.closed.connect(
+            lambda: self.on_result_window_closed(result_window)
+        )
+        result_window.followup_requested.connect(
+            lambda question: self.on_followup_requested(result_window, question)
+        )
+        result_window.ask_ai_requested.connect(
+            lambda: self.show_ai_result(
+                "翻译结果",
+                self.config.dictionary_prompt,
+                result_window.offline_text,
+                result_window,
+            )
+        )
+        return result_window
+
+    @property
+    def config(self):
+        """当前配置快照"""
+        return self.config_store.config
+
+    def on_config_changed(self, config):
+        """配置变化时更新可在运行中调整的组件"""
+        logging.getLogger().setLevel(config.log_level)
+        tracer.configure(TRACE_FILE, enabled=config.tracing_enabled)
+        self.prefetcher.budget_per_hour = config.prefetch_budget_per_hour
+        self.batch_queue.set_max_wait(config.batch_max_wait)
+        self.batch_queue.max_items = config.batch_max_items
+        self.update_batch_hotkey(config)
+        self.model_warmer.configure(config)
+        self.open_offline_dictionary(config)
+        logger.info(
+            "[Config] 已应用新配置: AI提供方=%s, 模型名称=%s",
+            config.provider,
+            config.model_name,
+        )
+
+    def open_offline_dictionary(self, config):
+        """按配置打开或关闭离线词典，索引通过mmap映射，打开只需常数时间"""
+        path = (
+            (config.offline_dict_path or DICTIONARY_FILE)
+            if (config.offline_dict_enabled)
+            else None
+        )
+        dictionary = self.offline_dictionary
+        if dictionary is not None and dictionary.path == path:
+            return
+        if dictionary is not None:
+            dictionary.close()
+            self.offline_dictionary = None
+        if path is None:
+            return
+        try:
+            self.offline_dictionary = OfflineDictionary(path)
+            logger.debug(
+                "[Dictionary] 已打开离线词典: %s（%s条记录）",
+                path,
+                len(self.offline_dictionary),
+            )
+        except (OSError, ValueError) as e:
+            logger.warning("[Dictionary] 打开离线词典失败: %s", e)
 
     def init_tray(self):
         # 创建系统托盘图标
         self.tray_icon = QSystemTrayIcon(self)
-        icon_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
-        icon_path = os.path.join(icon_dir, "app_icon.png")
 
         # 预先加载图标，避免每次显示菜单时加载
-        self.app_icon = QIcon(icon_path)
+        self.app_icon = load_icon("app_icon.png")
         self.tray_icon.setIcon(self.app_icon)
         self.tray_icon.setToolTip(APP_NAME)
 
@@ -464,10 +1090,29 @@ class ClickNowApp(QApplication):
         settings_action = QAction("设置", self)
         settings_action.triggered.connect(self.show_settings)
 
+        cache_action = QAction("缓存统计", self)
+        cache_action.triggered.connect(self.show_cache_stats)
+
+        performance_action = QAction("性能", self)
+        performance_action.triggered.connect(self.show_performance)
+
+        # 批量队列，发送入口放在托盘菜单
+        self.batch_queue = BatchQueue(
+            self.config.batch_max_items, self.config.batch_max_wait, parent=self
+        )
+        self.batch_queue.ready.connect(self.flush_batch)
+        self.batch_queue.changed.connect(self.update_batch_action)
+        self.batch_action = QAction(self)
+        self.batch_action.triggered.connect(self.flush_batch)
+        self.update_batch_action(0)
+
         exit_action = QAction("退出", self)
         exit_action.triggered.connect(self.quit)
 
+        self.tray_menu.addAction(self.batch_action)
         self.tray_menu.addAction(settings_action)
+        self.tray_menu.addAction(cache_action)
+        self.tray_menu.addAction(performance_action)
         self.tray_menu.addSeparator()
         self.tray_menu.addAction(exit_action)
 
@@ -477,11 +1122,43 @@ class ClickNowApp(QApplication):
     def show_settings(self):
         """显示设置对话框"""
         if not hasattr(self, "settings_dialog") or not self.settings_dialog:
-            self.settings_dialog = SettingsDialog()
+            self.settings_dialog = SettingsDialog(self.config_store)
         self.settings_dialog.show()
         self.settings_dialog.raise_()  # 确保窗口在最前面
         self.settings_dialog.activateWindow()  # 激活窗口
 
+    def show_performance(self):
+        """显示性能面板"""
+        if not self.performance_dialog:
+            self.performance_dialog = PerformanceDialog(self)
+        self.performance_dialog.refresh()
+        self.performance_dialog.show()
+        self.performance_dialog.raise_()
+        self.performance_dialog.activateWindow()
+
+    def show_cache_stats(self):
+        """显示缓存统计，并询问是否清空缓存"""
+        stats = self.response_cache.stats()
+        prefetch = self.prefetcher.stats()
+        message = (
+            f"内存缓存条目: {stats['memory_entries']}\n"
+            f"磁盘缓存条目: {stats['disk_entries']}"
+            f"（{stats['disk_bytes'] / 1024:.1f} KB）\n"
+            f"命中: {stats['hits']}（其中磁盘 {stats['disk_hits']}）\n"
+            f"未命中: {stats['misses']}\n"
+            f"命中率: {stats['hit_rate']:.1%}\n\n"
+            f"预取请求: {prefetch['started']}，被使用: {prefetch['hits']}，"
+            f"浪费: {prefetch['wasted']}（使用率 {prefetch['hit_rate']:.1%}）\n"
+            f"因超出预算跳过: {prefetch['over_budget']}\n\n"
+            "是否清空缓存？"
+        )
+        reply = QMessageBox.question(
+            None, "缓存统计", message, QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.response_cache.clear()
+            logger.info("[Cache] 已清空缓存")
+
     def on_text_selected(self, text, pos):
         # 如果已有悬浮按钮，先关闭
         if self.floating_buttons and self.floating_buttons.isVisible():
@@ -491,12 +1168,28 @@ class ClickNowApp(QApplication):
         if not text or not text.strip():
             return
 
-        print(f"[Selection] 检测到选中文本: {text[:100]}...")
+        logger.debug("[Selection] 检测到选中文本: %.100s...", text)
+
+        # 超长的选中文本只保留前面部分，避免之后在各组件间反复复制
+        if len(text) > MAX_SELECTION_CHARS:
+            logger.warning(
+                "[Selection] 选中文本过长（%s字符），只处理前%s字符",
+                len(text),
+                MAX_SELECTION_CHARS,
+            )
+            text = text[:MAX_SELECTION_CHARS]
+
+        text = self.prepare_selection(text)
+        if not text:
+            return
 
-        # 创建新的悬浮按钮，始终使用最新选中的文本
-        self.floating_buttons = FloatingButtons(text)
-        self.floating_buttons.magnifier_clicked.connect(self.on_magnifier_clicked)
-        self.floating_buttons.dictionary_clicked.connect(self.on_dictionary_clicked)
+        # 复用悬浮按钮，始终使用最新选中的文本
+        if self.floating_buttons is None:
+            self.floating_buttons = self.create_floating_buttons()
+        self.floating_buttons.retarget(text)
+        self.floating_buttons.set_batch_visible(self.config.batch_enabled)
+        self.last_selection = text
+        self.classify_selection(text)
 
         # 获取屏幕DPI缩放因子
         screen = self.primaryScreen()
@@ -514,162 +1207,595 @@ class ClickNowApp(QApplication):
         self.floating_buttons.move(adjusted_x, adjusted_y)
         self.floating_buttons.show()
 
-    def on_magnifier_clicked(self, text):
-        # 获取放大镜提示词
-        prompt = self.settings.value("magnifier_prompt", DEFAULT_MAGNIFIER_PROMPT)
-        # 打印调试信息
-        prompt = prompt.format(text=text)
+        trace = self.clipboard_monitor.trace
+        if trace is not None:
+            trace.mark("buttons_shown")
+            tracer.finish(trace)
+            self.clipboard_monitor.trace = None
 
-        # 重置剪贴板监视器的last_selected_text，以便下次选中相同文本时也能触发
-        if hasattr(self, "clipboard_monitor") and self.clipboard_monitor:
-            self.clipboard_monitor.last_selected_text = ""
+        # 按钮出现时提前建立连接，用户点击时即可直接发送请求
+        config = self.config
+        if config.prewarm:
+            for endpoint in config.endpoints():
+                self.session_pool.prewarm(config.provider, endpoint)
+        # 模型可能已被卸载时提前加载，点击按钮时无需等待
+        self.model_warmer.on_selection()
 
-        # 调用AI API获取结果（示例实现）
-        result = self.call_ai_api(prompt)
+        # 在用户点击前预先请求可能需要的结果
+        self.prefetch_results(text)
 
-        # 显示结果窗口
-        if self.result_window:
-            self.result_window.close()
+    def on_magnifier_clicked(self, text):
+        # 获取放大镜提示词
+        self.show_ai_result("解释结果", self.config.magnifier_prompt, text)
 
+    def on_dictionary_clicked(self, text):
+        """按选中内容的分类决定是否请求AI，单词和短语先查离线词典"""
+        trace = tracer.begin(REQUEST_TRACE, "click")
+        app_config = self.config
+        action, classification = self.dictionary_action(text)
+        if action == "english":
+            self.show_ai_result(
+                "翻译结果", app_config.reverse_dictionary_prompt, text, trace=trace
+            )
+            return
+        if action in ("skip", "local"):
+            from script_detect import local_answer, skip_message
+
+            answer = local_answer(text, classification) if action == "local" else None
+            self.show_local_result(
+                text, answer or skip_message(classification), trace, "classified"
+            )
+            return
+        entry = self.lookup_offline(text)
+        if entry is not None:
+            self.show_local_result(text, format_entry(entry), trace, "offline_lookup")
+            return
+        # 获取词典提示词
+        self.show_ai_result("翻译结果", app_config.dictionary_prompt, text, trace=trace)
+
+    def prepare_selection(self, text):
+        """按配置整理选中文本并压缩到token预算内，按钮、缓存和预取都使用整理后的文本"""
+        config = self.config
+        if not config.normalize_selection and config.compact_tokens <= 0:
+            return text
+        # 整理模块依赖文字分类，在首次选中文本时才导入，不拖慢启动
+        from selection_text import compact, normalize_selection
+
+        tokens = estimate_tokens(text)
+        if config.normalize_selection:
+            text = normalize_selection(text)
+        text, truncated = compact(text, config.compact_tokens)
+        logger.debug(
+            "[Selection] 整理后约%s个token（原约%s个）%s",
+            estimate_tokens(text),
+            tokens,
+            "，已截断" if truncated else "",
+        )
+        return text
+
+    def classify_selection(self, text):
+        """对选中文本分类，同一文本只计算一次"""
+        cached = self.last_classification
+        if cached is not None and cached[0] == text:
+            return cached[1]
+        # 分类模块在首次选中文本时才导入，不拖慢启动
+        from script_detect import classify
+
+        classification = classify(text)
+        self.last_classification = (text, classification)
+        logger.debug("[Classify] 选中文本分类: %s", classification.label)
+        return classification
+
+    def dictionary_action(self, text):
+        """按分类规则返回词典按钮的处理方式（见dictionary_rules.ACTIONS）和分类"""
+        classification = self.classify_selection(text)
+        rules = parse_rules(self.config.dictionary_rules)
+        return rules.get(classification.label, "ask"), classification
+
+    def show_local_result(self, text, content, trace, mark):
+        """显示无需请求AI的结果，窗口中可再点击“询问AI”"""
+        if trace is not None:
+            trace.mark(mark)
+        result_window = self.open_result_window("翻译结果")
+        result_window.set_offline_text(text)
+        result_window.show()
+        self.render_result(result_window, content, trace)
+
+    def lookup_offline(self, text):
+        """查询离线词典，未开启或查不到时返回None"""
+        if self.offline_dictionary is None:
+            return None
+        return self.offline_dictionary.lookup(text)
+
+    def open_result_window(self, title):
+        """取出一个结果窗口，显示在悬浮按钮或鼠标的位置"""
         # 保存悬浮按钮位置，用于结果窗口显示
         button_pos = None
         if self.floating_buttons:
             button_pos = self.floating_buttons.pos()
 
-        self.result_window = ResultWindow("解释结果", result)
+        result_window = self.result_window_pool.acquire()
+        result_window.reset(title)
+        self.result_window = result_window
 
         # 如果有悬浮按钮位置，则在该位置显示结果窗口，否则在鼠标位置显示
         if button_pos:
-            self.result_window.move(button_pos)
+            result_window.move(button_pos)
         else:
-            self.result_window.move(QCursor.pos() + QPoint(20, 20))
-
-        self.result_window.show()
-
-        # 根据内容自动调整窗口大小
-        self.result_window.adjustSize()
+            result_window.move(QCursor.pos() + QPoint(20, 20))
+        return result_window
 
-    def on_dictionary_clicked(self, text):
-        # 获取词典提示词
-        prompt = self.settings.value("dictionary_prompt", DEFAULT_DICTIONARY_PROMPT)
-        # 打印调试信息
-        prompt = prompt.format(text=text)
+    def show_ai_result(self, title, template, text, result_window=None, trace=None):
+        """打开结果窗口，命中预取或缓存时直接显示，否则在后台线程请求AI结果
 
+        传入result_window时在该窗口中显示，如离线词典结果中点击“询问AI”；
+        trace为调用方已开始的请求追踪
+        """
         # 重置剪贴板监视器的last_selected_text，以便下次选中相同文本时也能触发
         if hasattr(self, "clipboard_monitor") and self.clipboard_monitor:
             self.clipboard_monitor.last_selected_text = ""
 
-        # 调用AI API获取结果（示例实现）
-        result = self.call_ai_api(prompt)
+        if trace is None:
+            trace = tracer.begin(REQUEST_TRACE, "click")
 
-        # 显示结果窗口
-        if self.result_window:
-            self.result_window.close()
+        if result_window is None:
+            result_window = self.open_result_window(title)
+        else:
+            result_window.reset(title)
 
-        # 保存悬浮按钮位置，用于结果窗口显示
-        button_pos = None
-        if self.floating_buttons:
-            button_pos = self.floating_buttons.pos()
+        # 配置在GUI线程取出快照，工作线程只负责网络请求
+        app_config = self.config
+        config = app_config.ai_config()
+        cache_key = make_cache_key(
+            config["provider"], config["model_name"], template, text
+        )
+        prompt = template.format(text=text)
+        long_input = estimate_tokens(text) > app_config.long_input_chunk_tokens
+        if not long_input:
+            result_window.set_conversation(
+                Conversation(
+                    prompt,
+                    config["provider"],
+                    config["model_name"],
+                    app_config.followup_history_tokens,
+                )
+            )
 
-        self.result_window = ResultWindow("翻译结果", result)
+        # 接管悬浮按钮显示期间预先发起的请求
+        entry = self.prefetcher.claim(cache_key)
+        if entry is not None:
+            logger.debug("[Prefetch] 命中预取请求")
+            if entry["reasoning"]:
+                result_window.append_reasoning("".join(entry["reasoning"]))
+            if entry["done"]:
+                result_window.show()
+                self.render_result(result_window, entry["result"], trace)
+                return
+            request_id = entry["request_id"]
+            if entry["chunks"]:
+                result_window.set_content("".join(entry["chunks"]))
+            else:
+                result_window.set_pending(True)
+            result_window.show()
+            self.watch_request(request_id, result_window, trace)
+            return
 
-        # 如果有悬浮按钮位置，则在该位置显示结果窗口，否则在鼠标位置显示
-        if button_pos:
-            self.result_window.move(button_pos)
-        else:
-            self.result_window.move(QCursor.pos() + QPoint(20, 20))
+        if app_config.cache_enabled:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("[Cache] 命中缓存")
+                result_window.show()
+                self.render_result(result_window, cached, trace)
+                return
+
+        result_window.set_pending(False)
+        result_window.show()
 
-        self.result_window.show()
+        if long_input:
+            self.start_chunked_request(
+                result_window, template, text, config, cache_key, trace
+            )
+            return
+
+        request_id = self.start_ai_request(
+            prompt, config, cache_key, trace, result_window.conversation
+        )
+        self.watch_request(request_id, result_window, trace)
+
+    def render_result(self, result_window, content, trace=None):
+        """显示最终结果并结束请求追踪，可追问的窗口显示完整对话"""
+        if result_window.conversation is not None:
+            content = result_window.conversation.finish(content)
+        result_window.set_content(content)
 
         # 根据内容自动调整窗口大小
-        self.result_window.adjustSize()
+        result_window.adjustSize()
+        if trace is not None:
+            trace.mark("rendered")
+            tracer.finish(trace)
+
+    def start_ai_request(
+        self, prompt, config, cache_key, trace=None, conversation=None
+    ):
+        """提交后台AI请求，成功的结果写入缓存；conversation用于记录Ollama返回的context"""
+        cache_enabled = self.config.cache_enabled
+
+        def on_success(result):
+            if cache_enabled:
+                self.response_cache.put(cache_key, result)
+
+        timing = {}
+        request_id = self.request_executor.submit(
+            lambda on_chunk, token: self.call_ai_api(
+                prompt,
+                on_chunk=on_chunk,
+                cancel_token=token,
+                config=config,
+                on_success=on_success,
+                trace=trace,
+                timing=timing,
+                conversation=conversation,
+            )
+        )
+        self.request_timings[request_id] = timing
+        return request_id
+
+    def on_followup_requested(self, result_window, question):
+        """在结果窗口中追问，带上之前的对话，结果不写入缓存"""
+        conversation = result_window.conversation
+        config = self.config.ai_config()
+        # context和历史消息属于当前模型，追问不使用对冲的备用服务
+        config["backup"] = None
+        prompt, history = conversation.ask(
+            question, config["provider"], config["model_name"]
+        )
+        result_window.begin_followup(question)
+        timing = {}
+        request_id = self.request_executor.submit(
+            lambda on_chunk, token: self.call_ai_api(
+                prompt,
+                on_chunk=on_chunk,
+                cancel_token=token,
+                config=config,
+                on_success=conversation.on_success,
+                timing=timing,
+                conversation=conversation,
+                history=history,
+            )
+        )
+        self.request_timings[request_id] = timing
+        self.watch_request(request_id, result_window)
+
+    def start_chunked_request(
+        self, result_window, template, text, config, cache_key, trace=None
+    ):
+        """长文本按段切分后并发请求，按原文顺序显示到结果窗口"""
+        app_config = self.config
+        chunks = split_text(text, app_config.long_input_chunk_tokens)
+        job = ChunkedJob(chunks, template, config, cache_key, trace)
+        job.window = result_window
+        logger.debug("[LongInput] 长文本切分为%s段", len(chunks))
+        # 同时进行的请求数受限，某段完成后再提交下一段
+        for _ in range(max(1, app_config.long_input_parallelism)):
+            self.submit_chunk_request(job)
+
+    def submit_chunk_request(self, job):
+        next_prompt = job.next_prompt()
+        if next_prompt is None:
+            return
+        index, prompt = next_prompt
+        request_id = self.request_executor.submit(
+            lambda on_chunk, token: self.call_ai_api(
+                prompt,
+                on_chunk=on_chunk,
+                cancel_token=token,
+                config=job.config,
+                on_success=lambda result: job.succeeded.add(index),
+            )
+        )
+        job.requests[request_id] = index
+        self.chunk_jobs[request_id] = job
+
+    def on_chunk_request_finished(self, job, request_id, result):
+        """记录分段结果并提交下一段，全部完成后显示完整结果"""
+        index = job.requests.pop(request_id)
+        delta = job.on_finished(index, result)
+        if delta:
+            job.window.append_content(delta)
+        self.submit_chunk_request(job)
+        if not job.done():
+            return
+        if len(job.succeeded) == len(job.chunks) and self.config.cache_enabled:
+            self.response_cache.put(job.cache_key, job.text())
+        self.render_result(job.window, job.text(), job.trace)
+
+    def watch_request(self, request_id, result_window, trace=None):
+        """将请求的输出接到结果窗口，窗口关闭时取消请求"""
+        self.result_windows[request_id] = result_window
+        self.request_traces[request_id] = trace
+        result_window.request_id = request_id
+
+    def on_result_window_closed(self, result_window):
+        """结果窗口关闭时取消其请求，并将窗口归还以便复用"""
+        request_id = result_window.request_id
+        if request_id is not None:
+            # 窗口会被复用，不能再接收旧请求的输出
+            self.result_windows.pop(request_id, None)
+            self.request_traces.pop(request_id, None)
+            self.cancel_request(request_id)
+        for batch_request_id, job in list(self.batch_jobs.items()):
+            if job.window is result_window:
+                del self.batch_jobs[batch_request_id]
+                self.cancel_request(batch_request_id)
+        for chunk_request_id, job in list(self.chunk_jobs.items()):
+            if job.window is result_window:
+                del self.chunk_jobs[chunk_request_id]
+                self.cancel_request(chunk_request_id)
+        self.result_window_pool.release(result_window)
+
+    def prefetch_results(self, text):
+        """悬浮按钮显示期间按设置预先请求解释/翻译结果"""
+        app_config = self.config
+        if app_config.prefetch_mode == "off":
+            return
 
-    def call_ai_api(self, prompt):
+        # 长文本需要分段请求，代价较高，不做预取
+        if estimate_tokens(text) > app_config.long_input_chunk_tokens:
+            return
+
+        config = app_config.ai_config()
+        for kind in PREFETCH_MODES.get(app_config.prefetch_mode, ()):
+            # 无需翻译、改为翻译成英文或离线词典能查到的内容不预取翻译
+            if kind == "dictionary" and (
+                self.dictionary_action(text)[0] != "ask"
+                or self.lookup_offline(text) is not None
+            ):
+                continue
+            template = getattr(app_config, PROMPT_SETTINGS[kind])
+            cache_key = make_cache_key(
+                config["provider"], config["model_name"], template, text
+            )
+            if self.prefetcher.is_tracking(cache_key):
+                continue
+            # 已缓存的结果无需预取
+            if app_config.cache_enabled and self.response_cache.contains(cache_key):
+                continue
+            if not self.prefetcher.allow():
+                logger.debug("[Prefetch] 已超出每小时预取预算")
+                return
+            request_id = self.start_ai_request(
+                template.format(text=text), config, cache_key
+            )
+            self.prefetcher.track(cache_key, request_id)
+            logger.debug("[Prefetch] 预取 %s 结果，请求 #%s", kind, request_id)
+
+    def release_prefetch(self):
+        """悬浮按钮关闭时取消未被使用的预取请求"""
+        self.prefetcher.release(self.cancel_request)
+
+    def cancel_request(self, request_id):
+        """取消请求；被取消的请求不会发出request_finished，其耗时记录在此丢弃"""
+        self.request_timings.pop(request_id, None)
+        self.request_executor.cancel(request_id)
+
+    def on_request_started(self, request_id):
+        result_window = self.result_windows.get(request_id)
+        # 追问时保留之前的对话
+        if result_window and not result_window.is_following_up():
+            result_window.set_pending(True)
+
+    def on_request_chunk(self, request_id, content, reasoning):
+        job = self.chunk_jobs.get(request_id)
+        if job is not None:
+            # 分段请求只显示回答，不显示各段的思考过程
+            if not reasoning:
+                delta = job.on_delta(job.requests[request_id], content)
+                if delta:
+                    job.window.append_content(delta)
+            return
+        self.prefetcher.on_chunk(request_id, content, reasoning)
+        result_window = self.result_windows.get(request_id)
+        if result_window:
+            if reasoning:
+                result_window.append_reasoning(content)
+            else:
+                result_window.append_content(content)
+
+    def on_request_finished(self, request_id, result):
+        job = self.batch_jobs.pop(request_id, None)
+        if job is not None:
+            self.on_batch_request_finished(job, request_id, result)
+            return
+        job = self.chunk_jobs.pop(request_id, None)
+        if job is not None:
+            self.on_chunk_request_finished(job, request_id, result)
+            return
+        self.prefetcher.on_finished(request_id, result)
+        result_window = self.result_windows.pop(request_id, None)
+        trace = self.request_traces.pop(request_id, None)
+        timing = self.request_timings.pop(request_id, None)
+        if result_window:
+            self.render_result(result_window, result, trace)
+            if timing and self.config.show_timing_footer:
+                result_window.set_footer(format_record(timing))
+
+    def update_batch_action(self, count):
+        self.batch_action.setText(f"发送批量（{count}）")
+        self.batch_action.setEnabled(count > 0)
+
+    def update_batch_hotkey(self, config):
+        """按配置注册或注销加入批量队列的全局热键"""
+        hotkey = config.batch_hotkey if config.batch_enabled else ""
+        if self.batch_hotkey is not None:
+            if self.batch_hotkey.hotkey == hotkey:
+                return
+            self.batch_hotkey.stop()
+            self.batch_hotkey = None
+        if not hotkey:
+            return
+        batch_hotkey = GlobalHotkey(hotkey, self)
         try:
-            api_url = self.settings.value("ai_api_url", AI_API_URL)
-            provider = self.settings.value("ai_provider", "Ollama")
-            # 获取当前提供方对应的API Key
-            api_key = self.settings.value(f"ai_api_key_{provider}", "")
-            # 获取当前提供方对应的模型名
-            model_name = self.settings.value(
-                f"ai_model_{provider}", DEFAULT_MODELS.get(provider, DEFAULT_AI_MODEL)
+            batch_hotkey.start()
+        except (OSError, ValueError) as e:
+            logger.warning("[Batch] 注册热键失败: %s", e)
+            return
+        batch_hotkey.triggered.connect(lambda: self.add_to_batch(self.last_selection))
+        self.aboutToQuit.connect(batch_hotkey.stop)
+        self.batch_hotkey = batch_hotkey
+
+    def add_to_batch(self, text):
+        if self.batch_queue.add(text):
+            logger.debug("[Batch] 已加入批量队列: %.100s", text)
+            self.tray_icon.showMessage(
+                APP_NAME,
+                f"已加入批量队列（{len(self.batch_queue.items)}）",
+                QSystemTrayIcon.Information,
+                1500,
             )
 
-            print("[API] 调用AI服务:")
-            print(f"  - 提供方: {provider}")
-            print(f"  - 模型: {model_name}")
-            print(f"  - 提示词: {prompt[:100]}...")
-
-            if provider == "Ollama":
-                print(f"  - 接口URL: {api_url}/api/generate")
-                api_endpoint = f"{api_url}/api/generate"
-                data = {"model": model_name, "prompt": prompt, "stream": False}
-                response = requests.post(api_endpoint, json=data)
-                result = response.json().get("response", "")
-            elif provider == "DeepSeek":
-                print("  - 接口URL: https://api.deepseek.com/v1/chat/completions")
-                api_endpoint = "https://api.deepseek.com/v1/chat/completions"
-                data = {
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                }
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                }
-                response = requests.post(api_endpoint, json=data, headers=headers)
-                result = (
-                    response.json()
-                    .get("choices", [{}])[0]
-                    .get("message", {})
-                    .get("content", "")
-                )
-            elif provider == "OpenAI":
-                print("  - 接口URL: https://api.openai.com/v1/chat/completions")
-                api_endpoint = "https://api.openai.com/v1/chat/completions"
-                data = {
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                }
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                }
-                response = requests.post(api_endpoint, json=data, headers=headers)
-                result = (
-                    response.json()
-                    .get("choices", [{}])[0]
-                    .get("message", {})
-                    .get("content", "")
+    def flush_batch(self):
+        """将队列中的文本合并为一次请求，结果显示在同一个窗口中"""
+        items = self.batch_queue.take()
+        if not items:
+            return
+        app_config = self.config
+        template = getattr(app_config, PROMPT_SETTINGS[app_config.batch_action])
+        # 需要完整回答才能拆分，批量请求不使用流式输出
+        config = dict(app_config.ai_config(), stream=False)
+        job = BatchJob(items, template, config)
+
+        # 已缓存的条目直接使用，不再请求
+        if app_config.cache_enabled:
+            for index, item in enumerate(items):
+                job.results[index] = self.response_cache.get(
+                    self.batch_cache_key(job, index)
                 )
 
-            if response.status_code == 200:
-                # 清理HTML标签
-                if result:
-                    if "<think>" in result:
-                        result = result.split("</think>")[-1].strip()
-                    result = result.replace("<p>", "").replace("</p>", "\n")
-                    result = result.replace("<br>", "\n").replace("<br/>", "\n")
-                    result = result.replace("<div>", "").replace("</div>", "\n")
-                    result = result.replace("<code>", "").replace("</code>", "")
-                    result = result.replace("<pre>", "").replace("</pre>", "\n")
-
-                print("[API] 请求成功")
-                return result
-            else:
-                error_msg = (
-                    f"请求失败: HTTP状态码 {response.status_code}\n{response.text}"
+        result_window = self.result_window_pool.acquire()
+        result_window.reset("批量结果")
+        result_window.move(QCursor.pos() + QPoint(20, 20))
+        job.window = result_window
+        self.result_window = result_window
+
+        missing = job.missing()
+        if len(missing) > 1:
+            prompt = build_batch_prompt(template, [items[index] for index in missing])
+            self.submit_batch_request(job, missing, prompt)
+        elif missing:
+            self.submit_batch_request(
+                job, missing, template.format(text=items[missing[0]])
+            )
+        logger.debug(
+            "[Batch] 发送批量请求: 共%s条，需请求%s条", len(items), len(missing)
+        )
+        result_window.set_content(job.render())
+        result_window.show()
+
+    def batch_cache_key(self, job, index):
+        return make_cache_key(
+            job.config["provider"],
+            job.config["model_name"],
+            job.template,
+            job.items[index],
+        )
+
+    def submit_batch_request(self, job, indices, prompt):
+        request_id = self.request_executor.submit(
+            lambda on_chunk, token: self.call_ai_api(
+                prompt,
+                cancel_token=token,
+                config=job.config,
+                on_success=lambda result: job.succeeded.add(tuple(indices)),
+            )
+        )
+        job.requests[request_id] = indices
+        self.batch_jobs[request_id] = job
+
+    def on_batch_request_finished(self, job, request_id, result):
+        """拆分批量回答，无法拆出的条目逐条重新请求"""
+        indices = job.requests.pop(request_id)
+        succeeded = tuple(indices) in job.succeeded
+        if len(indices) == 1:
+            results = [result]
+        elif succeeded:
+            results = split_batch_answer(result, len(indices))
+        else:
+            results = [None] * len(indices)
+
+        fallback = []
+        for index, item_result in zip(indices, results):
+            if item_result is None:
+                fallback.append(index)
+                continue
+            job.results[index] = item_result
+            if succeeded and self.config.cache_enabled:
+                self.response_cache.put(self.batch_cache_key(job, index), item_result)
+
+        if len(indices) > 1 and fallback:
+            logger.debug("[Batch] %s条结果无法拆分，逐条重新请求", len(fallback))
+            for index in fallback:
+                self.submit_batch_request(
+                    job, [index], job.template.format(text=job.items[index])
+                )
+        if not job.window.is_closed:
+            job.window.set_content(job.render())
+
+    def call_ai_api(
+        self,
+        prompt,
+        on_chunk=None,
+        cancel_token=None,
+        config=None,
+        on_success=None,
+        trace=None,
+        timing=None,
+        conversation=None,
+        history=None,
+    ):
+        """调用AI服务，参数含义见ai_client.request_completion
+
+        请求成功时记录耗时组成，传入timing字典时同时写入其中；
+        传入conversation时记录Ollama返回的context和本次是第几轮对话
+        """
+        config = config or self.config.ai_config()
+
+        def on_stats(endpoint, stats):
+            self.model_warmer.on_request_stats(endpoint, stats)
+            if conversation is not None:
+                conversation.on_stats(stats)
+                stats["turn"] = conversation.turn()
+            record = self.server_timings.record(endpoint, stats)
+            if timing is not None:
+                timing.update(record)
+            if (record["turn"] or 1) > 1:
+                logger.debug(
+                    "[Followup] 第%s轮: 处理提示词%s个token，耗时%s",
+                    record["turn"],
+                    record["prompt_tokens"],
+                    "-" if record["prompt"] is None else f"{record['prompt']:.0f}ms",
                 )
-                print(f"[API] {error_msg}")
-                return error_msg
-        except Exception as e:
-            error_msg = f"请求失败: {str(e)}"
-            print(f"[API] {error_msg}")
-            return error_msg
+
+        if config.get("backup") is not None:
+            return self.hedger.request(
+                config,
+                prompt,
+                on_chunk=on_chunk,
+                cancel_token=cancel_token,
+                on_success=on_success,
+                trace=trace,
+                on_stats=on_stats,
+            )
+        return request_completion(
+            self.session_pool,
+            config,
+            prompt,
+            on_chunk=on_chunk,
+            cancel_token=cancel_token,
+            on_success=on_success,
+            trace=trace,
+            on_stats=on_stats,
+            history=history,
+        )
 
 
 def main():
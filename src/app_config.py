@@ -0,0 +1,339 @@
+import logging
+import os
+from dataclasses import dataclass
+
+from PyQt5.QtCore import (
+    QFileSystemWatcher,
+    QObject,
+    QSettings,
+    QSize,
+    QTimer,
+    pyqtSignal,
+)
+
+from ai_client import (
+    CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    READ_TIMEOUT,
+    REQUEST_DEADLINE,
+    default_endpoints,
+)
+from endpoints import split_urls
+from model_warmer import DEFAULT_KEEP_ALIVE, keep_alive_value
+from batch import DEFAULT_MAX_ITEMS, DEFAULT_MAX_WAIT
+from conversation import DEFAULT_HISTORY_TOKENS
+from dictionary_rules import DEFAULT_RULES
+from long_input import DEFAULT_CHUNK_TOKENS, DEFAULT_PARALLELISM
+from prefetcher import DEFAULT_BUDGET_PER_HOUR
+
+logger = logging.getLogger(__name__)
+
+# 默认提示词
+DEFAULT_MAGNIFIER_PROMPT = "请通俗易懂地解释以下内容：\n{text}"
+DEFAULT_DICTIONARY_PROMPT = "请将以下内容翻译成中文：\n{text}"
+# 选中的已是中文时词典按钮改用的提示词
+DEFAULT_REVERSE_DICTIONARY_PROMPT = "请将以下内容翻译成英文：\n{text}"
+
+# AI API配置（示例使用，实际应用中需要替换为真实的API）
+AI_API_URL = "http://192.168.20.63:11434"
+AI_API_KEY = "ollama"
+DEFAULT_AI_MODEL = "llama3"
+
+# 各提供方的默认模型
+DEFAULT_MODELS = {
+    "Ollama": "llama3",
+    "DeepSeek": "deepseek-chat",
+    "OpenAI": "gpt-3.5-turbo",
+}
+
+# 窗口大小的写入延迟（毫秒），连续调整时合并为一次写入
+GEOMETRY_WRITE_DELAY = 2000
+# 配置文件变化后的重新加载延迟（毫秒），避免读到写了一半的文件
+RELOAD_DELAY = 200
+
+WINDOW_SIZE_PREFIX = "result_window_size_"
+
+# 配置文件中log_level可用的日志级别，其余值按WARNING处理
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+DEFAULT_LOG_LEVEL = "WARNING"
+
+
+def parse_log_level(value):
+    """返回有效的日志级别名称，无效时记录警告并使用默认级别"""
+    level = str(value or "").strip().upper()
+    if level in LOG_LEVELS:
+        return level
+    logger.warning("[Config] 无效的日志级别: %s，使用%s", value, DEFAULT_LOG_LEVEL)
+    return DEFAULT_LOG_LEVEL
+
+
+@dataclass(frozen=True)
+class AppConfig:
+    """某一时刻的完整配置快照，创建后不再修改"""
+
+    provider: str = "Ollama"
+    api_url: str = AI_API_URL
+    api_key: str = ""
+    model_name: str = DEFAULT_MODELS["Ollama"]
+    magnifier_prompt: str = DEFAULT_MAGNIFIER_PROMPT
+    dictionary_prompt: str = DEFAULT_DICTIONARY_PROMPT
+    reverse_dictionary_prompt: str = DEFAULT_REVERSE_DICTIONARY_PROMPT
+    # 词典按钮按选中内容的分类选择处理方式，格式见dictionary_rules.parse_rules，为空时总是请求AI
+    dictionary_rules: str = DEFAULT_RULES
+    stream: bool = True
+    show_reasoning: bool = False
+    prewarm: bool = False
+    cache_enabled: bool = True
+    cache_ttl_days: int = 7
+    cache_max_entries: int = 5000
+    prefetch_mode: str = "off"
+    prefetch_budget_per_hour: int = DEFAULT_BUDGET_PER_HOUR
+    pool_size: int = DEFAULT_POOL_SIZE
+    # 聊天补全接口的备用地址，为空时使用官方地址；Ollama的多个地址直接写在api_url中
+    chat_endpoints: tuple = ()
+    connect_timeout: float = CONNECT_TIMEOUT
+    read_timeout: float = READ_TIMEOUT
+    deadline: float = REQUEST_DEADLINE
+    keep_alive: str = DEFAULT_KEEP_ALIVE
+    model_warmup: bool = True
+    show_timing_footer: bool = False
+    log_level: str = DEFAULT_LOG_LEVEL
+    tracing_enabled: bool = True
+    input_source: str = "auto"
+    batch_enabled: bool = False
+    batch_action: str = "dictionary"
+    batch_max_items: int = DEFAULT_MAX_ITEMS
+    batch_max_wait: int = DEFAULT_MAX_WAIT
+    batch_hotkey: str = "ctrl+alt+q"
+    # 整理选中文本中的断行、断词、多余空白和页眉页脚后再发送
+    normalize_selection: bool = True
+    # 选中文本的估计token数上限，超出时只保留开头部分，为0时不压缩
+    compact_tokens: int = 0
+    long_input_chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+    long_input_parallelism: int = DEFAULT_PARALLELISM
+    followup_history_tokens: int = DEFAULT_HISTORY_TOKENS
+    # 离线词典索引，路径为空时使用默认位置
+    offline_dict_enabled: bool = False
+    offline_dict_path: str = ""
+    hedge_mode: str = "off"
+    hedge_provider: str = ""
+    hedge_api_url: str = ""
+    hedge_api_key: str = ""
+    hedge_model: str = ""
+
+    @classmethod
+    def from_settings(cls, settings):
+        """从QSettings解析出配置快照"""
+        provider = settings.value("ai_provider", "Ollama")
+        # 备用服务默认与主服务为同一提供方，可只换模型
+        hedge_provider = settings.value("hedge_provider", "") or provider
+        return cls(
+            provider=provider,
+            api_url=settings.value("ai_api_url", AI_API_URL),
+            # 当前提供方对应的API Key和模型名
+            api_key=settings.value(f"ai_api_key_{provider}", ""),
+            model_name=settings.value(
+                f"ai_model_{provider}", DEFAULT_MODELS.get(provider, DEFAULT_AI_MODEL)
+            ),
+            magnifier_prompt=settings.value(
+                "magnifier_prompt", DEFAULT_MAGNIFIER_PROMPT
+            ),
+            dictionary_prompt=settings.value(
+                "dictionary_prompt", DEFAULT_DICTIONARY_PROMPT
+            ),
+            reverse_dictionary_prompt=settings.value(
+                "reverse_dictionary_prompt", DEFAULT_REVERSE_DICTIONARY_PROMPT
+            ),
+            dictionary_rules=settings.value("dictionary_rules", DEFAULT_RULES),
+            stream=settings.value("ai_stream", True, type=bool),
+            show_reasoning=settings.value("show_reasoning", False, type=bool),
+            prewarm=settings.value("ai_prewarm", False, type=bool),
+            cache_enabled=settings.value("cache_enabled", True, type=bool),
+            cache_ttl_days=settings.value("cache_ttl_days", 7, type=int),
+            cache_max_entries=settings.value("cache_max_entries", 5000, type=int),
+            prefetch_mode=settings.value("prefetch_mode", "off"),
+            prefetch_budget_per_hour=settings.value(
+                "prefetch_budget_per_hour", DEFAULT_BUDGET_PER_HOUR, type=int
+            ),
+            pool_size=settings.value("ai_pool_size", DEFAULT_POOL_SIZE, type=int),
+            chat_endpoints=tuple(
+                split_urls(settings.value(f"ai_endpoints_{provider}", ""))
+            ),
+            connect_timeout=settings.value(
+                "ai_connect_timeout", CONNECT_TIMEOUT, type=float
+            ),
+            read_timeout=settings.value("ai_read_timeout", READ_TIMEOUT, type=float),
+            deadline=settings.value("ai_deadline", REQUEST_DEADLINE, type=float),
+            keep_alive=str(settings.value("ollama_keep_alive", DEFAULT_KEEP_ALIVE)),
+            model_warmup=settings.value("ollama_warmup", True, type=bool),
+            show_timing_footer=settings.value("show_timing_footer", False, type=bool),
+            log_level=parse_log_level(settings.value("log_level", DEFAULT_LOG_LEVEL)),
+            tracing_enabled=settings.value("tracing_enabled", True, type=bool),
+            input_source=settings.value("input_source", "auto"),
+            batch_enabled=settings.value("batch_enabled", False, type=bool),
+            batch_action=settings.value("batch_action", "dictionary"),
+            batch_max_items=settings.value(
+                "batch_max_items", DEFAULT_MAX_ITEMS, type=int
+            ),
+            batch_max_wait=settings.value("batch_max_wait", DEFAULT_MAX_WAIT, type=int),
+            batch_hotkey=settings.value("batch_hotkey", "ctrl+alt+q"),
+            normalize_selection=settings.value("normalize_selection", True, type=bool),
+            compact_tokens=settings.value("compact_tokens", 0, type=int),
+            long_input_chunk_tokens=settings.value(
+                "long_input_chunk_tokens", DEFAULT_CHUNK_TOKENS, type=int
+            ),
+            long_input_parallelism=settings.value(
+                "long_input_parallelism", DEFAULT_PARALLELISM, type=int
+            ),
+            followup_history_tokens=settings.value(
+                "followup_history_tokens", DEFAULT_HISTORY_TOKENS, type=int
+            ),
+            offline_dict_enabled=settings.value(
+                "offline_dict_enabled", False, type=bool
+            ),
+            offline_dict_path=settings.value("offline_dict_path", ""),
+            hedge_mode=settings.value("hedge_mode", "off"),
+            hedge_provider=hedge_provider,
+            hedge_api_url=settings.value("hedge_api_url", ""),
+            hedge_api_key=settings.value(f"ai_api_key_{hedge_provider}", ""),
+            hedge_model=settings.value("hedge_model", ""),
+        )
+
+    def ai_config(self):
+        """返回请求AI服务所需的配置，供工作线程使用"""
+        return {
+            "provider": self.provider,
+            "api_url": self.api_url,
+            "api_key": self.api_key,
+            "model_name": self.model_name,
+            "stream": self.stream,
+            "show_reasoning": self.show_reasoning,
+            "endpoints": self.endpoints(),
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "deadline": self.deadline,
+            "keep_alive": keep_alive_value(self.keep_alive),
+            "hedge_mode": self.hedge_mode,
+            "backup": self.backup_ai_config(),
+        }
+
+    def endpoints(self):
+        """当前提供方的全部服务地址"""
+        if self.provider != "Ollama" and self.chat_endpoints:
+            return list(self.chat_endpoints)
+        return default_endpoints(self.provider, self.api_url)
+
+    def backup_ai_config(self):
+        """返回对冲请求使用的备用服务配置，未开启或与主服务相同时返回None"""
+        if self.hedge_mode == "off":
+            return None
+        if self.hedge_provider == self.provider:
+            default_model = self.model_name
+        else:
+            default_model = DEFAULT_MODELS.get(self.hedge_provider, DEFAULT_AI_MODEL)
+        backup = {
+            "provider": self.hedge_provider,
+            "api_url": self.hedge_api_url or self.api_url,
+            "api_key": self.hedge_api_key,
+            "model_name": self.hedge_model or default_model,
+            "stream": self.stream,
+            "show_reasoning": self.show_reasoning,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "deadline": self.deadline,
+            "keep_alive": keep_alive_value(self.keep_alive),
+        }
+        if (backup["provider"], backup["api_url"], backup["model_name"]) == (
+            self.provider,
+            self.api_url,
+            self.model_name,
+        ):
+            return None
+        return backup
+
+
+class ConfigStore(QObject):
+    """内存中的配置：启动时加载一次，保存设置或配置文件变化时整体替换并发出通知
+
+    热路径只读取self.config，不访问文件；窗口大小先记在内存，延迟批量写回
+    """
+
+    # 参数为新的AppConfig
+    changed = pyqtSignal(object)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.settings = QSettings(path, QSettings.IniFormat)
+        self.config = AppConfig.from_settings(self.settings)
+        self._window_sizes = {}
+        self._dirty_sizes = set()
+        for key in self.settings.allKeys():
+            if key.startswith(WINDOW_SIZE_PREFIX):
+                size = self.settings.value(key)
+                if isinstance(size, QSize):
+                    self._window_sizes[key[len(WINDOW_SIZE_PREFIX) :]] = size
+
+        self._write_timer = QTimer(self)
+        self._write_timer.setSingleShot(True)
+        self._write_timer.setInterval(GEOMETRY_WRITE_DELAY)
+        self._write_timer.timeout.connect(self.flush)
+
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(RELOAD_DELAY)
+        self._reload_timer.timeout.connect(self.reload)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watch()
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._watcher.directoryChanged.connect(self._on_file_changed)
+
+    def reload(self):
+        """重新读取配置文件，内容有变化时替换快照并发出changed"""
+        self.settings.sync()
+        config = AppConfig.from_settings(self.settings)
+        # 文件被替换后监视会失效，需要重新登记
+        self._watch()
+        if config == self.config:
+            return
+        # 单次赋值替换引用，工作线程拿到的始终是完整的快照
+        self.config = config
+        logger.debug("[Config] 配置已更新")
+        self.changed.emit(config)
+
+    def window_size(self, title, default):
+        return self._window_sizes.get(title, default)
+
+    def set_window_size(self, title, size):
+        """记录窗口大小，稍后批量写入配置文件"""
+        self._window_sizes[title] = size
+        self._dirty_sizes.add(title)
+        self._write_timer.start()
+
+    def flush(self):
+        """写回尚未保存的窗口大小"""
+        self._write_timer.stop()
+        if not self._dirty_sizes:
+            return
+        for title in self._dirty_sizes:
+            self.settings.setValue(
+                WINDOW_SIZE_PREFIX + title, self._window_sizes[title]
+            )
+        self._dirty_sizes.clear()
+        self.settings.sync()
+        self._watch()
+
+    def _watch(self):
+        directory = os.path.dirname(self.path)
+        if os.path.exists(self.path):
+            if self.path not in self._watcher.files():
+                self._watcher.addPath(self.path)
+            if directory in self._watcher.directories():
+                self._watcher.removePath(directory)
+        elif directory not in self._watcher.directories():
+            # 配置文件尚未创建时监视所在目录，等待文件出现
+            self._watcher.addPath(directory)
+
+    def _on_file_changed(self, path):
+        self._reload_timer.start()
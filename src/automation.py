@@ -0,0 +1,343 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from extraction_strategy import StrategyCache
+
+logger = logging.getLogger(__name__)
+
+# 单次提取的最长时间（毫秒），超时后放弃并换用新的工作线程
+DEFAULT_EXTRACTION_DEADLINE = 1000
+# 遍历子控件的最大深度
+MAX_TRAVERSAL_DEPTH = 3
+# 遍历子控件的最大节点数
+MAX_TRAVERSAL_NODES = 60
+# 向上查找父控件的最大层数
+MAX_ANCESTOR_DEPTH = 2
+# 单次搜索的时间预算（秒）
+TRAVERSAL_TIME_BUDGET = 0.3
+
+
+@lru_cache(maxsize=256)
+def process_name(pid):
+    """根据进程ID返回小写的程序文件名"""
+    try:
+        import win32api
+        import win32con
+        import win32process
+
+        handle = win32api.OpenProcess(
+            win32con.PROCESS_QUERY_LIMITED_INFORMATION, False, pid
+        )
+        try:
+            path = win32process.GetModuleFileNameEx(handle, 0)
+        finally:
+            win32api.CloseHandle(handle)
+        return os.path.basename(path).lower()
+    except Exception:
+        return "unknown"
+
+
+class AutomationBackend:
+    """获取选中文本的自动化接口，所有方法都在工作线程中调用"""
+
+    def initialize(self):
+        pass
+
+    def uninitialize(self):
+        pass
+
+    def get_selected_text(self, x, y, retry=False):
+        """retry为True表示同一次选择在等待后的重试"""
+        raise NotImplementedError
+
+
+class UIAutomationBackend(AutomationBackend):
+    """基于Windows UI Automation的实现，按控件类型优先使用学习到的策略"""
+
+    def __init__(self, strategy_cache=None):
+        self.strategy_cache = strategy_cache or StrategyCache()
+        # 本次选择第一次尝试时跳过的控件类型，重试时沿用同样的判断
+        self._skipped_key = None
+
+    def initialize(self):
+        import uiautomation as auto
+
+        self.auto = auto
+        # 工作线程使用独立的COM套间
+        self._initializer = auto.UIAutomationInitializerInThread()
+
+    def uninitialize(self):
+        self.strategy_cache.save()
+        self._initializer = None
+
+    def _get_text_from_element(self, element):
+        """辅助函数：尝试从一个元素中获取选中文本"""
+        try:
+            if hasattr(element, "GetTextPattern"):
+                text_pattern = element.GetTextPattern()
+                if text_pattern:
+                    selection = text_pattern.GetSelection()
+                    if selection and len(selection) > 0:
+                        text = selection[0].GetText(-1)
+                        if text:
+                            return text
+        except Exception as e:
+            logger.warning("从元素获取文本失败: %s", e)
+        return ""
+
+    def strategy_key(self, element):
+        return StrategyCache.make_key(
+            process_name(getattr(element, "ProcessId", 0)),
+            getattr(element, "ClassName", ""),
+        )
+
+    def get_selected_text(self, x, y, retry=False):
+        """使用UI自动化获取选中文本，先试学习到的策略，再做有限遍历
+
+        每次选择只在第一次尝试时计入未命中和跳过次数，等待后的重试不重复计数
+        """
+        try:
+            # 获取当前鼠标位置下的控件
+            element = self.auto.ControlFromPoint(x, y)
+            if not element:
+                logger.debug("未找到鼠标位置下的控件")
+                return ""
+
+            key = self.strategy_key(element)
+            if retry:
+                skip = key == self._skipped_key
+            else:
+                skip = self.strategy_cache.should_skip(key)
+                self._skipped_key = key if skip else None
+            if skip:
+                logger.debug("控件类型不支持获取选中文本，跳过: %s", key)
+                return ""
+
+            deadline = time.monotonic() + TRAVERSAL_TIME_BUDGET
+            strategy = self.strategy_cache.best_strategy(key)
+            if strategy:
+                text = self.run_strategy(element, strategy, deadline)
+                if text:
+                    self.strategy_cache.record_hit(key, strategy)
+                    return text
+
+            text, strategy = self.search(element, deadline)
+            if text:
+                logger.debug("成功获取到文本（%s → %s）", key, strategy)
+                self.strategy_cache.record_hit(key, strategy)
+                return text
+
+            logger.debug("未能获取到选中文本（%s）", key)
+            if not retry:
+                self.strategy_cache.record_miss(key)
+            return ""
+        except Exception as e:
+            logger.warning("自动化获取文本失败: %s", e)
+            return ""
+
+    def run_strategy(self, element, strategy, deadline):
+        """按记录的策略直接定位到可取文本的控件"""
+        kind, _, rest = strategy.partition(":")
+        if kind == "self":
+            return self._get_text_from_element(element)
+        depth, _, class_name = rest.partition(":")
+        depth = int(depth)
+        if kind == "ancestor":
+            for ancestor_depth, ancestor in self.iter_ancestors(element, depth):
+                if ancestor_depth == depth and ancestor.ClassName == class_name:
+                    return self._get_text_from_element(ancestor)
+            return ""
+        if kind == "descendant":
+            for child_depth, child in self.iter_descendants(element, depth, deadline):
+                if child_depth == depth and child.ClassName == class_name:
+                    text = self._get_text_from_element(child)
+                    if text:
+                        return text
+        return ""
+
+    def search(self, element, deadline):
+        """依次尝试当前控件、子控件（广度优先）和父控件，返回文本及所用策略"""
+        text = self._get_text_from_element(element)
+        if text:
+            return text, "self"
+
+        for depth, child in self.iter_descendants(
+            element, MAX_TRAVERSAL_DEPTH, deadline
+        ):
+            text = self._get_text_from_element(child)
+            if text:
+                return text, f"descendant:{depth}:{child.ClassName}"
+
+        for depth, ancestor in self.iter_ancestors(element, MAX_ANCESTOR_DEPTH):
+            if time.monotonic() > deadline:
+                break
+            text = self._get_text_from_element(ancestor)
+            if text:
+                return text, f"ancestor:{depth}:{ancestor.ClassName}"
+
+        return "", None
+
+    def iter_descendants(self, element, max_depth, deadline):
+        """广度优先遍历子控件，受深度、节点数和时间预算限制"""
+        queue = deque([(0, element)])
+        visited = 0
+        while queue:
+            depth, node = queue.popleft()
+            if depth >= max_depth:
+                continue
+            for child in node.GetChildren():
+                if visited >= MAX_TRAVERSAL_NODES or time.monotonic() > deadline:
+                    return
+                visited += 1
+                yield depth + 1, child
+                queue.append((depth + 1, child))
+
+    def iter_ancestors(self, element, max_depth):
+        node = element
+        for depth in range(1, max_depth + 1):
+            node = node.GetParentControl()
+            if not node:
+                return
+            yield depth, node
+
+
+class FakeAutomationBackend(AutomationBackend):
+    """按预设返回文本的实现，用于在非Windows环境下测试工作线程
+
+    results为依次返回的文本列表，delay为每次提取耗时（秒）
+    """
+
+    def __init__(self, results, delay=0.0):
+        self.results = list(results)
+        self.delay = delay
+        self.calls = []
+
+    def get_selected_text(self, x, y, retry=False):
+        self.calls.append((x, y))
+        if self.delay:
+            time.sleep(self.delay)
+        return self.results.pop(0) if self.results else ""
+
+
+class _RequestSlot:
+    """只保留最新一个待处理请求的队列，旧请求被新请求直接替换"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = None
+        self._closed = False
+
+    def put(self, request):
+        with self._condition:
+            self._pending = request
+            self._condition.notify()
+
+    def clear(self):
+        with self._condition:
+            self._pending = None
+
+    def take(self):
+        with self._condition:
+            while self._pending is None and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            request, self._pending = self._pending, None
+            return request
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+
+class AutomationWorker(QObject):
+    """在专用线程中执行文本提取，带超时和过期请求丢弃"""
+
+    extracted = pyqtSignal(int, str)
+    timed_out = pyqtSignal(int)
+    _result_ready = pyqtSignal(int, str)
+
+    def __init__(
+        self, backend_factory, deadline=DEFAULT_EXTRACTION_DEADLINE, parent=None
+    ):
+        super().__init__(parent)
+        self.backend_factory = backend_factory
+        self.deadline = deadline
+        self._ids = itertools.count(1)
+        self._latest = 0
+        self._slot = None
+        self._result_ready.connect(self._deliver)
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.timeout.connect(self._on_deadline)
+        self._start_thread()
+
+    def _start_thread(self):
+        self._slot = _RequestSlot()
+        threading.Thread(target=self._run, args=(self._slot,), daemon=True).start()
+
+    def _run(self, slot):
+        backend = self.backend_factory()
+        try:
+            backend.initialize()
+        except Exception as e:
+            logger.warning("[Automation] 初始化失败: %s", e)
+        try:
+            while True:
+                request = slot.take()
+                if request is None:
+                    break
+                request_id, x, y, retry = request
+                try:
+                    text = backend.get_selected_text(x, y, retry)
+                except Exception as e:
+                    logger.warning("[Automation] 提取文本失败: %s", e)
+                    text = ""
+                self._result_ready.emit(request_id, text or "")
+        finally:
+            backend.uninitialize()
+
+    def request(self, x, y, retry=False):
+        """提交提取请求，尚未开始的旧请求会被替换；retry表示同一次选择的重试"""
+        request_id = next(self._ids)
+        self._latest = request_id
+        self._slot.put((request_id, x, y, retry))
+        self.deadline_timer.start(self.deadline)
+        return request_id
+
+    def cancel(self):
+        """放弃当前请求，之后到达的结果会被丢弃"""
+        self._latest = 0
+        self._slot.clear()
+        self.deadline_timer.stop()
+
+    def stop(self):
+        self.cancel()
+        self._slot.close()
+
+    def _deliver(self, request_id, text):
+        # 过期或已取消请求的结果直接丢弃
+        if request_id != self._latest:
+            return
+        self._latest = 0
+        self.deadline_timer.stop()
+        self.extracted.emit(request_id, text)
+
+    def _on_deadline(self):
+        request_id = self._latest
+        if not request_id:
+            return
+        self._latest = 0
+        logger.warning("[Automation] 提取超过%s毫秒，放弃并重建工作线程", self.deadline)
+        # 卡住的线程无法强制结束，关闭其队列后让它在返回时自行退出
+        self._slot.close()
+        self._start_thread()
+        self.timed_out.emit(request_id)
@@ -0,0 +1,157 @@
+import json
+import logging
+import re
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from response_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# 队列达到该数量时自动发送
+DEFAULT_MAX_ITEMS = 10
+# 第一条加入后最长等待时间（秒），超时自动发送
+DEFAULT_MAX_WAIT = 60
+
+# 要求模型按编号以JSON数组返回，便于拆分为逐条结果
+BATCH_INSTRUCTION = (
+    "下面是一个JSON数组，每个元素是一段需要单独处理的文本，id为编号。\n"
+    "请对每一段分别按以下要求处理：\n{task}\n\n"
+    '只返回一个JSON数组，每个元素形如{{"id": 编号, "result": "处理结果"}}，'
+    "编号与输入一一对应，不要输出其他内容。\n\n{items}"
+)
+
+_NUMBERED_LINE = re.compile(r"^\s*(?:\[(\d+)\]|(\d+)[.、:：)])\s*(.*)$")
+
+
+def build_batch_prompt(template, items):
+    """将多段文本合并为一个结构化提示词"""
+    # 提示词模板中的{text}改为指代下方列表
+    task = template.replace("{text}", "（见下方列表中的每一段文本）").strip()
+    payload = json.dumps(
+        [{"id": index + 1, "text": item} for index, item in enumerate(items)],
+        ensure_ascii=False,
+        indent=1,
+    )
+    return BATCH_INSTRUCTION.format(task=task, items=payload)
+
+
+def split_batch_answer(answer, count):
+    """把合并请求的回答拆回逐条结果，无法识别的条目为None"""
+    results = [None] * count
+    for position, entry in enumerate(_parse_json_array(answer)):
+        if isinstance(entry, dict):
+            index = entry.get("id")
+            result = entry.get("result")
+        elif isinstance(entry, str):
+            # 也接受直接按顺序返回的字符串数组
+            index, result = position + 1, entry
+        else:
+            continue
+        if isinstance(index, str) and index.isdigit():
+            index = int(index)
+        if isinstance(index, int) and 1 <= index <= count and result:
+            results[index - 1] = str(result).strip()
+    if any(result is not None for result in results):
+        return results
+
+    # 模型没有返回JSON时，尝试按"1. xxx"形式的编号行拆分
+    current = None
+    lines = {}
+    for line in answer.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            current = int(match.group(1) or match.group(2))
+            lines[current] = [match.group(3)]
+        elif current is not None:
+            lines[current].append(line)
+    for index, parts in lines.items():
+        text = "\n".join(parts).strip()
+        if 1 <= index <= count and text:
+            results[index - 1] = text
+    return results
+
+
+def _parse_json_array(answer):
+    start = answer.find("[")
+    end = answer.rfind("]")
+    if start == -1 or end <= start:
+        return []
+    try:
+        parsed = json.loads(answer[start : end + 1])
+    except ValueError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+class BatchQueue(QObject):
+    """待批量处理的选中文本队列，达到数量或时间阈值时发出ready"""
+
+    # 队列长度变化
+    changed = pyqtSignal(int)
+    # 需要发送时发出
+    ready = pyqtSignal()
+
+    def __init__(
+        self, max_items=DEFAULT_MAX_ITEMS, max_wait=DEFAULT_MAX_WAIT, parent=None
+    ):
+        super().__init__(parent)
+        self.max_items = max_items
+        self.items = []
+        self.keys = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.ready.emit)
+        self.set_max_wait(max_wait)
+
+    def set_max_wait(self, max_wait):
+        self.timer.setInterval(int(max_wait * 1000))
+
+    def add(self, text):
+        """加入一段文本，规范形式相同的文本只保留一次"""
+        text = text.strip()
+        key = normalize_text(text)
+        if not key or key in self.keys:
+            return False
+        self.keys.add(key)
+        self.items.append(text)
+        if len(self.items) == 1:
+            self.timer.start()
+        self.changed.emit(len(self.items))
+        if len(self.items) >= self.max_items:
+            self.ready.emit()
+        return True
+
+    def take(self):
+        """取出全部文本并清空队列"""
+        items, self.items = self.items, []
+        self.keys.clear()
+        self.timer.stop()
+        self.changed.emit(0)
+        return items
+
+
+class BatchJob:
+    """一次批量处理：记录每一条的结果，并负责显示格式"""
+
+    def __init__(self, items, template, config):
+        self.items = items
+        self.template = template
+        self.config = config
+        self.results = [None] * len(items)
+        # 请求ID -> 该请求负责的条目下标
+        self.requests = {}
+        # 成功完成的请求所负责的条目下标
+        self.succeeded = set()
+        self.window = None
+
+    def missing(self):
+        return [index for index, result in enumerate(self.results) if result is None]
+
+    def render(self):
+        sections = []
+        for index, item in enumerate(self.items):
+            preview = item if len(item) <= 60 else item[:60] + "..."
+            result = self.results[index]
+            sections.append(f"[{index + 1}] {preview}\n{result or '（处理中...）'}")
+        return "\n\n".join(sections)
@@ -0,0 +1,108 @@
+from long_input import estimate_tokens
+
+# 追问时发送的历史对话的token预算
+DEFAULT_HISTORY_TOKENS = 3000
+
+
+class Conversation:
+    """结果窗口中的对话：首次请求的提示词和回答，以及之后的追问
+
+    Ollama优先复用上次响应返回的context，服务端无需重新处理之前的提示词；
+    聊天补全接口以消息形式发送历史，超出token预算时保留首轮对话并丢弃较早的追问
+    """
+
+    def __init__(self, prompt, provider, model_name, budget=DEFAULT_HISTORY_TOKENS):
+        self.provider = provider
+        self.model_name = model_name
+        self.budget = budget
+        # 已完成的对话，按顺序为(提问, 回答)
+        self.turns = []
+        self.prompt = prompt
+        self.answer = None
+        # Ollama上次响应返回的context，由工作线程写入
+        self.context = None
+        # 正在进行的追问及其是否成功
+        self.pending = None
+        self.answered = False
+
+    def ask(self, question, provider, model_name):
+        """开始一次追问，返回请求参数(提示词, history)，history的含义见ai_client.build_request"""
+        self.pending = question
+        self.answered = False
+        if (provider, model_name) != (self.provider, self.model_name):
+            # 换了模型时之前的context不再有效
+            self.provider, self.model_name = provider, model_name
+            self.context = None
+        history = self.history(estimate_tokens(question))
+        if provider != "Ollama":
+            return question, history
+        if self.context and len(self.context) <= self.budget:
+            return question, self.context
+        # 没有可用的context时把历史对话写入提示词，之后的追问再复用新的context
+        transcript = "\n\n".join(
+            f"{'用户' if message['role'] == 'user' else '助手'}：{message['content']}"
+            for message in history
+        )
+        return f"{transcript}\n\n用户：{question}", None
+
+    def turn(self):
+        """当前请求是第几轮对话"""
+        return 1 if self.answer is None else len(self.turns) + 2
+
+    def on_stats(self, stats):
+        """请求成功时记录Ollama返回的context，可在工作线程调用"""
+        # 对冲时可能由其他模型回答，其context不能用于当前模型
+        if "context" in stats and (stats["provider"], stats["model"]) == (
+            self.provider,
+            self.model_name,
+        ):
+            self.context = stats["context"]
+
+    def on_success(self, result):
+        """追问成功，可在工作线程调用"""
+        self.answered = True
+
+    def finish(self, result):
+        """记录请求结果，返回窗口中显示的完整对话"""
+        if self.answer is None:
+            self.answer = result
+        elif self.pending is not None:
+            if self.answered:
+                self.turns.append((self.pending, result))
+            else:
+                # 失败的追问只显示，不计入历史
+                self.turns.append((self.pending, result, False))
+            self.pending = None
+        return self.render()
+
+    def render(self):
+        sections = [self.answer or ""]
+        for turn in self.turns:
+            sections.append(f"> {turn[0]}\n\n{turn[1]}")
+        return "\n\n".join(sections)
+
+    def history(self, reserved=0):
+        """返回不超过token预算的历史消息，优先保留首轮对话和最近的追问"""
+        pairs = [(self.prompt, self.answer or "")]
+        pairs.extend(turn[:2] for turn in self.turns if len(turn) == 2)
+        costs = [
+            estimate_tokens(question) + estimate_tokens(answer)
+            for question, answer in pairs
+        ]
+        remaining = self.budget - reserved
+        keep = []
+        if costs[0] <= remaining:
+            keep.append(0)
+            remaining -= costs[0]
+        recent = []
+        for index in range(len(pairs) - 1, 0, -1):
+            if costs[index] > remaining:
+                break
+            recent.append(index)
+            remaining -= costs[index]
+        messages = []
+        for index in keep + recent[::-1]:
+            question, answer = pairs[index]
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
@@ -0,0 +1,15 @@
+# 词典按钮对各类内容的处理：ask照常请求，skip不请求，local本地回答，english改为翻译成英文
+ACTIONS = ("ask", "skip", "local", "english")
+# 规则的标签为script_detect.Classification.label
+DEFAULT_RULES = "zh=english,number=local,url=local,code=skip,symbols=skip"
+
+
+def parse_rules(text):
+    """解析"标签=处理方式"的规则列表，以逗号分隔，无效的项被忽略"""
+    rules = {}
+    for item in (text or "").split(","):
+        label, _, action = item.partition("=")
+        label, action = label.strip(), action.strip()
+        if label and action in ACTIONS:
+            rules[label] = action
+    return rules
@@ -0,0 +1,201 @@
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 连续失败多少次后熔断该地址
+FAILURE_THRESHOLD = 3
+# 熔断后首次重试前的等待时间（秒），再次失败时加倍，直到上限
+BASE_COOLDOWN = 10
+MAX_COOLDOWN = 300
+# 后台健康检查的间隔和超时（秒）
+PROBE_INTERVAL = 15
+PROBE_TIMEOUT = 3
+# 延迟的指数加权平均系数
+LATENCY_SMOOTHING = 0.3
+
+# 熔断器状态：正常、熔断、半开（允许一次试探请求）
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_URL_SEPARATOR = re.compile(r"[\s,;]+")
+
+
+def split_urls(text):
+    """解析以换行、逗号或分号分隔的多个地址"""
+    return [url.rstrip("/") for url in _URL_SEPARATOR.split(text or "") if url]
+
+
+class EndpointState:
+    """单个服务地址的负载、延迟和熔断状态"""
+
+    def __init__(self, url, provider):
+        self.url = url
+        self.provider = provider
+        self.outstanding = 0
+        self.latency = None
+        self.failures = 0
+        self.state = CLOSED
+        self.cooldown = BASE_COOLDOWN
+        self.retry_at = 0.0
+        self.trial_in_flight = False
+        self.requests = 0
+        self.errors = 0
+
+    def score(self):
+        # 进行中的请求越少、延迟越低越优先；没有延迟数据的地址优先试用
+        return (self.outstanding + 1) * (self.latency or 0.0), self.outstanding
+
+
+class EndpointBalancer:
+    """在同一提供方的多个地址间分配请求，并对失败的地址熔断
+
+    选择进行中请求最少且延迟较低的地址；连续失败的地址被剔除，冷却结束后只放行一次试探请求，
+    成功才恢复，失败则冷却时间加倍；后台健康检查失败的地址同样计入熔断
+    """
+
+    def __init__(self, session_pool):
+        self.session_pool = session_pool
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober = None
+
+    def acquire(self, provider, urls, exclude=()):
+        """选出一个地址并计入进行中的请求，调用方完成后须调用release；没有地址时返回None"""
+        if not urls:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            states = [self._state(provider, url) for url in urls if url not in exclude]
+            if not states:
+                states = [self._state(provider, url) for url in urls]
+            for state in states:
+                if state.state == OPEN and now >= state.retry_at:
+                    state.state = HALF_OPEN
+            available = [
+                state
+                for state in states
+                if state.state == CLOSED
+                or (state.state == HALF_OPEN and not state.trial_in_flight)
+            ]
+            if available:
+                chosen = min(available, key=EndpointState.score)
+            else:
+                # 全部熔断时仍尝试最早可以重试的地址，而不是直接失败
+                chosen = min(states, key=lambda state: state.retry_at)
+            if chosen.state == HALF_OPEN:
+                chosen.trial_in_flight = True
+            chosen.outstanding += 1
+            chosen.requests += 1
+        self._ensure_prober()
+        return chosen.url
+
+    def release(self, url, ok, latency=None):
+        """记录请求结果：ok为False表示连接失败、超时或服务端错误"""
+        with self._lock:
+            state = self._endpoints.get(url)
+            if state is None:
+                return
+            state.outstanding = max(0, state.outstanding - 1)
+            if ok:
+                if latency is not None:
+                    state.latency = (
+                        latency
+                        if state.latency is None
+                        else state.latency
+                        + LATENCY_SMOOTHING * (latency - state.latency)
+                    )
+                self._on_success(state)
+            else:
+                state.errors += 1
+                self._on_failure(state)
+
+    def stats(self):
+        with self._lock:
+            return {
+                url: {
+                    "state": state.state,
+                    "outstanding": state.outstanding,
+                    "latency_ms": (
+                        None if state.latency is None else state.latency * 1000
+                    ),
+                    "requests": state.requests,
+                    "errors": state.errors,
+                }
+                for url, state in self._endpoints.items()
+            }
+
+    def stop(self):
+        self._stop.set()
+
+    def _state(self, provider, url):
+        state = self._endpoints.get(url)
+        if state is None:
+            state = self._endpoints[url] = EndpointState(url, provider)
+        return state
+
+    def _on_success(self, state):
+        if state.state != CLOSED:
+            logger.info("[Endpoint] 地址已恢复: %s", state.url)
+        state.state = CLOSED
+        state.failures = 0
+        state.cooldown = BASE_COOLDOWN
+        state.trial_in_flight = False
+
+    def _on_failure(self, state):
+        state.failures += 1
+        state.trial_in_flight = False
+        if state.state == HALF_OPEN:
+            # 试探失败，延长冷却时间
+            state.cooldown = min(state.cooldown * 2, MAX_COOLDOWN)
+        elif state.failures < FAILURE_THRESHOLD:
+            return
+        if state.state != OPEN:
+            logger.warning(
+                "[Endpoint] 地址连续失败%s次，暂停使用%s秒: %s",
+                state.failures,
+                state.cooldown,
+                state.url,
+            )
+        state.state = OPEN
+        state.retry_at = time.monotonic() + state.cooldown
+
+    def _ensure_prober(self):
+        with self._lock:
+            if self._prober is not None or self._stop.is_set():
+                return
+            self._prober = threading.Thread(target=self._probe_loop, daemon=True)
+        self._prober.start()
+
+    def _probe_loop(self):
+        """定期检查Ollama地址：失败计入熔断，熔断中的地址检查仍失败时推迟重试"""
+        while not self._stop.wait(PROBE_INTERVAL):
+            with self._lock:
+                states = [
+                    state
+                    for state in self._endpoints.values()
+                    if state.provider == "Ollama"
+                ]
+            for state in states:
+                if self._probe(state.url):
+                    continue
+                with self._lock:
+                    if state.state == OPEN:
+                        # 避免冷却结束后用真实请求试探仍不可用的地址
+                        state.retry_at = time.monotonic() + state.cooldown
+                    else:
+                        self._on_failure(state)
+
+    def _probe(self, url):
+        try:
+            session = self.session_pool.session_for("Ollama")
+            response = session.get(f"{url}/api/tags", timeout=PROBE_TIMEOUT)
+            response.close()
+            return response.status_code == 200
+        except Exception as e:
+            logger.debug("[Endpoint] 健康检查失败: %s %s", url, e)
+            return False
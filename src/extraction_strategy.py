@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 连续多少次都取不到文本后，将该控件类型视为不支持
+NEGATIVE_THRESHOLD = 5
+# 被视为不支持的控件每隔多少次仍重新尝试一次，以便应用更新后恢复
+NEGATIVE_RETRY_EVERY = 20
+# 累计多少次更新后写入磁盘
+SAVE_EVERY = 10
+
+
+class StrategyCache:
+    """按(进程, 控件ClassName)记录哪种提取方式有效，并持久化命中率
+
+    策略字符串形如 "self"、"descendant:2:<ClassName>"、"ancestor:1:<ClassName>"
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(process_name, class_name):
+        return f"{process_name}|{class_name}"
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("[Strategy] 读取策略缓存失败: %s", e)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False, indent=1)
+            self._dirty = 0
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning("[Strategy] 保存策略缓存失败: %s", e)
+
+    def best_strategy(self, key):
+        """返回该控件类型上次成功的策略"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.get("strategy") if entry else None
+
+    def should_skip(self, key):
+        """控件类型从未取到过文本时跳过，偶尔放行一次重新确认"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or entry["hits"] or entry["misses"] < NEGATIVE_THRESHOLD:
+                return False
+            entry["skipped"] = entry.get("skipped", 0) + 1
+            return entry["skipped"] % NEGATIVE_RETRY_EVERY != 0
+
+    def record_hit(self, key, strategy):
+        self._update(key, strategy=strategy, hit=True)
+
+    def record_miss(self, key):
+        self._update(key, hit=False)
+
+    def stats(self):
+        """返回各控件类型的命中率"""
+        with self._lock:
+            return {
+                key: {
+                    "strategy": entry.get("strategy"),
+                    "hits": entry["hits"],
+                    "misses": entry["misses"],
+                    "hit_rate": entry["hits"] / (entry["hits"] + entry["misses"]),
+                }
+                for key, entry in self._entries.items()
+                if entry["hits"] + entry["misses"]
+            }
+
+    def _update(self, key, strategy=None, hit=False):
+        with self._lock:
+            entry = self._entries.setdefault(
+                key, {"strategy": None, "hits": 0, "misses": 0}
+            )
+            if hit:
+                entry["hits"] += 1
+                entry["strategy"] = strategy
+            else:
+                entry["misses"] += 1
+            self._dirty += 1
+            should_save = self._dirty >= SAVE_EVERY
+        if should_save:
+            self.save()
@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from ai_client import request_completion
+from request_executor import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# 对冲策略：off不对冲；hedge主请求超过阈值仍无首字节时再请求备用服务；race同时请求两者
+HEDGE_MODES = ("off", "hedge", "race")
+# 首字节耗时样本不足时使用的对冲阈值（秒）
+DEFAULT_HEDGE_DELAY = 2.0
+# 对冲阈值下限（秒），避免主服务很快时几乎每次都发出备用请求
+MIN_HEDGE_DELAY = 0.3
+# 开始使用学习到的p95前需要的样本数，以及每个服务保留的样本数
+MIN_SAMPLES = 20
+LATENCY_SAMPLES = 200
+
+
+def service_key(config):
+    return config["provider"], config["api_url"], config["model_name"]
+
+
+class LatencyTracker:
+    """按服务记录最近的首字节耗时，用于学习对冲阈值"""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.samples = samples
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = deque(maxlen=self.samples)
+            latencies.append(seconds)
+
+    def p95(self, key):
+        """返回首字节耗时的p95（秒），样本不足时返回None"""
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+
+class _Attempt:
+    """对冲中的一路请求"""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.token = CancelToken()
+        self.started = time.monotonic()
+        self.result = None
+        self.succeeded = False
+        self.done = False
+
+
+class _HedgedCall:
+    """一次对冲请求：最先返回首字节的一路胜出，其余各路被取消"""
+
+    def __init__(self, hedger, prompt, on_chunk, trace, on_stats=None):
+        self.hedger = hedger
+        self.prompt = prompt
+        self.on_chunk = on_chunk
+        self.trace = trace
+        self.on_stats = on_stats
+        self.attempts = []
+        self.winner = None
+        self.cancelled = False
+        self._condition = threading.Condition()
+
+    def start(self, name, config):
+        attempt = _Attempt(name, config)
+        with self._condition:
+            self.attempts.append(attempt)
+        threading.Thread(target=self._run, args=(attempt,), daemon=True).start()
+
+    def close(self):
+        """外部取消请求时由CancelToken调用，取消所有各路请求"""
+        with self._condition:
+            self.cancelled = True
+            attempts = list(self.attempts)
+            self._condition.notify_all()
+        for attempt in attempts:
+            attempt.token.cancel()
+
+    def wait(self, timeout=None):
+        """等待出现胜出者、所有请求结束或被取消"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.winner is not None or self.cancelled or self._all_done(),
+                timeout,
+            )
+
+    def wait_result(self):
+        """等待胜出的一路完成，没有胜出者时等待所有请求结束"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.cancelled
+                or (self.winner is not None and self.winner.done)
+                or (self.winner is None and self._all_done())
+            )
+
+    def _all_done(self):
+        return all(attempt.done for attempt in self.attempts)
+
+    def _claim(self, attempt):
+        """收到首字节时尝试成为胜出者，返回该路是否胜出"""
+        with self._condition:
+            if self.winner is not None:
+                return self.winner is attempt
+            self.winner = attempt
+            losers = [other for other in self.attempts if other is not attempt]
+            self._condition.notify_all()
+        if self.trace is not None:
+            self.trace.mark("first_byte")
+        self.hedger.on_first_byte(self, attempt)
+        for loser in losers:
+            loser.token.cancel()
+        return True
+
+    def _run(self, attempt):
+        def on_chunk(content, reasoning=False):
+            if self._claim(attempt):
+                self.on_chunk(content, reasoning)
+
+        def on_success(result):
+            attempt.succeeded = True
+            self._claim(attempt)
+
+        result = request_completion(
+            self.hedger.session_pool,
+            attempt.config,
+            self.prompt,
+            on_chunk=on_chunk if self.on_chunk is not None else None,
+            cancel_token=attempt.token,
+            on_success=on_success,
+            on_stats=self.on_stats,
+        )
+        with self._condition:
+            attempt.result = result
+            attempt.done = True
+            self._condition.notify_all()
+
+
+class Hedger:
+    """对冲请求：主服务迟迟没有首字节时向备用服务或模型再发一次请求，先返回的一路胜出
+
+    阈值为主服务最近首字节耗时的p95，并统计备用请求的发出和胜出次数以控制额外开销
+    """
+
+    def __init__(self, session_pool):
+        self.session_pool = session_pool
+        self.latency = LatencyTracker()
+        self.requests = 0
+        self.hedged = 0
+        self.raced = 0
+        self.backup_wins = 0
+        self._lock = threading.Lock()
+
+    def delay_for(self, config):
+        """返回发出备用请求前等待首字节的时间（秒）"""
+        p95 = self.latency.p95(service_key(config))
+        if p95 is None:
+            return DEFAULT_HEDGE_DELAY
+        return max(p95, MIN_HEDGE_DELAY)
+
+    def request(
+        self,
+        config,
+        prompt,
+        on_chunk=None,
+        cancel_token=None,
+        on_success=None,
+        trace=None,
+        on_stats=None,
+    ):
+        """按config中的hedge_mode和backup请求AI服务，参数含义见ai_client.request_completion"""
+        mode = config.get("hedge_mode", "off")
+        backup = config.get("backup")
+        call = _HedgedCall(self, prompt, on_chunk, trace, on_stats)
+        if cancel_token is not None:
+            # 外部取消时通过close()取消各路请求
+            cancel_token.attach(call)
+        with self._lock:
+            self.requests += 1
+
+        if trace is not None:
+            trace.mark("request_sent")
+        call.start("primary", config)
+        if mode == "race":
+            call.start("backup", backup)
+            with self._lock:
+                self.raced += 1
+        else:
+            delay = self.delay_for(config)
+            call.wait(delay)
+            if call.winner is None and not call.cancelled:
+                logger.debug("[Hedge] %.2f秒内主服务没有首字节，请求备用服务", delay)
+                call.start("backup", backup)
+                with self._lock:
+                    self.hedged += 1
+
+        call.wait_result()
+        if call.cancelled:
+            return ""
+        if trace is not None:
+            trace.mark("last_byte")
+        winner = call.winner
+        if winner is None:
+            # 各路都失败时返回主服务的错误信息
+            return call.attempts[0].result
+        if winner.succeeded and on_success is not None:
+            on_success(winner.result)
+        return winner.result
+
+    def on_first_byte(self, call, winner):
+        """记录主服务的首字节耗时，主服务落败时记录已等待的时间作为下限"""
+        primary = call.attempts[0]
+        self.latency.record(
+            service_key(primary.config), time.monotonic() - primary.started
+        )
+        if winner is not primary:
+            with self._lock:
+                self.backup_wins += 1
+            logger.debug("[Hedge] 备用服务胜出: %s", winner.config["provider"])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "raced": self.raced,
+                "backup_wins": self.backup_wins,
+            }
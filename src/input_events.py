@@ -0,0 +1,324 @@
+import logging
+import sys
+import threading
+
+from PyQt5.QtCore import QObject, QPoint, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QCursor
+
+logger = logging.getLogger(__name__)
+
+# 轮询模式下活跃时的检查间隔（毫秒）
+POLL_ACTIVE_INTERVAL = 30
+# 轮询模式下空闲时退避到的最大间隔（毫秒）
+POLL_IDLE_INTERVAL = 500
+
+
+class InputEventSource(QObject):
+    """鼠标输入事件源接口，向选择检测逻辑推送按下/移动/释放事件"""
+
+    mouse_down = pyqtSignal(QPoint)
+    mouse_move = pyqtSignal(QPoint)
+    mouse_up = pyqtSignal(QPoint)
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class HookEventSource(InputEventSource):
+    """基于WH_MOUSE_LL全局鼠标钩子的事件源，空闲时没有任何唤醒"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._thread = None
+        self._thread_id = None
+        self._pressed = False
+        self._ready = threading.Event()
+        self.error = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(2)
+        if self.error:
+            raise OSError(self.error)
+
+    def stop(self):
+        if self._thread_id is not None:
+            import ctypes
+
+            WM_QUIT = 0x0012
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread_id = None
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        WH_MOUSE_LL = 14
+        HC_ACTION = 0
+        WM_MOUSEMOVE = 0x0200
+        WM_LBUTTONDOWN = 0x0201
+        WM_LBUTTONUP = 0x0202
+
+        class MSLLHOOKSTRUCT(ctypes.Structure):
+            _fields_ = [
+                ("pt", wintypes.POINT),
+                ("mouseData", wintypes.DWORD),
+                ("flags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_void_p),
+            ]
+
+        LRESULT = ctypes.c_ssize_t
+        HOOKPROC = ctypes.WINFUNCTYPE(
+            LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM
+        )
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        user32.SetWindowsHookExW.restype = wintypes.HHOOK
+        user32.SetWindowsHookExW.argtypes = [
+            ctypes.c_int,
+            HOOKPROC,
+            wintypes.HINSTANCE,
+            wintypes.DWORD,
+        ]
+        user32.CallNextHookEx.restype = LRESULT
+        user32.CallNextHookEx.argtypes = [
+            wintypes.HHOOK,
+            ctypes.c_int,
+            wintypes.WPARAM,
+            wintypes.LPARAM,
+        ]
+
+        def callback(n_code, w_param, l_param):
+            if n_code == HC_ACTION:
+                info = ctypes.cast(l_param, ctypes.POINTER(MSLLHOOKSTRUCT)).contents
+                pos = QPoint(info.pt.x, info.pt.y)
+                # 钩子回调必须尽快返回，这里只转发事件，由GUI线程处理
+                if w_param == WM_LBUTTONDOWN:
+                    self._pressed = True
+                    self.mouse_down.emit(pos)
+                elif w_param == WM_LBUTTONUP:
+                    self._pressed = False
+                    self.mouse_up.emit(pos)
+                elif w_param == WM_MOUSEMOVE and self._pressed:
+                    # 只在拖动时转发移动事件，避免普通移动带来的开销
+                    self.mouse_move.emit(pos)
+            return user32.CallNextHookEx(None, n_code, w_param, l_param)
+
+        proc = HOOKPROC(callback)
+        hook = user32.SetWindowsHookExW(
+            WH_MOUSE_LL, proc, kernel32.GetModuleHandleW(None), 0
+        )
+        if not hook:
+            self.error = f"SetWindowsHookEx失败: {ctypes.GetLastError()}"
+            self._ready.set()
+            return
+
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWindowsHookEx(hook)
+
+
+class NullEventSource(InputEventSource):
+    """不产生任何事件的事件源，用于没有全局鼠标事件的非Windows平台（如无界面测试）"""
+
+    def start(self):
+        pass
+
+
+class PollingEventSource(InputEventSource):
+    """轮询鼠标状态的后备事件源，空闲时逐步拉长检查间隔"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        import win32api
+        import win32con
+
+        self._get_key_state = win32api.GetKeyState
+        self._vk_lbutton = win32con.VK_LBUTTON
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.poll)
+        self.interval = POLL_ACTIVE_INTERVAL
+        self.is_mouse_down = False
+        self.last_pos = None
+
+    def start(self):
+        self.last_pos = QCursor.pos()
+        self.timer.start(self.interval)
+
+    def stop(self):
+        self.timer.stop()
+
+    def poll(self):
+        pos = QCursor.pos()
+        mouse_down = self._get_key_state(self._vk_lbutton) < 0
+        active = mouse_down or pos != self.last_pos
+
+        if mouse_down and not self.is_mouse_down:
+            self.mouse_down.emit(pos)
+        elif not mouse_down and self.is_mouse_down:
+            self.mouse_up.emit(pos)
+        elif mouse_down and pos != self.last_pos:
+            self.mouse_move.emit(pos)
+
+        self.is_mouse_down = mouse_down
+        self.last_pos = pos
+
+        # 有活动时恢复快速检查，空闲时指数退避
+        if active:
+            self.interval = POLL_ACTIVE_INTERVAL
+        else:
+            self.interval = min(self.interval * 2, POLL_IDLE_INTERVAL)
+        self.timer.start(self.interval)
+
+
+class ScriptedEventSource(InputEventSource):
+    """按脚本回放鼠标事件，用于在无桌面环境下测试和基准测试选择逻辑
+
+    events为(延迟毫秒, "down"/"move"/"up", x, y)元组列表，延迟相对上一个事件
+    """
+
+    def __init__(self, events, parent=None):
+        super().__init__(parent)
+        self.events = list(events)
+        self._timers = []
+
+    def start(self):
+        elapsed = 0
+        for delay, kind, x, y in self.events:
+            elapsed += delay
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            # 默认的粗略定时器误差可达间隔的5%，长脚本中后面的事件会明显提前或推迟
+            timer.setTimerType(Qt.PreciseTimer)
+            timer.timeout.connect(
+                lambda kind=kind, pos=QPoint(x, y): self.dispatch(kind, pos)
+            )
+            timer.start(elapsed)
+            self._timers.append(timer)
+
+    def stop(self):
+        for timer in self._timers:
+            timer.stop()
+        self._timers.clear()
+
+    def replay_now(self):
+        """忽略延迟，同步回放全部事件"""
+        for _, kind, x, y in self.events:
+            self.dispatch(kind, QPoint(x, y))
+
+    def dispatch(self, kind, pos):
+        if kind == "down":
+            self.mouse_down.emit(pos)
+        elif kind == "move":
+            self.mouse_move.emit(pos)
+        elif kind == "up":
+            self.mouse_up.emit(pos)
+
+
+# 热键修饰键对应的RegisterHotKey标志
+HOTKEY_MODIFIERS = {"alt": 0x0001, "ctrl": 0x0002, "shift": 0x0004, "win": 0x0008}
+
+
+def parse_hotkey(text):
+    """解析"ctrl+alt+q"形式的热键，返回(修饰键标志, 虚拟键码)，无效时返回None"""
+    modifiers = 0
+    key = None
+    for part in text.lower().replace(" ", "").split("+"):
+        if part in HOTKEY_MODIFIERS:
+            modifiers |= HOTKEY_MODIFIERS[part]
+        elif len(part) == 1 and part.isalnum():
+            key = ord(part.upper())
+        elif part.startswith("f") and part[1:].isdigit() and 1 <= int(part[1:]) <= 24:
+            key = 0x70 + int(part[1:]) - 1
+        else:
+            return None
+    if key is None:
+        return None
+    return modifiers, key
+
+
+class GlobalHotkey(QObject):
+    """通过RegisterHotKey注册的全局热键，在独立线程中接收WM_HOTKEY"""
+
+    triggered = pyqtSignal()
+
+    def __init__(self, hotkey, parent=None):
+        super().__init__(parent)
+        self.hotkey = hotkey
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self.error = None
+
+    def start(self):
+        parsed = parse_hotkey(self.hotkey)
+        if parsed is None:
+            raise ValueError(f"无效的热键: {self.hotkey}")
+        if sys.platform != "win32":
+            raise OSError("全局热键仅支持Windows")
+        self._thread = threading.Thread(target=self._run, args=parsed, daemon=True)
+        self._thread.start()
+        self._ready.wait(2)
+        if self.error:
+            raise OSError(self.error)
+
+    def stop(self):
+        if self._thread_id is not None:
+            import ctypes
+
+            WM_QUIT = 0x0012
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread_id = None
+
+    def _run(self, modifiers, key):
+        import ctypes
+        from ctypes import wintypes
+
+        WM_HOTKEY = 0x0312
+        MOD_NOREPEAT = 0x4000
+        HOTKEY_ID = 1
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        # 热键注册在当前线程，WM_HOTKEY会投递到本线程的消息队列
+        if not user32.RegisterHotKey(None, HOTKEY_ID, modifiers | MOD_NOREPEAT, key):
+            self.error = f"RegisterHotKey失败: {ctypes.GetLastError()}"
+            self._ready.set()
+            return
+
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.message == WM_HOTKEY:
+                self.triggered.emit()
+        user32.UnregisterHotKey(None, HOTKEY_ID)
+
+
+def create_event_source(kind="auto", parent=None):
+    """创建输入事件源：auto优先使用鼠标钩子，失败时退回轮询"""
+    if kind in ("auto", "hook") and sys.platform == "win32":
+        source = HookEventSource(parent)
+        try:
+            source.start()
+            logger.debug("[Input] 使用鼠标钩子监听选择")
+            return source
+        except OSError as e:
+            logger.warning("[Input] 鼠标钩子不可用，改用轮询: %s", e)
+    if sys.platform != "win32":
+        logger.warning("[Input] 当前平台不支持监听鼠标选择")
+        return NullEventSource(parent)
+    source = PollingEventSource(parent)
+    source.start()
+    logger.debug("[Input] 使用轮询监听选择")
+    return source
@@ -0,0 +1,150 @@
+import re
+from collections import deque
+
+# 超过该token数的选中文本按段切分后分别请求
+DEFAULT_CHUNK_TOKENS = 1200
+# 同时进行的分段请求数量
+DEFAULT_PARALLELISM = 3
+# 选中文本的长度上限（字符），超出部分直接丢弃，避免在界面间复制超大字符串
+MAX_SELECTION_CHARS = 100000
+
+# 中日韩等文字大约每个字符一个token，其余文字大约每4个字符一个token
+_WIDE_CHARS = re.compile(r"[⺀-鿿가-힯豈-﫿＀-￯]")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\r\n\s*\r\n")
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;.])\s+|(?<=[。！？；])")
+
+
+def estimate_tokens(text):
+    """粗略估计文本的token数"""
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+def split_text(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """按段落、句子边界将文本切分为不超过max_tokens的若干段"""
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current).strip())
+        current = []
+        current_tokens = 0
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens > max_tokens:
+            # 段落过长时按句子切分
+            flush()
+            for piece in _split_paragraph(paragraph, max_tokens):
+                chunks.append(piece)
+            continue
+        if current_tokens + tokens > max_tokens:
+            flush()
+        current.append(paragraph)
+        current_tokens += tokens
+    flush()
+    return chunks
+
+
+def _split_paragraph(paragraph, max_tokens):
+    pieces = []
+    current = ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) > max_tokens:
+            # 没有句子边界的超长文本按长度硬切
+            if current:
+                pieces.append(current)
+                current = ""
+            ratio = max(1, len(sentence) * max_tokens // estimate_tokens(sentence))
+            pieces.extend(
+                sentence[start : start + ratio]
+                for start in range(0, len(sentence), ratio)
+            )
+            continue
+        candidate = f"{current} {sentence}" if current else sentence
+        if current and estimate_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            candidate = sentence
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class ChunkedJob:
+    """长文本的分段请求：限制并发，并按原文顺序拼接各段的输出
+
+    第一个未完成的分段可以边生成边显示，之后的分段先缓存，等前面的分段完成后再依次输出
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, chunks, template, config, cache_key=None, trace=None):
+        self.chunks = chunks
+        self.template = template
+        self.config = config
+        self.cache_key = cache_key
+        self.trace = trace
+        self.window = None
+        self.results = [None] * len(chunks)
+        # 请求ID -> 分段下标
+        self.requests = {}
+        # 请求成功的分段下标，全部成功时才写入缓存
+        self.succeeded = set()
+        self._pending = deque(range(len(chunks)))
+        self._buffers = [[] for _ in chunks]
+        # 正在显示的分段及其是否已有输出
+        self._head = 0
+        self._head_shown = False
+
+    def next_prompt(self):
+        """取出下一个待请求的分段，返回(下标, 提示词)，没有时返回None"""
+        if not self._pending:
+            return None
+        index = self._pending.popleft()
+        return index, self.template.format(text=self.chunks[index])
+
+    def on_delta(self, index, delta):
+        """收到分段的流式输出，返回此时可以追加显示的文本"""
+        if index == self._head:
+            self._head_shown = True
+            return delta
+        self._buffers[index].append(delta)
+        return ""
+
+    def on_finished(self, index, result):
+        """分段完成，返回此时可以追加显示的文本"""
+        self.results[index] = result
+        self._buffers[index] = []
+        if index != self._head:
+            return ""
+        # 没有流式输出的分段（如请求出错）直接显示完整结果
+        output = [] if self._head_shown else [result]
+        self._head += 1
+        # 依次输出已完成的后续分段，遇到未完成的分段时输出其已缓存的部分
+        while self._head < len(self.chunks):
+            output.append(self.SEPARATOR)
+            if self.results[self._head] is not None:
+                output.append(self.results[self._head])
+                self._head += 1
+                continue
+            buffered = "".join(self._buffers[self._head])
+            self._buffers[self._head] = []
+            self._head_shown = bool(buffered)
+            output.append(buffered)
+            break
+        return "".join(output)
+
+    def done(self):
+        return self._head >= len(self.chunks)
+
+    def text(self):
+        return self.SEPARATOR.join(result or "" for result in self.results)
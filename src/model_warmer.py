@@ -0,0 +1,229 @@
+import logging
+import re
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+# Ollama默认的模型保留时间
+DEFAULT_KEEP_ALIVE = "5m"
+# 在保留时间的该比例处刷新，确保在模型被卸载前完成
+REFRESH_FRACTION = 0.8
+# load_duration超过该值（秒）视为冷启动（模型重新加载到内存）
+COLD_START_THRESHOLD = 1.0
+# 用户无操作超过该时间（秒）后暂停预热，允许模型被卸载
+IDLE_THRESHOLD = 600
+# 预热请求的超时（秒），首次加载模型可能需要较长时间
+WARMUP_TIMEOUT = (5, 120)
+
+_DURATION = re.compile(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+
+def parse_keep_alive(value):
+    """把keep_alive转换为秒数，负数表示永久保留时返回None，无法解析时按默认值处理"""
+    value = str(value or DEFAULT_KEEP_ALIVE).strip().lower()
+    total = 0.0
+    position = 0
+    for match in _DURATION.finditer(value):
+        if match.start() != position:
+            break
+        total += float(match.group(1)) * _UNITS[match.group(2)]
+        position = match.end()
+    if position != len(value) or not value:
+        return parse_keep_alive(DEFAULT_KEEP_ALIVE)
+    return None if total < 0 else total
+
+
+def keep_alive_value(value):
+    """请求中发送的keep_alive：纯数字按秒数发送，其余按时长字符串发送"""
+    value = str(value or DEFAULT_KEEP_ALIVE).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def idle_seconds():
+    """返回用户最近一次键盘鼠标操作距今的秒数，非Windows系统返回0"""
+    if sys.platform != "win32":
+        return 0.0
+    import ctypes
+    from ctypes import wintypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return 0.0
+    elapsed = ctypes.windll.kernel32.GetTickCount() - info.dwTime
+    return (elapsed & 0xFFFFFFFF) / 1000
+
+
+class ModelWarmer(QObject):
+    """管理Ollama模型的常驻：启动、修改设置时以及保留时间到期前发送空请求预热
+
+    用户长时间无操作时暂停预热，之后首次选中文本时再预热；
+    请求和预热返回的load_duration用于识别并统计冷启动
+    """
+
+    # 模型被使用（请求或预热完成）后重新计算刷新时间，可从工作线程发出
+    used = pyqtSignal()
+
+    def __init__(self, session_pool, parent=None):
+        super().__init__(parent)
+        self.session_pool = session_pool
+        self.config = None
+        self.paused = False
+        self.last_used = None
+        self.requests = 0
+        self.cold_starts = 0
+        self.warmups = 0
+        self.cold_warmups = 0
+        self._lock = threading.Lock()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.refresh)
+        self.used.connect(self.schedule)
+
+    def configure(self, config):
+        """应用配置，模型或地址变化时立即预热"""
+        previous = self.config
+        self.config = config
+        key = self._model_key(config)
+        if previous is None or key != self._model_key(previous):
+            self.warm("设置变化" if previous is not None else "启动")
+        else:
+            self.schedule()
+
+    def enabled(self):
+        config = self.config
+        return (
+            config is not None
+            and config.provider == "Ollama"
+            and config.model_warmup
+            and parse_keep_alive(config.keep_alive) != 0
+        )
+
+    def warm(self, reason):
+        """在后台向每个地址发送空请求，使模型加载到内存"""
+        if not self.enabled():
+            self.timer.stop()
+            return
+        self.paused = False
+        config = self.config
+        logger.debug("[Warmup] 预热模型 %s（%s）", config.model_name, reason)
+        for endpoint in config.endpoints():
+            threading.Thread(
+                target=self._warm_endpoint,
+                args=(endpoint, config.model_name, config.keep_alive),
+                daemon=True,
+            ).start()
+
+    def refresh(self):
+        """保留时间到期前刷新；用户长时间无操作时暂停"""
+        if idle_seconds() > IDLE_THRESHOLD:
+            logger.debug("[Warmup] 用户长时间无操作，暂停预热")
+            self.paused = True
+            return
+        self.warm("保留时间即将到期")
+
+    def on_selection(self):
+        """选中文本时，若预热已暂停或模型可能已被卸载则立即预热"""
+        if not self.enabled():
+            return
+        keep_alive = parse_keep_alive(self.config.keep_alive)
+        expired = self.last_used is None or (
+            keep_alive is not None and time.monotonic() - self.last_used > keep_alive
+        )
+        if self.paused or expired:
+            self.warm("恢复使用")
+
+    def schedule(self):
+        """在保留时间到期前安排下一次刷新，永久保留时不需要刷新"""
+        if not self.enabled() or self.paused:
+            self.timer.stop()
+            return
+        keep_alive = parse_keep_alive(self.config.keep_alive)
+        if keep_alive is None:
+            self.timer.stop()
+            return
+        self.timer.start(int(keep_alive * REFRESH_FRACTION * 1000))
+
+    def on_request_stats(self, endpoint, stats):
+        """记录请求的load_duration，可在工作线程调用"""
+        if "load_duration" not in stats:
+            return
+        cold = stats["load_duration"] / 1e9 > COLD_START_THRESHOLD
+        with self._lock:
+            self.requests += 1
+            if cold:
+                self.cold_starts += 1
+            self.last_used = time.monotonic()
+        self.paused = False
+        if cold:
+            logger.info(
+                "[Warmup] 冷启动: %s 加载模型耗时%.1f秒",
+                endpoint,
+                stats["load_duration"] / 1e9,
+            )
+        self.used.emit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "cold_starts": self.cold_starts,
+                "warmups": self.warmups,
+                "cold_warmups": self.cold_warmups,
+            }
+
+    def _model_key(self, config):
+        return (
+            config.provider,
+            tuple(config.endpoints()),
+            config.model_name,
+            config.keep_alive,
+            config.model_warmup,
+        )
+
+    def _warm_endpoint(self, endpoint, model_name, keep_alive):
+        # 不带prompt的请求只加载模型，不生成内容
+        data = {
+            "model": model_name,
+            "keep_alive": keep_alive_value(keep_alive),
+            "stream": False,
+        }
+        try:
+            session = self.session_pool.session_for("Ollama")
+            response = session.post(
+                f"{endpoint}/api/generate", json=data, timeout=WARMUP_TIMEOUT
+            )
+            try:
+                if response.status_code != 200:
+                    logger.debug(
+                        "[Warmup] 预热失败: %s HTTP状态码 %s",
+                        endpoint,
+                        response.status_code,
+                    )
+                    return
+                load_duration = response.json().get("load_duration", 0) / 1e9
+            finally:
+                response.close()
+        except Exception as e:
+            logger.debug("[Warmup] 预热失败: %s %s", endpoint, e)
+            return
+        with self._lock:
+            self.warmups += 1
+            if load_duration > COLD_START_THRESHOLD:
+                self.cold_warmups += 1
+            self.last_used = time.monotonic()
+        logger.debug(
+            "[Warmup] 预热完成: %s 加载模型耗时%.1f秒", endpoint, load_duration
+        )
+        self.used.emit()
@@ -0,0 +1,351 @@
+"""离线词典：把ECDICT/StarDict风格的词表一次性构建为排序的二进制索引，查询时通过mmap二分查找
+
+构建: python src/offline_dict.py build ecdict.csv -o ~/.clicknow_dict.idx
+查询: python src/offline_dict.py lookup ~/.clicknow_dict.idx perceived
+"""
+
+import argparse
+import csv
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# 索引文件格式：文件头、按词条排序的记录偏移表、记录区
+MAGIC = b"CNDICT1\0"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<Q")
+# 记录：词条长度、类型、内容长度，其后为词条和内容（UTF-8）
+RECORD = struct.Struct("<HBI")
+# 记录类型：词条释义；词形变化指向原形
+ENTRY = 0
+LEMMA = 1
+FIELD_SEPARATOR = "\x1f"
+
+# 走离线词典的选中文本上限：单词或短语的词数和字符数
+MAX_LOOKUP_WORDS = 4
+MAX_LOOKUP_CHARS = 64
+# ECDICT的exchange字段中的词形变化：过去式、过去分词、现在分词、第三人称单数、比较级、最高级、复数
+EXCHANGE_INFLECTIONS = ("p", "d", "i", "3", "r", "t", "s")
+
+_WORD = re.compile(r"^[A-Za-z][A-Za-z'\-. ]*$")
+_STRIP = " \t\r\n\"'“”‘’`.,;:!?()[]{}<>，。；：！？（）【】《》"
+# 无法从词表得知原形时依次尝试的规则：(后缀, 替换)
+_LEMMA_RULES = (
+    ("ies", "y"),
+    ("ied", "y"),
+    ("ier", "y"),
+    ("iest", "y"),
+    ("ves", "f"),
+    ("es", ""),
+    ("s", ""),
+    ("ed", ""),
+    ("ed", "e"),
+    ("ing", ""),
+    ("ing", "e"),
+    ("er", ""),
+    ("er", "e"),
+    ("est", ""),
+    ("est", "e"),
+    ("'s", ""),
+)
+
+
+@dataclass(frozen=True)
+class DictEntry:
+    """一个词条：词头、音标、释义，lemma_of为查询的词形变化（查询词本身即词条时为空）"""
+
+    word: str
+    phonetic: str
+    translation: str
+    lemma_of: str = ""
+
+
+def normalize_key(text):
+    """查询和索引使用的词条形式：去掉两端标点，小写，合并空白"""
+    return " ".join(text.strip(_STRIP).lower().split())
+
+
+def lookup_key(text):
+    """选中文本适合离线查询时返回词条形式，否则返回None（长文本、非英文单词或短语）"""
+    if len(text) > MAX_LOOKUP_CHARS:
+        return None
+    key = normalize_key(text)
+    if not key or not _WORD.match(key) or len(key.split()) > MAX_LOOKUP_WORDS:
+        return None
+    return key
+
+
+def lemma_candidates(key):
+    """按常见的词形变化规则猜测原形，包括双写辅音（stopped → stop）"""
+    candidates = []
+    for suffix, replacement in _LEMMA_RULES:
+        if key.endswith(suffix) and len(key) - len(suffix) >= 2:
+            stem = key[: -len(suffix)]
+            candidates.append(stem + replacement)
+            if not replacement and len(stem) >= 3 and stem[-1] == stem[-2]:
+                candidates.append(stem[:-1])
+    return candidates
+
+
+def format_entry(entry):
+    """结果窗口中显示的释义"""
+    lines = [entry.word + (f"  [{entry.phonetic}]" if entry.phonetic else "")]
+    if entry.lemma_of:
+        lines.append(f"（{entry.lemma_of} 的原形）")
+    lines.append("")
+    lines.append(entry.translation)
+    return "\n".join(lines)
+
+
+class OfflineDictionary:
+    """只读的离线词典索引
+
+    索引文件通过mmap映射，查询时二分查找偏移表并只解码命中的记录，
+    不会把整个词典读入Python对象，打开数百万词条的索引也只需常数时间
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = self._map = None
+        self._file = open(path, "rb")
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        """映射索引文件并检查文件头和偏移表，格式不对时抛出ValueError"""
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"词典索引为空或不完整: {self.path}")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是词典索引文件: {self.path}")
+        if size < HEADER.size + self.count * OFFSET.size:
+            raise ValueError(f"词典索引不完整: {self.path}")
+        # 偏移表直接按64位整数数组访问（索引为小端序，与Windows/x86一致）
+        if sys.byteorder == "little":
+            self._offsets = memoryview(self._map)[
+                HEADER.size : HEADER.size + self.count * OFFSET.size
+            ].cast("Q")
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._offsets is not None:
+            self._offsets.release()
+            self._offsets = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def lookup(self, text):
+        """查询单词或短语，词形变化返回原形的释义，查不到时返回None"""
+        key = lookup_key(text)
+        if key is None:
+            return None
+        record = self._find(key)
+        if record is None:
+            for candidate in lemma_candidates(key):
+                record = self._find(candidate)
+                if record is not None and record[0] == ENTRY:
+                    break
+            else:
+                return None
+        kind, value = record
+        if kind == LEMMA:
+            record = self._find(value)
+            if record is None or record[0] != ENTRY:
+                return None
+            value = record[1]
+        word, phonetic, translation = value.split(FIELD_SEPARATOR)
+        lemma_of = "" if word.lower() == key else " ".join(text.strip(_STRIP).split())
+        return DictEntry(word, phonetic, translation, lemma_of)
+
+    def prefix(self, text, limit=10):
+        """返回以text开头的词头，按字母顺序，最多limit个"""
+        prefix = normalize_key(text).encode("utf-8")
+        if not prefix:
+            return []
+        index = self._lower_bound(prefix)
+        words = []
+        while index < self.count and len(words) < limit:
+            key, kind, value = self._record(index)
+            if not key.startswith(prefix):
+                break
+            if kind == ENTRY:
+                words.append(value.decode("utf-8").split(FIELD_SEPARATOR, 1)[0])
+            index += 1
+        return words
+
+    def _find(self, key):
+        target = key.encode("utf-8")
+        index = self._lower_bound(target)
+        if index >= self.count:
+            return None
+        found, kind, value = self._record(index)
+        if found != target:
+            return None
+        return kind, value.decode("utf-8")
+
+    def _lower_bound(self, target):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _offset(self, index):
+        if self._offsets is not None:
+            return self._offsets[index]
+        return OFFSET.unpack_from(self._map, HEADER.size + index * OFFSET.size)[0]
+
+    def _key(self, index):
+        offset = self._offset(index)
+        # 词条长度为记录开头的两个字节（小端序）
+        start = offset + RECORD.size
+        key_length = self._map[offset] | self._map[offset + 1] << 8
+        return self._map[start : start + key_length]
+
+    def _record(self, index):
+        offset = self._offset(index)
+        key_length, kind, value_length = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        key = self._map[start : start + key_length]
+        value = self._map[start + key_length : start + key_length + value_length]
+        return key, kind, value
+
+
+def read_source(path):
+    """逐条读出词表：.csv按ECDICT格式（word、phonetic、translation、exchange列），
+    其余按StarDict导出的制表符分隔文本（词条\\t释义）
+
+    返回(词头, 音标, 释义, 词形变化列表)
+    """
+    if path.lower().endswith(".csv"):
+        csv.field_size_limit(2**31 - 1)
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                translation = row.get("translation") or row.get("definition") or ""
+                inflections = []
+                for part in (row.get("exchange") or "").split("/"):
+                    kind, _, form = part.partition(":")
+                    if kind in EXCHANGE_INFLECTIONS and form:
+                        inflections.append(form)
+                yield (
+                    row.get("word") or "",
+                    row.get("phonetic") or "",
+                    translation.replace("\\n", "\n").strip(),
+                    inflections,
+                )
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            word, _, translation = line.rstrip("\n").partition("\t")
+            if translation:
+                yield word, "", translation.replace("\\n", "\n").strip(), []
+
+
+def build_index(source, output):
+    """从词表构建索引文件，返回词条数；先写入临时文件，完成后替换"""
+    entries = {}
+    lemmas = {}
+    for word, phonetic, translation, inflections in read_source(source):
+        key = normalize_key(word)
+        if not key or not translation:
+            continue
+        # 大小写不同的同名词条优先保留小写形式，如us与US
+        if key not in entries or word == key:
+            value = FIELD_SEPARATOR.join(
+                (word, phonetic.replace(FIELD_SEPARATOR, " "), translation)
+            )
+            entries[key] = value.encode("utf-8")
+        for form in inflections:
+            form_key = normalize_key(form)
+            if form_key and form_key != key:
+                lemmas.setdefault(form_key, key)
+
+    records = [(key.encode("utf-8"), ENTRY, value) for key, value in entries.items()]
+    # 本身也是词头的词形变化（如left）直接显示自己的释义
+    records.extend(
+        (form.encode("utf-8"), LEMMA, base.encode("utf-8"))
+        for form, base in lemmas.items()
+        if form not in entries and base in entries
+    )
+    del entries, lemmas
+    # 按UTF-8字节排序，与查询时的字节比较一致
+    records.sort(key=lambda record: record[0])
+
+    temp = f"{output}.tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        position = HEADER.size + OFFSET.size * len(records)
+        offsets = bytearray()
+        for key, kind, value in records:
+            offsets += OFFSET.pack(position)
+            position += RECORD.size + len(key) + len(value)
+        f.write(offsets)
+        for key, kind, value in records:
+            f.write(RECORD.pack(len(key), kind, len(value)))
+            f.write(key)
+            f.write(value)
+    os.replace(temp, output)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线词典索引")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="从ECDICT CSV或制表符分隔的词表构建索引")
+    build.add_argument("source")
+    build.add_argument(
+        "-o",
+        "--output",
+        default=os.path.join(os.path.expanduser("~"), ".clicknow_dict.idx"),
+    )
+    lookup = commands.add_parser("lookup", help="查询单词")
+    lookup.add_argument("index")
+    lookup.add_argument("word")
+    lookup.add_argument("--prefix", action="store_true", help="列出以该词开头的词条")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_index(args.source, args.output)
+        print(
+            f"已写入{count}条记录到 {args.output}"
+            f"（{os.path.getsize(args.output) / 1024 / 1024:.1f}MB，"
+            f"耗时{time.perf_counter() - start:.1f}秒）"
+        )
+        return
+
+    dictionary = OfflineDictionary(args.index)
+    try:
+        if args.prefix:
+            print("\n".join(dictionary.prefix(args.word)))
+            return
+        entry = dictionary.lookup(args.word)
+        if entry is None:
+            print("未找到")
+            sys.exit(1)
+        print(format_entry(entry))
+    finally:
+        dictionary.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import time
+from collections import deque
+
+# 每小时允许的预取请求数量
+DEFAULT_BUDGET_PER_HOUR = 30
+
+
+class Prefetcher:
+    """悬浮按钮显示期间预先发起可能的请求，点击时直接接管结果"""
+
+    def __init__(self, budget_per_hour=DEFAULT_BUDGET_PER_HOUR):
+        self.budget_per_hour = budget_per_hour
+        self._history = deque()
+        # cache_key -> {"request_id", "chunks", "reasoning", "result", "done"}
+        self._entries = {}
+        self._keys = {}
+        self.started = 0
+        self.hits = 0
+        self.wasted = 0
+        self.over_budget = 0
+
+    def allow(self):
+        """检查最近一小时的预取次数是否仍在预算内"""
+        now = time.monotonic()
+        while self._history and now - self._history[0] > 3600:
+            self._history.popleft()
+        if len(self._history) >= self.budget_per_hour:
+            self.over_budget += 1
+            return False
+        return True
+
+    def is_tracking(self, cache_key):
+        return cache_key in self._entries
+
+    def track(self, cache_key, request_id):
+        """登记一个已提交的预取请求"""
+        self._history.append(time.monotonic())
+        self._entries[cache_key] = {
+            "request_id": request_id,
+            "chunks": [],
+            "reasoning": [],
+            "result": None,
+            "done": False,
+        }
+        self._keys[request_id] = cache_key
+        self.started += 1
+
+    def on_chunk(self, request_id, content, reasoning=False):
+        cache_key = self._keys.get(request_id)
+        if cache_key is not None:
+            entry = self._entries[cache_key]
+            entry["reasoning" if reasoning else "chunks"].append(content)
+
+    def on_finished(self, request_id, result):
+        cache_key = self._keys.pop(request_id, None)
+        if cache_key is not None:
+            entry = self._entries[cache_key]
+            entry["result"] = result
+            entry["done"] = True
+
+    def claim(self, cache_key):
+        """用户点击时取走对应的预取结果，未预取时返回None"""
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return None
+        self._keys.pop(entry["request_id"], None)
+        self.hits += 1
+        return entry
+
+    def release(self, cancel):
+        """悬浮按钮关闭时取消未被使用的预取请求"""
+        for entry in self._entries.values():
+            if not entry["done"]:
+                cancel(entry["request_id"])
+            self.wasted += 1
+        self._entries.clear()
+        self._keys.clear()
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "wasted": self.wasted,
+            "over_budget": self.over_budget,
+            "hit_rate": self.hits / self.started if self.started else 0.0,
+        }
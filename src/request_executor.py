@@ -0,0 +1,116 @@
+import itertools
+import logging
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+# 同时进行的AI请求数量上限
+DEFAULT_MAX_WORKERS = 3
+
+
+class CancelToken:
+    """请求取消标记，取消时会同时关闭正在读取的HTTP连接"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._response = None
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def attach(self, response):
+        """登记当前请求的响应对象；若已取消则立即关闭"""
+        with self._lock:
+            self._response = response
+        if self._event.is_set():
+            response.close()
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            response = self._response
+        if response is not None:
+            # 在其他线程关闭连接会让阻塞中的读取立即返回
+            response.close()
+
+
+class _RequestTask(QRunnable):
+    """在线程池中执行单个AI请求"""
+
+    def __init__(self, executor, request_id, func, token):
+        super().__init__()
+        self.executor = executor
+        self.request_id = request_id
+        self.func = func
+        self.token = token
+
+    def run(self):
+        if self.token.is_cancelled():
+            self.executor._discard(self.request_id)
+            return
+
+        self.executor.request_started.emit(self.request_id)
+
+        def on_chunk(content, reasoning=False):
+            if not self.token.is_cancelled():
+                self.executor.chunk_received.emit(self.request_id, content, reasoning)
+
+        try:
+            result = self.func(on_chunk, self.token)
+        except Exception as e:
+            result = f"请求失败: {str(e)}"
+
+        if not self.token.is_cancelled():
+            self.executor.request_finished.emit(self.request_id, result)
+        self.executor._discard(self.request_id)
+
+
+class RequestExecutor(QObject):
+    """基于QThreadPool的AI请求执行器，结果通过Qt信号回到GUI线程"""
+
+    request_started = pyqtSignal(int)
+    # (请求ID, 新增文本, 是否为思考过程)
+    chunk_received = pyqtSignal(int, str, bool)
+    request_finished = pyqtSignal(int, str)
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self._ids = itertools.count(1)
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func):
+        """提交请求，func(on_chunk, token) 在工作线程中执行并返回最终结果"""
+        request_id = next(self._ids)
+        token = CancelToken()
+        with self._lock:
+            self._tokens[request_id] = token
+        self.pool.start(_RequestTask(self, request_id, func, token))
+        return request_id
+
+    def cancel(self, request_id):
+        """取消指定请求，排队中的请求不会再执行"""
+        with self._lock:
+            token = self._tokens.pop(request_id, None)
+        if token is not None:
+            token.cancel()
+            logger.debug("[Executor] 已取消请求 #%s", request_id)
+
+    def cancel_all(self):
+        with self._lock:
+            request_ids = list(self._tokens)
+        for request_id in request_ids:
+            self.cancel(request_id)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._tokens)
+
+    def _discard(self, request_id):
+        with self._lock:
+            self._tokens.pop(request_id, None)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 内存缓存条目上限
+DEFAULT_MEMORY_ENTRIES = 256
+# 磁盘缓存条目上限
+DEFAULT_DISK_ENTRIES = 5000
+# 缓存有效期（秒），默认7天
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def normalize_text(text):
+    """选中文本的规范形式，用作缓存和去重的键：先修复断行、断词和页眉页脚，
+    再合并空白，使从PDF、网页等不同来源复制的同一段内容命中同一缓存
+    """
+    # 首次使用时才导入，应用启动时不加载文字分类等模块
+    from selection_text import normalize_selection
+
+    return " ".join(normalize_selection(text).split())
+
+
+def make_cache_key(provider, model_name, template, text):
+    """根据提供方、模型、提示词模板和规范化文本生成内容寻址的键"""
+    raw = json.dumps(
+        [provider, model_name, template, normalize_text(text)], ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """两级结果缓存：内存LRU + SQLite磁盘存储"""
+
+    def __init__(
+        self,
+        db_path,
+        memory_entries=DEFAULT_MEMORY_ENTRIES,
+        disk_entries=DEFAULT_DISK_ENTRIES,
+        ttl=DEFAULT_TTL,
+    ):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)"
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - ttl,)
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning("[Cache] 打开磁盘缓存失败，仅使用内存缓存: %s", e)
+            self._db = None
+
+    def get(self, key):
+        """查询缓存，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] < self.ttl:
+                        self._db.execute(
+                            "UPDATE responses SET accessed = ? WHERE key = ?",
+                            (now, key),
+                        )
+                        self._db.commit()
+                        self._remember(key, row[0], row[1])
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return row[0]
+                except sqlite3.Error as e:
+                    logger.warning("[Cache] 读取磁盘缓存失败: %s", e)
+
+            self.misses += 1
+            return None
+
+    def contains(self, key):
+        """判断缓存中是否有未过期的结果，不更新命中统计和访问顺序"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                return True
+            if self._db is None:
+                return False
+            try:
+                row = self._db.execute(
+                    "SELECT created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("[Cache] 读取磁盘缓存失败: %s", e)
+                return False
+            return row is not None and now - row[0] < self.ttl
+
+    def put(self, key, value):
+        """写入缓存，超出上限时淘汰最久未使用的条目"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning("[Cache] 写入磁盘缓存失败: %s", e)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                    self._db.execute("VACUUM")
+                except sqlite3.Error as e:
+                    logger.warning("[Cache] 清空磁盘缓存失败: %s", e)
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            disk_entries = disk_bytes = 0
+            if self._db is not None:
+                try:
+                    disk_entries, disk_bytes = self._db.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) "
+                        "FROM responses"
+                    ).fetchone()
+                except sqlite3.Error:
+                    pass
+            lookups = self.hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
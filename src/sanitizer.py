@@ -0,0 +1,114 @@
+import re
+
+# 需要转换为文本的HTML标签，其余标签原样保留
+TAG_REPLACEMENTS = {
+    "<p>": "",
+    "</p>": "\n",
+    "<br>": "\n",
+    "<br/>": "\n",
+    "<br />": "\n",
+    "<div>": "",
+    "</div>": "\n",
+    "<code>": "",
+    "</code>": "",
+    "<pre>": "",
+    "</pre>": "\n",
+}
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+# 可能被分块截断的最长标签长度
+MAX_TAG_LENGTH = max(len(tag) for tag in (*TAG_REPLACEMENTS, THINK_OPEN, THINK_CLOSE))
+
+_TAG_PATTERN = re.compile(r"<[^<>]{0,%d}>" % MAX_TAG_LENGTH)
+
+
+class ResponseSanitizer:
+    """增量清理模型输出：单次扫描去掉<think>思考过程并转换常见HTML标签
+
+    feed()每次返回新增的可显示文本，标签被分块截断时会暂存到下一块再处理；
+    keep_reasoning为True时思考过程不会丢弃，而是通过feed的第二个返回值交给调用方
+    """
+
+    def __init__(self, keep_reasoning=False):
+        self.keep_reasoning = keep_reasoning
+        self.in_think = False
+        self._pending = ""
+        self._started = False
+        self._answer = []
+        self._reasoning = []
+
+    def feed(self, chunk):
+        """处理一块输出，返回(新增回答文本, 新增思考文本)"""
+        data = self._pending + chunk
+        self._pending = ""
+
+        # 末尾未闭合的"<"可能是被截断的标签，留到下一块
+        cut = data.rfind("<")
+        if cut != -1 and ">" not in data[cut:] and len(data) - cut <= MAX_TAG_LENGTH:
+            data, self._pending = data[:cut], data[cut:]
+
+        answer = []
+        reasoning = []
+        position = 0
+        for match in _TAG_PATTERN.finditer(data):
+            tag = match.group().lower()
+            if tag not in TAG_REPLACEMENTS and tag not in (THINK_OPEN, THINK_CLOSE):
+                continue
+            self._emit(data[position : match.start()], answer, reasoning)
+            position = match.end()
+            if tag == THINK_OPEN:
+                self.in_think = True
+            elif tag == THINK_CLOSE:
+                self.in_think = False
+                # 与原有行为一致：思考结束前的回答内容全部丢弃
+                self._answer.clear()
+                answer.clear()
+                self._started = False
+            elif not self.in_think:
+                self._emit(TAG_REPLACEMENTS[tag], answer, reasoning)
+        self._emit(data[position:], answer, reasoning)
+
+        answer_text = "".join(answer)
+        reasoning_text = "".join(reasoning)
+        if answer_text:
+            self._answer.append(answer_text)
+        if reasoning_text:
+            self._reasoning.append(reasoning_text)
+        return answer_text, reasoning_text
+
+    def finish(self):
+        """输出结束，处理暂存的末尾内容"""
+        data, self._pending = self._pending, ""
+        answer = []
+        reasoning = []
+        self._emit(data, answer, reasoning)
+        answer_text = "".join(answer)
+        reasoning_text = "".join(reasoning)
+        if answer_text:
+            self._answer.append(answer_text)
+        if reasoning_text:
+            self._reasoning.append(reasoning_text)
+        return answer_text, reasoning_text
+
+    def text(self):
+        """返回目前为止的全部回答文本"""
+        return "".join(self._answer).rstrip()
+
+    def reasoning(self):
+        return "".join(self._reasoning).strip()
+
+    def _emit(self, text, answer, reasoning):
+        if not text:
+            return
+        if self.in_think:
+            if self.keep_reasoning:
+                reasoning.append(text)
+            return
+        # 去掉回答开头的空白
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        answer.append(text)
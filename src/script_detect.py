@@ -0,0 +1,227 @@
+import re
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# 只统计选中文本开头的这么多字符，长文本的分类开销保持不变
+SAMPLE_CHARS = 1000
+# 按估计的token占比判断语言：汉字占比达到该值视为中文，介于两者之间视为中英混合
+CHINESE_SHARE = 0.7
+MIXED_SHARE = 0.2
+# 拉丁、西里尔、阿拉伯字母约4个字符一个token，与汉字、假名、谚文比较时按此折算
+LETTERS_PER_TOKEN = 4
+
+# 各文字的码位范围，每类由正则在C层一次扫描计数
+SCRIPT_RANGES = {
+    "han": "㐀-䶿一-鿿豈-﫿",
+    "kana": "぀-ヿㇰ-ㇿｦ-ﾟ",
+    "hangul": "ᄀ-ᇿ㄰-㆏가-힯",
+    "latin": "A-Za-zÀ-ɏ",
+    "cyrillic": "Ѐ-ӿ",
+    "arabic": "؀-ۿ",
+    "digit": "0-9０-９",
+    "space": "\\s",
+}
+_SCRIPTS = {name: re.compile(f"[{ranges}]") for name, ranges in SCRIPT_RANGES.items()}
+# ASCII字符所属的类别：字节映射为类别编号，0为其他
+_ASCII_CODES = {"latin": 1, "digit": 2, "space": 3}
+_ASCII_CLASSES = bytes(
+    next(
+        (
+            code
+            for name, code in _ASCII_CODES.items()
+            if byte < 128 and _SCRIPTS[name].match(chr(byte))
+        ),
+        0,
+    )
+    for byte in range(256)
+)
+# 各文字对应的语言；拉丁、西里尔、阿拉伯字母各对应多种语言，只按文字区分
+SCRIPT_LANGUAGES = {
+    "han": "zh",
+    "kana": "ja",
+    "hangul": "ko",
+    "latin": "latin",
+    "cyrillic": "cyrillic",
+    "arabic": "arabic",
+}
+
+_URL = re.compile(
+    r"^(?:(?:https?|ftp)://\S+|www\.[^\s/]+\.[a-z]{2,}\S*|[\w.+-]+@[\w-]+\.[\w.-]+)$",
+    re.IGNORECASE,
+)
+_NUMBER = re.compile(
+    r"^[+\-−$¥€£(]?\s*[\d０-９][\d０-９\s,.:/%\-−+×*^()年月日时分秒点万亿元$¥€£]*$"
+)
+_FULLWIDTH_DIGITS = str.maketrans("０１２３４５６７８９", "0123456789")
+_CODE_SYMBOLS = re.compile(r"[{}()\[\];=<>#$&|\\_]")
+_CODE_TOKENS = re.compile(
+    r"=>|::|->|!=|==|&&|\|\||\+\+|/\*|\*/|//|</?\w+>"
+    r"|\b(?:def|class|return|import|function|const|let|var|public|private|static"
+    r"|void|elif|lambda|println|printf|console\.log|#include|SELECT|INSERT|WHERE)\b"
+    r"|\b[a-z]+(?:_[a-z0-9]+)+\b|\b[a-z]+[A-Z]\w*\(|\b\w+\(\)"
+)
+# 单独出现即可判定为代码的开头：命令行、导入、SQL语句、JSON、整行的函数调用等
+_CODE_START = re.compile(
+    r"^(?:\$ |#include\b|import \w|from [\w.]+ import\b|lambda\b|[{\[]\s*\""
+    r"|(?:SELECT|INSERT|UPDATE|DELETE|ALTER|CREATE|DROP)\s+\w"
+    r"|(?:git|pip|npm|yarn|echo|sudo|curl|docker|python|conda)\s+\S"
+    r"|\w+(?:\.\w+)*\(.*\)\s*;?$)"
+)
+_CODE_LINE_END = re.compile(r"[;{}:]\s*$", re.MULTILINE)
+
+# 分类结果的种类：普通文本之外的几种无需翻译的内容
+KIND_NAMES = {
+    "url": "网址或邮箱",
+    "number": "数字",
+    "code": "代码",
+    "symbols": "符号",
+}
+LANGUAGE_NAMES = {
+    "zh": "中文",
+    "ja": "日文",
+    "ko": "韩文",
+    "latin": "拉丁字母文本",
+    "cyrillic": "西里尔字母文本",
+    "arabic": "阿拉伯文",
+    "mixed": "中英混合文本",
+}
+
+
+@dataclass(frozen=True)
+class Classification:
+    """选中文本的分类：kind为text/url/number/code/symbols，
+    language为文本的主要语言（zh/ja/ko/latin/cyrillic/arabic，中英混合为mixed），
+    histogram为各类字符数"""
+
+    kind: str
+    language: str = ""
+    histogram: dict = field(default_factory=dict, compare=False)
+
+    @property
+    def label(self):
+        """用于匹配规则的标签：普通文本为语言，其余为种类"""
+        return self.language if self.kind == "text" else self.kind
+
+
+def histogram(text):
+    """统计各文字的字符数，other为标点和其他符号"""
+    if text.isascii():
+        # 纯ASCII文本（英文、代码、网址）用字节映射表一次转换后计数
+        classes = text.encode("ascii").translate(_ASCII_CLASSES)
+        counts = dict.fromkeys(SCRIPT_RANGES, 0)
+        for name, code in _ASCII_CODES.items():
+            counts[name] = classes.count(code)
+    else:
+        counts = {
+            name: len(pattern.findall(text)) for name, pattern in _SCRIPTS.items()
+        }
+    counts["other"] = len(text) - sum(counts.values())
+    return counts
+
+
+def detect_language(counts):
+    """按估计的token占比返回主要语言，没有文字时返回空字符串"""
+    tokens = {
+        script: counts[script]
+        / (LETTERS_PER_TOKEN if script in ("latin", "cyrillic", "arabic") else 1)
+        for script in SCRIPT_LANGUAGES
+    }
+    total = sum(tokens.values())
+    if not total:
+        return ""
+    # 日文夹杂大量汉字，出现一定比例的假名即视为日文
+    if tokens["kana"] / total >= 0.1:
+        return "ja"
+    han_share = tokens["han"] / total
+    if han_share >= CHINESE_SHARE:
+        return "zh"
+    if han_share > MIXED_SHARE:
+        return "mixed"
+    return SCRIPT_LANGUAGES[max(tokens, key=tokens.get)]
+
+
+def looks_like_code(text, counts):
+    if len(text) < 8 or not counts["latin"]:
+        return False
+    if _CODE_START.match(text):
+        return True
+    symbols = len(_CODE_SYMBOLS.findall(text))
+    tokens = len(_CODE_TOKENS.findall(text))
+    line_ends = len(_CODE_LINE_END.findall(text))
+    # 中文等文字占多数的文本不视为代码
+    if counts["han"] + counts["kana"] + counts["hangul"] > counts["latin"]:
+        return False
+    return (
+        (symbols / len(text) >= 0.05 and tokens >= 1)
+        or tokens >= 3
+        or (line_ends >= 2 and symbols / len(text) >= 0.03)
+    )
+
+
+def classify(text):
+    """对选中文本分类，只看开头SAMPLE_CHARS个字符，耗时为微秒级"""
+    # 先截取再去除空白，避免复制整个长文本
+    sample = text[: SAMPLE_CHARS * 2].strip()[:SAMPLE_CHARS]
+    if not sample:
+        return Classification("symbols")
+    if len(sample) <= 2048 and _URL.match(sample):
+        return Classification("url")
+    if _NUMBER.match(sample):
+        return Classification("number")
+    counts = histogram(sample)
+    if looks_like_code(sample, counts):
+        return Classification("code", histogram=counts)
+    language = detect_language(counts)
+    if not language:
+        return Classification("symbols", histogram=counts)
+    return Classification("text", language, counts)
+
+
+def local_answer(text, classification):
+    """无需请求AI即可给出的结果，无法本地回答时返回None"""
+    text = text.strip()
+    if classification.kind == "url":
+        return _describe_url(text)
+    if classification.kind == "number":
+        return _describe_number(text)
+    return None
+
+
+def skip_message(classification):
+    name = KIND_NAMES.get(classification.kind) or LANGUAGE_NAMES.get(
+        classification.language, "文本"
+    )
+    return f"选中的内容是{name}，未请求翻译。需要时可点击“询问AI”。"
+
+
+def _describe_url(text):
+    if "://" not in text:
+        return f"{text}\n\n邮箱或网址，无需翻译" if "@" in text else None
+    parts = urlsplit(text)
+    lines = [unquote(text), "", f"域名：{parts.hostname or parts.netloc}"]
+    if parts.path and parts.path != "/":
+        lines.append(f"路径：{unquote(parts.path)}")
+    query = parse_qsl(parts.query)
+    if query:
+        lines.append("参数：")
+        lines.extend(f"  {key} = {value}" for key, value in query)
+    if parts.fragment:
+        lines.append(f"锚点：{unquote(parts.fragment)}")
+    return "\n".join(lines)
+
+
+def _describe_number(text):
+    digits = text.translate(_FULLWIDTH_DIGITS).replace(",", "").replace(" ", "")
+    try:
+        value = float(digits.replace("−", "-"))
+    except ValueError:
+        return None
+    lines = [text]
+    magnitude = abs(value)
+    if magnitude >= 1e8:
+        lines.append(f"约{value / 1e8:.4g}亿")
+    elif magnitude >= 1e4:
+        lines.append(f"约{value / 1e4:.4g}万")
+    if magnitude >= 1e6 or (magnitude and magnitude < 1e-3):
+        lines.append(f"{value:.4e}")
+    return "\n".join(lines) if len(lines) > 1 else None
@@ -0,0 +1,186 @@
+import re
+from collections import defaultdict
+
+from long_input import estimate_tokens
+from script_detect import classify
+
+# 不可见字符：零宽空格、软连字符、BOM、方向控制符等，复制PDF和网页时常混入
+_INVISIBLE = re.compile(
+    "[\u00ad\u180e\u200b\u200e\u200f\u2060-\u2064\ufeff\u202a-\u202e\u2066-\u2069]"
+)
+# 各种宽度的空格，统一为普通空格后合并
+_SPACES = re.compile("[ \t\u00a0\u2000-\u200a\u202f\u205f\u3000]+")
+_LINE_BREAKS = re.compile("\r\n|[\r\f\v\u2028\u2029\x85]")
+_TRAILING_SPACES = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+# 页码行：- 12 -、Page 3 of 10、第3页、3/10
+_PAGE_NUMBER = re.compile(
+    r"^(?:[-–—]\s*\d{1,4}\s*[-–—]|(?:page|p\.)\s*\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?"
+    r"|第\s*\d{1,4}\s*页(?:\s*[,，/]?\s*共\s*\d{1,4}\s*页)?|\d{1,4}\s*/\s*\d{1,4})$",
+    re.IGNORECASE,
+)
+_BARE_NUMBER = re.compile(r"^\d{1,4}$")
+_DIGITS = re.compile(r"\d+")
+# 列表项的开头，这类行保留换行
+_LIST_ITEM = re.compile(
+    r"^(?:[-*•·▪●◦■□▶►]\s|\d{1,3}[.)、]\s?|[(（]\d{1,3}[)）]|[a-zA-Z][.)]\s"
+    r"|[一二三四五六七八九十]+、)"
+)
+# 带编号的章节标题，如"3.1 Method"、"2 相关工作"
+_HEADING = re.compile(r"^\d{1,2}(?:\.\d{1,2})*\s+[A-Z一-鿿]")
+_WIDE = re.compile(r"[⺀-鿿가-힯豈-﫿＀-￯]")
+_HYPHENATED = re.compile(r"[A-Za-z]-$")
+# 压缩时优先截断的位置：句末标点和换行之后
+_BOUNDARY = re.compile(r"[。！？；!?;]|\.(?=\s)|\n")
+
+# 页眉页脚的最大长度，更长的重复行视为正文
+MAX_HEADER_CHARS = 80
+# 页眉页脚两次出现之间至少相隔的行数
+MIN_PAGE_LINES = 3
+# 短于版心宽度该比例的行是段落结尾或标题，不与下一行合并
+SHORT_LINE_RATIO = 0.7
+# 更短的行不会是折行，如表格、菜单和对话中的短行
+MIN_WRAPPED_WIDTH = 24
+# 估计版心宽度时取各行宽度的分位数
+WIDTH_PERCENTILE = 0.8
+# PDF中折行的最大行宽（中日韩文字占两格），更长的行是网页中的整段文字，之后的换行保留
+MAX_WRAPPED_WIDTH = 120
+# 压缩后的文本末尾加上省略号，提示模型内容不完整
+TRUNCATION_MARK = "……"
+
+
+def normalize_selection(text):
+    """修复从PDF和网页复制时带入的格式问题：去掉不可见字符和页眉页脚，
+    合并硬换行和断词，压缩重复空白；代码只去掉不可见字符和行尾空白，保留原有换行和缩进
+    """
+    if not text:
+        return text
+    text = _LINE_BREAKS.sub("\n", _INVISIBLE.sub("", text))
+    if classify(text).kind == "code":
+        text = _TRAILING_SPACES.sub("", text)
+        return _BLANK_LINES.sub("\n\n", text).strip("\n")
+    lines = [line.strip() for line in _SPACES.sub(" ", text).split("\n")]
+    if sum(1 for line in lines if line) > 1:
+        lines = _drop_page_furniture(lines)
+    return _reflow(lines)
+
+
+def _drop_page_furniture(lines):
+    """去掉页码和重复出现的页眉页脚，重复的行只在第一次出现的位置保留一次"""
+    # 页码不同的页眉页脚视为同一行
+    keys = [
+        (
+            _DIGITS.sub("#", line)
+            if line and len(line) <= MAX_HEADER_CHARS and not _BARE_NUMBER.match(line)
+            else None
+        )
+        for line in lines
+    ]
+    positions = defaultdict(list)
+    for index, key in enumerate(keys):
+        if key is not None:
+            positions[key].append(index)
+    # 至少有几个字母或汉字、且每次出现之间隔着正文的重复短行才视为页眉页脚，
+    # 以免去掉列表中的重复符号或表格中相邻的相同行
+    headers = {
+        key
+        for key, indexes in positions.items()
+        if len(indexes) >= 2
+        and len(key) >= 4
+        and min(b - a for a, b in zip(indexes, indexes[1:])) >= MIN_PAGE_LINES
+    }
+    # 单独成行的数字只有构成连续递增的页码时才去掉，避免误删表格中的数字
+    numbers = [int(line) for line in lines if _BARE_NUMBER.match(line)]
+    page_numbers = len(numbers) >= 2 and all(
+        later == earlier + 1 for earlier, later in zip(numbers, numbers[1:])
+    )
+    kept = []
+    seen = set()
+    for line, key in zip(lines, keys):
+        if _PAGE_NUMBER.match(line) or (page_numbers and _BARE_NUMBER.match(line)):
+            continue
+        if key in headers:
+            if key in seen:
+                continue
+            seen.add(key)
+            # 保留的页眉单独成段，不与正文合并
+            kept.extend(("", line, ""))
+            continue
+        kept.append(line)
+    return kept
+
+
+def _reflow(lines):
+    """把段落内的硬换行合并为一行，空行作为段落分隔；
+    列表项、标题、短的段落结尾和网页中整段成行的文本保留换行
+    """
+    widths = [display_width(line) for line in lines]
+    # 版心宽度取较宽的行的宽度，不受个别更宽的页眉影响，整段成行的文字按最大折行宽度计
+    filled = sorted(w for w in widths if w)
+    if not filled:
+        return ""
+    width = min(filled[int(len(filled) * WIDTH_PERCENTILE)], MAX_WRAPPED_WIDTH)
+    short = max(SHORT_LINE_RATIO * width, MIN_WRAPPED_WIDTH)
+    paragraphs = []
+    current = previous = ""
+    previous_width = 0
+    for line, line_width in zip(lines, widths):
+        if not line:
+            if current:
+                paragraphs.append(current)
+            current = previous = ""
+            continue
+        if not current:
+            current = line
+        elif _HYPHENATED.search(previous) and line[0].islower():
+            # 行尾断词：exam-\nple → example
+            current = current[:-1] + line
+        elif (
+            not short <= previous_width <= MAX_WRAPPED_WIDTH
+            or _LIST_ITEM.match(line)
+            or (_HEADING.match(line) and line_width < SHORT_LINE_RATIO * width)
+        ):
+            current += "\n" + line
+        elif _WIDE.match(previous[-1]) and _WIDE.match(line[0]):
+            # 中日韩文字之间的换行直接去掉，不加空格
+            current += line
+        else:
+            current += " " + line
+        previous, previous_width = line, line_width
+    if current:
+        paragraphs.append(current)
+    return "\n\n".join(paragraphs)
+
+
+def display_width(line):
+    """按中日韩文字占两格计算的行宽"""
+    if line.isascii():
+        return len(line)
+    return len(line) + len(_WIDE.findall(line))
+
+
+def compact(text, max_tokens):
+    """文本的估计token数超出预算时只保留开头部分，尽量在句子或段落结尾处截断，
+    返回(文本, 是否截断)；max_tokens不大于0时不压缩
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text, False
+    budget = max(1, max_tokens - estimate_tokens(TRUNCATION_MARK))
+    # 估计的token数随长度单调增加，且每个字符至少约1/4个token，
+    # 在开头这部分中二分查找预算内最长的前缀
+    low, high = 0, min(len(text), budget * 4)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    head = text[:low]
+    cut = 0
+    for match in _BOUNDARY.finditer(head):
+        cut = match.end()
+    # 前缀中没有足够靠后的句子结尾时在词之间截断
+    if cut < len(head) // 2:
+        space = head.rfind(" ")
+        cut = space if space >= len(head) // 2 else len(head)
+    return head[:cut].rstrip() + TRUNCATION_MARK, True
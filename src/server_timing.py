@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 每个提供方/模型保留的最近记录数，用于计算统计值
+RECORD_SAMPLES = 500
+# 记录文件的轮转大小（字节），启动时只读取文件末尾的记录
+RECORD_FILE_MAX_BYTES = 1024 * 1024
+# 缓冲多少条记录后写入文件
+RECORD_FLUSH_EVERY = 10
+
+# 请求耗时的组成部分（毫秒），无法得知的部分为None
+COMPONENTS = ("network", "queue", "load", "prompt", "generation")
+COMPONENT_NAMES = {
+    "network": "网络",
+    "queue": "排队",
+    "load": "加载模型",
+    "prompt": "处理提示词",
+    "generation": "生成",
+}
+
+
+def _ms(nanoseconds):
+    return None if nanoseconds is None else nanoseconds / 1e6
+
+
+def _rate(tokens, milliseconds):
+    if not tokens or not milliseconds:
+        return None
+    return tokens / (milliseconds / 1000)
+
+
+def build_record(endpoint, stats):
+    """把一次请求的客户端耗时和服务端报告的统计信息整理为耗时记录
+
+    Ollama报告各阶段耗时（纳秒）：总耗时中除加载模型、处理提示词和生成外的部分计为排队，
+    客户端耗时中超出服务端总耗时的部分计为网络；聊天补全接口只报告token数，
+    首字节前的时间计为网络和排队，之后计为生成
+    """
+    total = stats["request_seconds"] * 1000
+    first_byte = stats.get("first_byte_seconds")
+    record = {
+        "ts": time.time(),
+        "provider": stats["provider"],
+        "model": stats["model"],
+        "endpoint": endpoint,
+        "total": total,
+        "prompt_tokens": stats.get("prompt_eval_count", stats.get("prompt_tokens")),
+        "output_tokens": stats.get("eval_count", stats.get("completion_tokens")),
+        # 结果窗口中追问时为第几轮对话，用于确认追问没有重新处理之前的提示词
+        "turn": stats.get("turn"),
+    }
+    components = dict.fromkeys(COMPONENTS)
+    if "total_duration" in stats:
+        server = _ms(stats["total_duration"])
+        components["load"] = _ms(stats.get("load_duration", 0))
+        components["prompt"] = _ms(stats.get("prompt_eval_duration", 0))
+        components["generation"] = _ms(stats.get("eval_duration", 0))
+        components["queue"] = max(
+            0.0,
+            server
+            - components["load"]
+            - components["prompt"]
+            - components["generation"],
+        )
+        components["network"] = max(0.0, total - server)
+    elif first_byte is not None:
+        components["network"] = first_byte * 1000
+        components["generation"] = max(0.0, total - first_byte * 1000)
+    record.update(components)
+    record["tokens_per_sec"] = _rate(record["output_tokens"], components["generation"])
+    record["prompt_tokens_per_sec"] = _rate(
+        record["prompt_tokens"], components["prompt"]
+    )
+    return record
+
+
+def format_record(record):
+    """结果窗口底部显示的一行耗时说明"""
+    parts = [f"耗时 {record['total']:.0f}ms"]
+    for name in COMPONENTS:
+        value = record.get(name)
+        if value is None:
+            continue
+        text = f"{COMPONENT_NAMES[name]} {value:.0f}ms"
+        if name == "prompt" and record.get("prompt_tokens_per_sec"):
+            text += f"（{record['prompt_tokens_per_sec']:.0f} tok/s）"
+        if name == "generation" and record.get("tokens_per_sec"):
+            text += f"（{record['tokens_per_sec']:.1f} tok/s）"
+        parts.append(text)
+    if record.get("output_tokens"):
+        parts.append(
+            f"{record.get('prompt_tokens') or 0}→{record['output_tokens']} tokens"
+        )
+    return " | ".join(parts)
+
+
+class TimingRecorder:
+    """按提供方和模型汇总请求耗时记录，并写入本地JSONL文件，重启后继续统计"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._records = {}
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取文件中最近的记录"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = deque(f, maxlen=RECORD_SAMPLES * 4)
+        except OSError as e:
+            logger.warning("读取耗时记录失败: %s", e)
+            return
+        with self._lock:
+            for line in lines:
+                try:
+                    self._add(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+
+    def record(self, endpoint, stats):
+        """记录一次请求，可在工作线程调用，返回整理后的记录"""
+        record = build_record(endpoint, stats)
+        with self._lock:
+            self._add(record)
+            if self.path:
+                self._buffer.append(record)
+            should_flush = len(self._buffer) >= RECORD_FLUSH_EVERY
+        if should_flush:
+            self.flush()
+        return record
+
+    def summary(self):
+        """返回 {(提供方, 模型): 统计}：请求数、各部分耗时中位数、生成和处理提示词的token速度，
+        以及追问（第2轮及以后）处理提示词的耗时和token数中位数
+        """
+        with self._lock:
+            snapshot = {key: list(records) for key, records in self._records.items()}
+        result = {}
+        for key, records in snapshot.items():
+            summary = {"count": len(records)}
+            for name in ("total",) + COMPONENTS:
+                values = sorted(
+                    record[name] for record in records if record.get(name) is not None
+                )
+                summary[name] = values[len(values) // 2] if values else None
+            summary["tokens_per_sec"] = self._throughput(
+                records, "output_tokens", "generation"
+            )
+            summary["prompt_tokens_per_sec"] = self._throughput(
+                records, "prompt_tokens", "prompt"
+            )
+            followups = [record for record in records if (record.get("turn") or 1) > 1]
+            summary["followups"] = len(followups)
+            for name in ("prompt", "prompt_tokens"):
+                values = sorted(
+                    record[name] for record in followups if record.get(name) is not None
+                )
+                summary[f"followup_{name}"] = (
+                    values[len(values) // 2] if values else None
+                )
+            result[key] = summary
+        return result
+
+    def flush(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records or not self.path:
+            return
+        try:
+            if (
+                os.path.exists(self.path)
+                and os.path.getsize(self.path) > RECORD_FILE_MAX_BYTES
+            ):
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning("写入耗时记录失败: %s", e)
+
+    def _add(self, record):
+        key = (record["provider"], record["model"])
+        records = self._records.get(key)
+        if records is None:
+            records = self._records[key] = deque(maxlen=RECORD_SAMPLES)
+        records.append(record)
+
+    @staticmethod
+    def _throughput(records, tokens_field, duration_field):
+        # 用总token数除以总耗时，避免短回答的速度波动影响统计
+        tokens = duration = 0
+        for record in records:
+            if record.get(tokens_field) and record.get(duration_field):
+                tokens += record[tokens_field]
+                duration += record[duration_field]
+        return _rate(tokens, duration)
@@ -0,0 +1,109 @@
+import builtins
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 报告中列出的最耗时导入数量
+TOP_IMPORTS = 15
+
+
+class StartupProfiler:
+    """记录启动各阶段和各模块导入的耗时，用于定位冷启动慢的原因"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []
+        self.marks = {}
+        self.imports = {}
+        self.finished = False
+        self._original_import = None
+        self._thread = None
+        self._depth = 0
+
+    def elapsed(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def track_imports(self):
+        """替换__import__以记录启动期间主线程中每个顶层导入的耗时"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        self._thread = threading.get_ident()
+        builtins.__import__ = self._timed_import
+
+    def stop_tracking(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @contextmanager
+    def phase(self, name):
+        """统计一个启动阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def mark(self, name):
+        """记录某个时间点：距启动的毫秒数及对应的系统时间"""
+        self.marks[name] = (self.elapsed(), time.time())
+
+    def finish(self):
+        """启动完成，停止记录导入并输出报告"""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark("ready")
+        self.stop_tracking()
+        logger.info("[Startup] 启动完成\n%s", self.report())
+
+    def as_dict(self):
+        return {
+            "marks": {name: value[0] for name, value in self.marks.items()},
+            "epochs": {name: value[1] for name, value in self.marks.items()},
+            "phases": dict(self.phases),
+            "imports": dict(self._top_imports()),
+        }
+
+    def report(self):
+        lines = ["时间点（距启动）:"]
+        for name, (elapsed, _) in self.marks.items():
+            lines.append(f"  {name:<24}{elapsed:>9.1f}ms")
+        lines.append("阶段:")
+        for name, duration in self.phases:
+            lines.append(f"  {name:<24}{duration:>9.1f}ms")
+        lines.append("导入:")
+        for name, duration in self._top_imports():
+            lines.append(f"  {name:<24}{duration:>9.1f}ms")
+        return "\n".join(lines)
+
+    def _top_imports(self):
+        return sorted(self.imports.items(), key=lambda item: -item[1])[:TOP_IMPORTS]
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import or builtins.__import__
+        # 只统计主线程中首次导入的顶层模块，嵌套导入计入外层模块
+        if (
+            level
+            or self._depth
+            or name in sys.modules
+            or threading.get_ident() != self._thread
+        ):
+            return original(name, globals, locals, fromlist, level)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            duration = (time.perf_counter() - start) * 1000
+            self.imports[name] = self.imports.get(name, 0.0) + duration
+
+
+# 全局启动计时器，需在其他模块之前导入
+profiler = StartupProfiler()
@@ -1,167 +1,205 @@
+import logging
 import time
-import win32con
-import win32api
-import uiautomation as auto
 from PyQt5.QtCore import QObject, pyqtSignal, QPoint, QTimer
 from PyQt5.QtGui import QCursor
 
+from input_events import create_event_source
+from response_cache import normalize_text
+from automation import AutomationWorker, UIAutomationBackend, process_name
+from tracing import SELECTION_TRACE, tracer
+
+logger = logging.getLogger(__name__)
+
+# 选择状态机的各个状态
+STATE_IDLE = "idle"
+STATE_PRESSED = "pressed"
+STATE_RELEASED = "released"
+STATE_SETTLING = "settling"
+STATE_EXTRACTING = "extracting"
+STATE_EMITTED = "emitted"
+
+# 鼠标释放后等待选择稳定的初始时长（毫秒）
+DEFAULT_SETTLE_DELAY = 120
+# 学习到的等待时长下限（毫秒）
+MIN_SETTLE_DELAY = 30
+# 未取到文本时重试的间隔（毫秒）
+SETTLE_RETRY_INTERVAL = 80
+# 从释放开始计算的最长等待时间（毫秒）
+MAX_SETTLE_TIME = 600
+
 
 class TextExtractor(QObject):
     """使用UI自动化获取选中文本，不使用剪贴板或模拟按键"""
 
     text_selected = pyqtSignal(str, QPoint)
 
-    def __init__(self, parent=None):
+    def __init__(self, event_source=None, automation=None, parent=None):
         super().__init__(parent)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_selection)
-        self.timer.start(300)  # 增加检查间隔，减少重复获取
+        # 上次发送的选中文本的规范形式，用于去重
         self.last_selected_text = ""
         self.last_cursor_pos = QCursor.pos()
-        self.is_checking = False
-        self.is_mouse_down = False
         self.mouse_down_position = None
         self.last_emit_time = time.time()  # 添加最后一次发送信号的时间记录
 
-    def _get_text_from_element(self, element):
-        """辅助函数：尝试从一个元素中获取选中文本"""
-        try:
-            if hasattr(element, "GetTextPattern"):
-                print("元素支持TextPattern")
-                text_pattern = element.GetTextPattern()
-                if text_pattern:
-                    selection = text_pattern.GetSelection()
-                    if selection and len(selection) > 0:
-                        text = selection[0].GetText(-1)
-                        if text:
-                            print(f"从元素获取到文本: {text}")
-                            return text
-        except Exception as e:
-            print(f"从元素获取文本失败: {e}")
-        return ""
-
-    def get_selected_text_from_automation(self):
-        """使用UI自动化获取选中文本，增加对子控件的遍历尝试"""
+        # 选择状态机：idle → pressed → released → settling → extracting → emitted
+        self.state = STATE_IDLE
+        self.release_time = 0.0
+        self.release_wall_time = 0.0
+        self.app_key = ""
+        self.attempts = 0
+        # 当前选择流程的追踪，发送信号后供接收方继续记录
+        self.trace = None
+        # 按应用学习到的选择稳定等待时长（毫秒）
+        self.settle_delays = {}
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.timeout.connect(self.on_settled)
+
+        # UI自动化在专用线程中执行，避免目标程序卡住时冻结界面
+        if automation is None:
+            automation = AutomationWorker(UIAutomationBackend, parent=self)
+        self.automation = automation
+        self.extract_request_id = 0
+        self.automation.extracted.connect(self.on_extracted)
+        self.automation.timed_out.connect(self.on_extraction_timeout)
+
+        # 鼠标事件由事件源推送，未指定时使用钩子（不可用时退回轮询）
+        if event_source is None:
+            event_source = create_event_source(parent=self)
+        self.event_source = event_source
+        self.event_source.mouse_down.connect(self.on_mouse_down)
+        self.event_source.mouse_up.connect(self.on_mouse_up)
+
+    def current_app_key(self):
+        """返回前台窗口所属的程序名，用于按应用学习等待时长"""
         try:
-            print("\n=== 开始获取选中文本 ===")
-            print(
-                f"当前鼠标位置: ({self.last_cursor_pos.x()}, {self.last_cursor_pos.y()})"
-            )
-
-            # 获取当前鼠标位置下的控件
-            element = auto.ControlFromPoint(
-                self.last_cursor_pos.x(), self.last_cursor_pos.y()
-            )
-            if not element:
-                print("未找到鼠标位置下的控件")
-                return ""
-
-            print(f"找到控件: {getattr(element, 'Name', '未知控件')}")
-            print(f"控件类型: {getattr(element, 'ClassName', '未知类型')}")
-
-            # 尝试直接从当前控件获取选中文本
-            text = self._get_text_from_element(element)
-            if text:
-                print(f"成功从控件获取到文本: {text}")
-                return text
-
-            # 遍历子控件进行尝试
-            children = element.GetChildren()
-            if children:
-                print("当前控件未获取到文本，尝试遍历子控件")
-                for child in children:
-                    text = self._get_text_from_element(child)
-                    if text:
-                        return text
-
-            print("未能获取到选中文本")
-            return ""
-        except Exception as e:
-            print(f"自动化获取文本失败: {str(e)}")
-            return ""
-
-    def check_selection(self):
-        """检查是否有文本被选中"""
-        if self.is_checking:
+            import win32gui
+            import win32process
+
+            hwnd = win32gui.GetForegroundWindow()
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            return process_name(pid)
+        except Exception:
+            return "unknown"
+
+    def settle_delay_for(self, app_key):
+        return self.settle_delays.get(app_key, DEFAULT_SETTLE_DELAY)
+
+    def learn_settle_delay(self, app_key, first_attempt, elapsed_ms):
+        """根据本次选择稳定所需的时间调整该应用的等待时长"""
+        delay = self.settle_delay_for(app_key)
+        if first_attempt:
+            # 第一次就取到文本，说明还可以再等得短一些
+            delay = max(MIN_SETTLE_DELAY, int(delay * 0.8))
+        else:
+            delay = int((delay + elapsed_ms) / 2)
+        self.settle_delays[app_key] = min(delay, MAX_SETTLE_TIME)
+
+    def on_mouse_down(self, pos):
+        """记录鼠标按下的位置，新的拖动会抢占尚未完成的提取"""
+        if self.state in (STATE_SETTLING, STATE_EXTRACTING):
+            logger.debug("新的拖动开始，放弃上一次提取")
+            self.settle_timer.stop()
+            self.automation.cancel()
+        self.state = STATE_PRESSED
+        self.mouse_down_position = pos
+        logger.debug("=== 鼠标按下 ===")
+        logger.debug("按下位置: (%s, %s)", pos.x(), pos.y())
+
+    def on_mouse_up(self, pos):
+        """鼠标释放时判断是否可能选择了文本，并开始等待选择稳定"""
+        if self.state != STATE_PRESSED or self.mouse_down_position is None:
             return
 
-        try:
-            self.is_checking = True
-            current_cursor_pos = QCursor.pos()
-            current_time = time.time()
-
-            # 获取鼠标按键状态
-            mouse_down = win32api.GetKeyState(win32con.VK_LBUTTON) < 0
-
-            # 记录鼠标按下的位置
-            if mouse_down and not self.is_mouse_down:
-                self.mouse_down_position = current_cursor_pos
-                print("\n=== 鼠标按下 ===")
-                print(f"按下位置: ({current_cursor_pos.x()}, {current_cursor_pos.y()})")
-
-            # 检测鼠标释放的时刻
-            if self.is_mouse_down and not mouse_down and self.mouse_down_position:
-                print("\n=== 鼠标释放 ===")
-                print(f"释放位置: ({current_cursor_pos.x()}, {current_cursor_pos.y()})")
-
-                # 计算鼠标移动距离
-                move_distance = (
-                    (current_cursor_pos.x() - self.mouse_down_position.x()) ** 2
-                    + (current_cursor_pos.y() - self.mouse_down_position.y()) ** 2
-                ) ** 0.5
-
-                print(f"鼠标移动距离: {move_distance}")
-
-                # 只有当鼠标移动了一定距离才认为可能有文本选择
-                if move_distance > 5:
-                    print("移动距离超过阈值，可能进行了文本选择")
-                    # 等待一小段时间确保选择完成
-                    print("等待0.5秒确保选择完成...")
-                    time.sleep(0.5)
-
-                    # 获取选中文本
-                    print("开始获取选中文本...")
-                    selected_text = self.get_selected_text_from_automation()
-                    print(f"获取到的文本: {selected_text}")
-
-                    # 确保距离上次发送信号至少有1秒
-                    time_since_last_emit = current_time - self.last_emit_time
-                    print(f"距离上次发送时间: {time_since_last_emit:.2f}秒")
-
-                    if (
-                        selected_text
-                        and selected_text.strip()
-                        and selected_text != self.last_selected_text
-                        and time_since_last_emit > 1
-                    ):
-                        print("文本有效且未重复，发送信号")
-                        self.last_selected_text = selected_text
-                        self.text_selected.emit(selected_text, current_cursor_pos)
-                        self.last_emit_time = current_time
-                        print(f"发送选中文本: {selected_text}")
-                    else:
-                        if not selected_text:
-                            print("未获取到文本")
-                        elif not selected_text.strip():
-                            print("获取到的文本为空")
-                        elif selected_text == self.last_selected_text:
-                            print("文本与上次相同")
-                        elif time_since_last_emit <= 1:
-                            print("发送间隔太短")
-                else:
-                    print("移动距离不足，可能是点击而非选择")
-
-                # 重置鼠标按下位置
-                self.mouse_down_position = None
-                print("重置鼠标按下位置")
-
-            # 更新鼠标状态
-            self.is_mouse_down = mouse_down
-
-            # 更新鼠标位置
-            self.last_cursor_pos = current_cursor_pos
-
-        except Exception as e:
-            print(f"检查选中文本时发生错误: {str(e)}")
-        finally:
-            self.is_checking = False
+        self.state = STATE_RELEASED
+        self.last_cursor_pos = pos
+        logger.debug("=== 鼠标释放 ===")
+        logger.debug("释放位置: (%s, %s)", pos.x(), pos.y())
+
+        # 计算鼠标移动距离
+        move_distance = (
+            (pos.x() - self.mouse_down_position.x()) ** 2
+            + (pos.y() - self.mouse_down_position.y()) ** 2
+        ) ** 0.5
+        self.mouse_down_position = None
+
+        logger.debug("鼠标移动距离: %s", move_distance)
+
+        # 只有当鼠标移动了一定距离才认为可能有文本选择
+        if move_distance <= 5:
+            logger.debug("移动距离不足，可能是点击而非选择")
+            self.state = STATE_IDLE
+            return
+
+        self.trace = tracer.begin(SELECTION_TRACE, "mouse_release")
+        self.release_time = time.monotonic()
+        self.release_wall_time = time.time()
+        self.app_key = self.current_app_key()
+        self.attempts = 0
+        delay = self.settle_delay_for(self.app_key)
+        logger.debug(
+            "移动距离超过阈值，等待%s毫秒确保选择完成（%s）", delay, self.app_key
+        )
+        self.state = STATE_SETTLING
+        self.settle_timer.start(delay)
+
+    def on_settled(self):
+        """等待结束后交给工作线程提取选中文本"""
+        if self.state != STATE_SETTLING:
+            return
+
+        self.state = STATE_EXTRACTING
+        self.attempts += 1
+        self.extract_request_id = self.automation.request(
+            self.last_cursor_pos.x(), self.last_cursor_pos.y(), self.attempts > 1
+        )
+
+    def on_extracted(self, request_id, selected_text):
+        """处理提取结果，未取到文本时在时限内重试"""
+        # 提取期间开始了新的拖动，丢弃本次结果
+        if self.state != STATE_EXTRACTING or request_id != self.extract_request_id:
+            return
+
+        elapsed_ms = (time.monotonic() - self.release_time) * 1000
+        if not selected_text or not selected_text.strip():
+            if elapsed_ms + SETTLE_RETRY_INTERVAL <= MAX_SETTLE_TIME:
+                self.state = STATE_SETTLING
+                self.settle_timer.start(SETTLE_RETRY_INTERVAL)
+            else:
+                logger.debug("未获取到文本")
+                self.state = STATE_IDLE
+            return
+
+        self.learn_settle_delay(self.app_key, self.attempts == 1, elapsed_ms)
+        if self.trace is not None:
+            self.trace.mark("extraction")
+        logger.debug("获取到的文本: %s（释放后%.0f毫秒）", selected_text, elapsed_ms)
+        self.emit_selection(selected_text)
+
+    def on_extraction_timeout(self, request_id):
+        if self.state == STATE_EXTRACTING and request_id == self.extract_request_id:
+            logger.warning("获取选中文本超时")
+            self.state = STATE_IDLE
+
+    def emit_selection(self, selected_text):
+        """去重并限制频率后发送选中文本"""
+        # 确保距离上次发送信号至少有1秒
+        time_since_last_emit = self.release_wall_time - self.last_emit_time
+        logger.debug("距离上次发送时间: %.2f秒", time_since_last_emit)
+
+        # 按规范形式比较，仅断行、空白或不可见字符不同的选择视为相同
+        selected_key = normalize_text(selected_text)
+        if selected_key == self.last_selected_text:
+            logger.debug("文本与上次相同")
+        elif time_since_last_emit <= 1:
+            logger.debug("发送间隔太短")
+        else:
+            logger.debug("文本有效且未重复，发送信号")
+            self.state = STATE_EMITTED
+            self.last_selected_text = selected_key
+            if self.trace is not None:
+                self.trace.mark("signal_emit")
+            self.text_selected.emit(selected_text, self.last_cursor_pos)
+            self.last_emit_time = self.release_wall_time
+            logger.debug("发送选中文本: %s", selected_text)
+        self.state = STATE_IDLE
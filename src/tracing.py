@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 每个阶段保留的最近样本数，用于计算分位数
+HISTOGRAM_SAMPLES = 1000
+# 追踪文件轮转大小（字节）及保留的旧文件数
+TRACE_FILE_MAX_BYTES = 1024 * 1024
+TRACE_FILE_BACKUPS = 3
+# 缓冲多少条追踪记录后写入文件
+TRACE_FLUSH_EVERY = 20
+
+# 选择流程：释放 → 提取 → 发送信号 → 悬浮按钮显示
+SELECTION_TRACE = "selection"
+# 请求流程：点击 → 发送请求 → 首字节 → 末字节 → 结果窗口渲染
+REQUEST_TRACE = "request"
+
+# 除相邻阶段外额外统计的端到端区间
+TOTAL_SPANS = {
+    SELECTION_TRACE: ("release_to_popup", "mouse_release", "buttons_shown"),
+    REQUEST_TRACE: ("click_to_rendered", "click", "rendered"),
+}
+
+
+class Trace:
+    """一次流程的追踪，按顺序记录各阶段的时间点"""
+
+    __slots__ = ("kind", "marks", "start_wall")
+
+    def __init__(self, kind, first_mark):
+        self.kind = kind
+        self.start_wall = time.time()
+        self.marks = [(first_mark, time.perf_counter())]
+
+    def mark(self, name):
+        # 可能在工作线程调用，list.append本身是原子的
+        self.marks.append((name, time.perf_counter()))
+
+    def spans(self):
+        """返回每个阶段相对上一阶段的耗时（毫秒）"""
+        result = {}
+        for (_, previous), (name, current) in zip(self.marks, self.marks[1:]):
+            result[name] = (current - previous) * 1000
+        total = TOTAL_SPANS.get(self.kind)
+        if total:
+            times = dict(self.marks)
+            span_name, start, end = total
+            if start in times and end in times:
+                result[span_name] = (times[end] - times[start]) * 1000
+        return result
+
+
+class Tracer:
+    """低开销的流程追踪：阶段耗时进入内存直方图，并写入轮转的JSONL文件"""
+
+    def __init__(self):
+        self.enabled = True
+        self.path = None
+        self._histograms = {}
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def configure(self, path=None, enabled=True):
+        self.path = path
+        self.enabled = enabled
+
+    def begin(self, kind, first_mark):
+        """开始一次追踪，未启用时返回None"""
+        if not self.enabled:
+            return None
+        return Trace(kind, first_mark)
+
+    def finish(self, trace):
+        """结束追踪，记录各阶段耗时"""
+        if trace is None:
+            return
+        spans = trace.spans()
+        with self._lock:
+            for name, value in spans.items():
+                samples = self._histograms.get((trace.kind, name))
+                if samples is None:
+                    samples = deque(maxlen=HISTOGRAM_SAMPLES)
+                    self._histograms[(trace.kind, name)] = samples
+                samples.append(value)
+            if self.path:
+                self._buffer.append(
+                    {"trace": trace.kind, "ts": trace.start_wall, "spans": spans}
+                )
+                should_flush = len(self._buffer) >= TRACE_FLUSH_EVERY
+            else:
+                should_flush = False
+        if should_flush:
+            self.flush()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "追踪 %s: %s",
+                trace.kind,
+                ", ".join(f"{k}={v:.1f}ms" for k, v in spans.items()),
+            )
+
+    def percentiles(self):
+        """返回 {(流程, 阶段): {"count", "p50", "p95", "p99"}}"""
+        with self._lock:
+            snapshot = {key: sorted(values) for key, values in self._histograms.items()}
+        result = {}
+        for key, values in snapshot.items():
+            if not values:
+                continue
+            result[key] = {
+                "count": len(values),
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "p99": _percentile(values, 0.99),
+            }
+        return result
+
+    def flush(self):
+        """将缓冲的追踪记录追加到文件，超过大小时轮转"""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records or not self.path:
+            return
+        try:
+            self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning("写入追踪文件失败: %s", e)
+
+    def _rotate(self):
+        if (
+            not os.path.exists(self.path)
+            or os.path.getsize(self.path) < TRACE_FILE_MAX_BYTES
+        ):
+            return
+        for index in range(TRACE_FILE_BACKUPS - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# 全局追踪器，由应用启动时配置
+tracer = Tracer()
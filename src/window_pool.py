@@ -0,0 +1,46 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 保留的空闲窗口数量上限
+DEFAULT_MAX_IDLE = 2
+
+
+class WindowPool:
+    """复用已创建的隐藏窗口，避免每次显示都重新构建控件和解析样式"""
+
+    def __init__(self, factory, max_idle=DEFAULT_MAX_IDLE):
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle = []
+        self.created = 0
+        self.reused = 0
+
+    def prebuild(self, count=1):
+        """预先创建隐藏窗口，首次使用时无需等待构建"""
+        while len(self._idle) < min(count, self.max_idle):
+            self._idle.append(self._create())
+
+    def acquire(self):
+        """取出一个空闲窗口，没有时新建"""
+        if self._idle:
+            self.reused += 1
+            return self._idle.pop()
+        return self._create()
+
+    def release(self, window):
+        """窗口关闭后归还，超出上限的窗口直接销毁"""
+        if window in self._idle:
+            return
+        if len(self._idle) < self.max_idle:
+            self._idle.append(window)
+        else:
+            window.deleteLater()
+
+    def stats(self):
+        return {"created": self.created, "reused": self.reused, "idle": len(self._idle)}
+
+    def _create(self):
+        self.created += 1
+        logger.debug("[WindowPool] 创建新窗口，累计 %s 个", self.created)
+        return self.factory()